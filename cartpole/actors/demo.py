@@ -27,7 +27,11 @@ class DemoActor(Actor):
         return float(target)
 
     def save_expected_state(self, stamp):
-        state_expected, target_expected = self.trajectory(stamp)
+        table = self.trajectory_control.table
+        if table is not None:
+            state_expected, target_expected = table.expected(stamp)
+        else:
+            state_expected, target_expected = self.trajectory(stamp)
         ts = self.proxy._timestamp()
         self.proxy._add_value('expected.cart_position', ts, float(state_expected.cart_position))
         self.proxy._add_value('expected.cart_velocity', ts, float(state_expected.cart_velocity))
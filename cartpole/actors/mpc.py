@@ -0,0 +1,21 @@
+from cartpole.common.interface import Config, State
+from cartpole.control.mpc import LinearMPC
+from cartpole.sessions.actor import Actor
+
+
+class MPCActor(Actor):
+    '''
+    Balances the pole with cartpole.control.mpc.LinearMPC, respecting cart
+    limits of the config. Options (horizon, step, deadline, ...) are passed
+    to LinearMPC, report() returns the solve time distribution.
+    '''
+
+    def __init__(self, config=None, **kwargs):
+        super().__init__()
+        self.mpc = LinearMPC(config or Config(), **kwargs)
+
+    def __call__(self, state: State, stamp=None) -> float:
+        return self.mpc(state)
+
+    def report(self) -> dict:
+        return self.mpc.stats.report()
@@ -0,0 +1,18 @@
+from cartpole.common.interface import State
+from cartpole.common.policy_table import PolicyTable
+from cartpole.sessions.actor import Actor
+
+
+class PolicyTableActor(Actor):
+    '''
+    Answers with the tabulated best action of the current grid cell,
+    see cartpole.simulator.pytorch.policy_table.tabulate_policy.
+    '''
+
+    def __init__(self, path, interpolate=False, **kwargs):
+        super().__init__(**kwargs)
+        self.table = PolicyTable.load(path)
+        self.lookup = self.table.interpolate if interpolate else self.table.nearest
+
+    def __call__(self, state: State, stamp=None) -> float:
+        return self.lookup(state.as_tuple())
@@ -0,0 +1,128 @@
+import dataclasses as dc
+import json
+import math
+import os
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+ACTIONS_FILE = 'actions.npy'
+META_FILE = 'meta.json'
+ANGLE_DIM = 1
+
+
+@dc.dataclass
+class GridAxis:
+    '''
+    Uniform grid of `size` points from `start` to `stop` (both included).
+    '''
+    start: float
+    stop: float
+    size: int
+
+    @property
+    def step(self) -> float:
+        return (self.stop - self.start) / (self.size - 1) if self.size > 1 else 1.0
+
+    def value(self, index: int) -> float:
+        return self.start + index * self.step
+
+
+class PolicyTable:
+    '''
+    Best action for every cell of a state grid, stored as a dense array of
+    action indices (uint8 if there are at most 256 actions).
+
+    State axes are (x, a, v, w), the last one varies fastest. Pole angles
+    are sampled over [0, 2pi], so the first and the last angle points are
+    the same. On disk the table is a directory with memory-mapped
+    `actions.npy` and `meta.json` describing the grid.
+    '''
+
+    def __init__(self, axes: List[GridAxis], accelerations: GridAxis, actions: np.ndarray):
+        shape = tuple(axis.size for axis in axes)
+        assert actions.shape == shape, f'actions shape {actions.shape} != grid shape {shape}'
+
+        self.axes = axes
+        self.accelerations = accelerations
+        self.actions = actions
+        # Plain lists and memoryviews make scalar lookups cheaper than numpy
+        self._values = [accelerations.value(i) for i in range(accelerations.size)]
+        self._flat = memoryview(np.ascontiguousarray(actions)).cast('B').cast(actions.dtype.char)
+        self._strides = [s // actions.itemsize for s in actions.strides]
+
+    @staticmethod
+    def action_dtype(actions_n: int) -> np.dtype:
+        return np.dtype(np.uint8 if actions_n <= 256 else np.uint16)
+
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        meta = {
+            'axes': [dc.asdict(axis) for axis in self.axes],
+            'accelerations': dc.asdict(self.accelerations),
+            'dtype': self.actions.dtype.name,
+        }
+        # Write to temporary files first, so readers never see partial tables
+        tmp = path / (ACTIONS_FILE + '.tmp')
+        with open(tmp, 'wb') as file:
+            np.save(file, self.actions)
+        os.replace(tmp, path / ACTIONS_FILE)
+        tmp = path / (META_FILE + '.tmp')
+        tmp.write_text(json.dumps(meta, indent=2))
+        os.replace(tmp, path / META_FILE)
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> 'PolicyTable':
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text())
+        actions = np.load(path / ACTIONS_FILE, mmap_mode='r')
+        return PolicyTable(
+            axes=[GridAxis(**axis) for axis in meta['axes']],
+            accelerations=GridAxis(**meta['accelerations']),
+            actions=actions,
+        )
+
+    def _position(self, dim: int, value: float) -> float:
+        axis = self.axes[dim]
+        if dim == ANGLE_DIM:
+            value %= 2 * math.pi
+        position = (value - axis.start) / axis.step
+        return min(max(position, 0.0), axis.size - 1.0)
+
+    def _wrap(self, dim: int, index: int) -> int:
+        if dim == ANGLE_DIM and self.axes[dim].size > 1:
+            return index % (self.axes[dim].size - 1)
+        return index
+
+    def nearest(self, state: Sequence[float]) -> float:
+        '''
+        Returns acceleration of the nearest grid cell for q = (x, a, v, w).
+        '''
+        offset = 0
+        for dim in range(4):
+            index = self._wrap(dim, int(self._position(dim, state[dim]) + 0.5))
+            offset += index * self._strides[dim]
+        return self._values[self._flat[offset]]
+
+    def interpolate(self, state: Sequence[float]) -> float:
+        '''
+        Returns multilinear interpolation of accelerations of the 16 grid cells
+        around q = (x, a, v, w).
+        '''
+        corners: List[Tuple[int, float]] = [(0, 1.0)]
+        for dim in range(4):
+            position = self._position(dim, state[dim])
+            low = min(int(position), self.axes[dim].size - 2) if self.axes[dim].size > 1 else 0
+            frac = position - low
+            stride = self._strides[dim]
+            lower = self._wrap(dim, low) * stride
+            upper = self._wrap(dim, low + 1) * stride
+            corners = [
+                (offset + shift, weight * part)
+                for offset, weight in corners
+                for shift, part in ((lower, 1.0 - frac), (upper, frac))
+                if part > 0
+            ]
+        return sum(weight * self._values[self._flat[offset]] for offset, weight in corners)
@@ -1,13 +1,20 @@
+import dataclasses as dc
+import enum
+import hashlib
+import json
 import logging
 import socket
 import math
 import os
 from contextlib import closing
+from pathlib import Path
 import sys
 
 from cartpole.common.interface import State
 
 STEP_COUNT = 'step_count'
+CACHE_DIR_ENV = 'CARTPOLE_CACHE_DIR'
+DEFAULT_CACHE_DIR = '~/.cache/cartpole'
 
 
 def reward(state: State) -> float:
@@ -43,3 +50,35 @@ def find_free_port():
         s.bind(('', 0))
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         return s.getsockname()[1]
+
+
+def get_cache_dir(name: str) -> Path:
+    '''
+    Returns directory for cached data of the given kind, creating it if needed.
+    Root directory is customizable via CARTPOLE_CACHE_DIR environment variable
+    (default: ~/.cache/cartpole).
+    '''
+    root = Path(os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)).expanduser()
+    path = root / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _to_json(value):
+    if dc.is_dataclass(value):
+        return dc.asdict(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if hasattr(value, 'tolist'):  # numpy arrays and tensors
+        return value.tolist()
+    return str(value)
+
+
+def content_hash(*objects) -> str:
+    '''
+    Returns stable hex digest of the given objects (dataclasses, arrays,
+    numbers, strings and containers of them). Equal content gives equal hash,
+    so it can be used as a cache key.
+    '''
+    payload = json.dumps(objects, default=_to_json, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
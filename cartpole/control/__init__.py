@@ -1,3 +1,14 @@
+from cartpole.control.gain_schedule import GainScheduledLQRControl
+from cartpole.control.lookup import LookupTable, TrajectoryTable
 from cartpole.control.lqr import BalanceLQRControl, TrajectoryLQRControl
-from cartpole.control.trajectory import Trajectory
+from cartpole.control.mpc import LinearMPC
+from cartpole.control.tvlqr import TVLQRControl
 
+
+def __getattr__(name):
+    # Trajectory needs Drake on import, other controllers only when built
+    if name == 'Trajectory':
+        from cartpole.control.trajectory import Trajectory
+        return Trajectory
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
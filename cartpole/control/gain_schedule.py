@@ -0,0 +1,171 @@
+from cartpole.common import State
+from cartpole.common.util import content_hash, get_cache_dir
+
+from dataclasses import dataclass, replace
+
+import bisect
+import logging
+import math
+import numpy
+import os
+import tempfile
+
+log = logging.getLogger(__name__)
+
+CACHE_NAME = 'gains'
+
+DEFAULT_Q = numpy.diag([10.0, 1, 1, 1])
+DEFAULT_R = numpy.diag([0.5])
+DEFAULT_POLE_LENGTHS = numpy.linspace(0.1, 1.0, 10)  # m
+DEFAULT_ANGLES = math.pi + numpy.linspace(-0.6, 0.6, 13)  # rad
+
+
+def operating_point(angle, gravity):
+    '''
+    Resting pole at the given angle, the cart acceleration keeps it there.
+    '''
+    q0 = State(pole_angle=angle).as_array()
+    u0 = numpy.array([-gravity * math.tan(angle)])
+    return q0, u0
+
+
+def lqr_gain(config, angle, Q=DEFAULT_Q, R=DEFAULT_R):
+    # Drake is only needed to build schedules, not to use them
+    from pydrake.systems.controllers import LinearQuadraticRegulator
+    from pydrake.systems.primitives import Linearize
+
+    from cartpole.simulator.pydrake.system import CartPoleSystem
+
+    q0, u0 = operating_point(angle, config.gravity)
+
+    system = CartPoleSystem()
+    context = system.CreateContext(config, q0)
+    system.get_input_port().FixValue(context, u0)
+
+    # Only the upright point is an equilibrium, the cart accelerates elsewhere
+    linearized = Linearize(system, context, equilibrium_check_tolerance=None)
+    K, _ = LinearQuadraticRegulator(linearized.A(), linearized.B(), Q, R)
+    return K[0]
+
+
+@dataclass
+class GainSchedule:
+    '''
+    LQR gains K[i, j] (4 per point) over a grid of pole lengths [i] and
+    pole angles [j] near the upright position.
+    '''
+    pole_lengths: numpy.ndarray
+    angles: numpy.ndarray
+    gains: numpy.ndarray
+
+    def save(self, path):
+        # Write to temporary file first, so parallel readers never see partial data
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                numpy.savez(file, pole_lengths=self.pole_lengths, angles=self.angles, gains=self.gains)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def load(path):
+        with numpy.load(path) as data:
+            return GainSchedule(data['pole_lengths'], data['angles'], data['gains'])
+
+    def for_pole_length(self, pole_length):
+        '''
+        Gains over angles for the given pole length, shape (angles, 4).
+        '''
+        i, weight = locate(self.pole_lengths, pole_length)
+        if weight == 0:
+            return self.gains[i].copy()
+
+        return (1 - weight) * self.gains[i] + weight * self.gains[i + 1]
+
+
+def locate(grid, value):
+    '''
+    Index of the grid interval containing value and weight of its right end,
+    values outside of the grid are clamped.
+    '''
+    if value <= grid[0]:
+        return 0, 0.0
+
+    if value >= grid[-1]:
+        return len(grid) - 1, 0.0
+
+    i = bisect.bisect_right(grid, value) - 1
+    return i, (value - grid[i]) / (grid[i + 1] - grid[i])
+
+
+def build_gain_schedule(config, pole_lengths=DEFAULT_POLE_LENGTHS, angles=DEFAULT_ANGLES, Q=DEFAULT_Q, R=DEFAULT_R):
+    gains = numpy.array([
+        [lqr_gain(replace(config, pole_length=float(pole_length)), angle, Q, R) for angle in angles]
+        for pole_length in pole_lengths
+    ])
+    return GainSchedule(numpy.asarray(pole_lengths, dtype=float), numpy.asarray(angles, dtype=float), gains)
+
+
+def cached_gain_schedule(
+        config,
+        pole_lengths=DEFAULT_POLE_LENGTHS,
+        angles=DEFAULT_ANGLES,
+        Q=DEFAULT_Q,
+        R=DEFAULT_R,
+        cache_dir=None):
+    '''
+    Same as build_gain_schedule, but schedules are stored on disk. Pole length
+    is a grid axis, so configs differing only in it share a schedule.
+    '''
+    cache_dir = cache_dir or get_cache_dir(CACHE_NAME)
+    key = content_hash(replace(config, pole_length=0.0), pole_lengths, angles, Q, R)
+    path = os.path.join(cache_dir, f'{key}.npz')
+
+    if os.path.exists(path):
+        log.debug('Load gain schedule %s', key)
+        return GainSchedule.load(path)
+
+    schedule = build_gain_schedule(config, pole_lengths, angles, Q, R)
+    schedule.save(path)
+    log.debug('Save gain schedule %s', key)
+
+    return schedule
+
+
+class GainScheduledLQRControl:
+    '''
+    Balancing LQR with gains interpolated over the pole angle, computed for
+    the config pole length. Targets are clamped to max_acceleration.
+
+    At the measured angle a the control is u0(a) - K(a) (q - upright): the
+    feedforward of the operating point plus its LQR gain. The gain acts on
+    the deviation from the upright target, not from the operating point,
+    since both have the measured angle and angle feedback would be lost.
+    '''
+
+    def __init__(self, config, schedule=None):
+        schedule = schedule or cached_gain_schedule(config)
+
+        self.gravity = config.gravity
+        self.max_acceleration = config.max_acceleration
+        self.angles = schedule.angles.tolist()
+        self.gains = schedule.for_pole_length(config.pole_length).tolist()
+
+    def gain(self, angle):
+        angle = math.pi + math.remainder(angle - math.pi, 2 * math.pi)
+        i, weight = locate(self.angles, angle)
+        if weight == 0:
+            return self.gains[i]
+
+        lower, upper = self.gains[i], self.gains[i + 1]
+        return [k + weight * (k_upper - k) for k, k_upper in zip(lower, upper)]
+
+    def __call__(self, state):
+        x, a, v, w = state.as_tuple()
+        kx, ka, kv, kw = self.gain(a)
+        error_a = math.remainder(a - math.pi, 2 * math.pi)
+        u0 = -self.gravity * math.tan(error_a)
+        u = u0 - (kx * x + ka * error_a + kv * v + kw * w)
+        return max(-self.max_acceleration, min(u, self.max_acceleration))
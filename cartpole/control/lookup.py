@@ -0,0 +1,122 @@
+import math
+import numpy
+
+from cartpole.common import State
+
+DEFAULT_RATE = 1000  # samples per second
+
+
+class LookupTable:
+    '''
+    Vector function of time sampled on a uniform grid, stored as a contiguous
+    (N, D) float64 array. Values are linearly interpolated between samples
+    and clamped to the first and the last sample outside of the grid.
+    '''
+
+    def __init__(self, start, step, values):
+        values = numpy.ascontiguousarray(values, dtype=numpy.float64)
+        assert values.ndim == 2 and len(values) > 0, 'values must be (N, D) array'
+
+        self.start = float(start)
+        self.step = float(step)
+        self.values = values
+        self.size, self.dim = values.shape
+        # Scalar reads from a memoryview are cheaper than numpy indexing
+        self._flat = memoryview(values).cast('B').cast('d')
+
+    @staticmethod
+    def sample(function, start, end, rate=DEFAULT_RATE):
+        '''
+        Samples function(t) -> array-like at rate samples per second over
+        [start, end], both ends included.
+        '''
+        n = max(2, int(math.ceil((end - start) * rate)) + 1)
+        times = numpy.linspace(start, end, n)
+        values = numpy.array([numpy.ravel(function(t)) for t in times])
+        return LookupTable(start, times[1] - times[0], values)
+
+    @property
+    def end(self):
+        return self.start + (self.size - 1) * self.step
+
+    def locate(self, t):
+        '''
+        Returns offsets of two neighbour rows in the flat array and the
+        interpolation weight of the second one.
+        '''
+        position = (t - self.start) / self.step
+        if position <= 0:
+            return 0, 0, 0.0
+
+        if position >= self.size - 1:
+            last = (self.size - 1) * self.dim
+            return last, last, 0.0
+
+        index = int(position)
+        return index * self.dim, (index + 1) * self.dim, position - index
+
+    def __call__(self, t):
+        lower, upper, weight = self.locate(t)
+        flat = self._flat
+        return [
+            flat[lower + i] + weight * (flat[upper + i] - flat[lower + i])
+            for i in range(self.dim)
+        ]
+
+
+class TrajectoryTable:
+    '''
+    Nominal states q0(t), inputs u0(t) and LQR gains K(t) of a trajectory
+    tracking controller, compiled into one lookup table. Row layout is
+    (x, a, v, w, u, k_x, k_a, k_v, k_w), so a control tick reads two rows.
+    '''
+
+    def __init__(self, table):
+        assert table.dim == 9, 'expected (q0, u0, K) rows'
+        self.table = table
+
+    @staticmethod
+    def compile(states, targets, gains, rate=DEFAULT_RATE):
+        '''
+        Samples Drake trajectories (anything with value, start_time and
+        end_time) of states, targets and gains.
+        '''
+        def row(t):
+            return numpy.concatenate([
+                numpy.ravel(states.value(t)),
+                numpy.ravel(targets.value(t)),
+                numpy.ravel(gains.value(t)),
+            ])
+
+        table = LookupTable.sample(row, targets.start_time(), targets.end_time(), rate)
+        return TrajectoryTable(table)
+
+    @staticmethod
+    def from_arrays(start, step, states, targets, gains):
+        '''
+        Builds table from uniform samples: states (Nx4), targets (N) and gains (Nx4).
+        '''
+        values = numpy.hstack([
+            numpy.reshape(states, (-1, 4)),
+            numpy.reshape(targets, (-1, 1)),
+            numpy.reshape(gains, (-1, 4)),
+        ])
+        return TrajectoryTable(LookupTable(start, step, values))
+
+    @property
+    def duration(self):
+        return self.table.end - self.table.start
+
+    def control(self, t, q):
+        '''
+        LQR tracking control u = u0 - K (q - q0) for state q = (x, a, v, w).
+        '''
+        x, a, v, w, u, kx, ka, kv, kw = self.table(t)
+        return u - kx * (q[0] - x) - ka * (q[1] - a) - kv * (q[2] - v) - kw * (q[3] - w)
+
+    def expected(self, t):
+        '''
+        Nominal state and target at time t.
+        '''
+        x, a, v, w, u = self.table(t)[:5]
+        return State.from_array((x, a, v, w)), u
@@ -1,16 +1,17 @@
-from pydrake.systems.controllers import LinearQuadraticRegulator
-from pydrake.systems.controllers import FiniteHorizonLinearQuadraticRegulator
-from pydrake.systems.controllers import FiniteHorizonLinearQuadraticRegulatorOptions
-from pydrake.systems.primitives import Linearize
-
 from cartpole.common import Config, Error, State
-from cartpole.simulator.pydrake.system import CartPoleSystem
+from cartpole.control.lookup import DEFAULT_RATE, TrajectoryTable
+from cartpole.control.tvlqr import tvlqr_table
 
 import math
 import numpy
 
 class BalanceLQRControl:
     def __init__(self, config):
+        from pydrake.systems.controllers import LinearQuadraticRegulator
+        from pydrake.systems.primitives import Linearize
+
+        from cartpole.simulator.pydrake.system import CartPoleSystem
+
         state = State(
             cart_position = 0,
             cart_velocity = 0,
@@ -41,10 +42,37 @@ class BalanceLQRControl:
 
 
 class TrajectoryLQRControl:
-    def __init__(self, config, trajectory):
+    '''
+    Tracks trajectory with finite horizon LQR. If rate is given, nominal
+    states, targets and gains are compiled into a dense lookup table
+    sampled at rate per second, so control ticks make no Drake calls.
+
+    With solver='numpy' gains are computed by cartpole.control.tvlqr
+    instead of FiniteHorizonLinearQuadraticRegulator (rate is required).
+    Drake is only imported by the 'drake' solver, the 'numpy' one accepts
+    any trajectory with duration and sample(sample_n) like Trajectory.
+    '''
+
+    def __init__(self, config, trajectory, rate=DEFAULT_RATE, solver='drake'):
         Q = numpy.diag([1, 1, 1, 1])
         R = numpy.diag([1])
 
+        self.trajectory = trajectory
+        if solver == 'numpy':
+            assert rate, 'numpy solver needs rate'
+            sample_n = max(2, int(math.ceil(trajectory.duration * rate)) + 1)
+            times, states, targets = trajectory.sample(sample_n)
+            self.regulator = None
+            self.table = tvlqr_table(config, times[0], times[1] - times[0], states, targets, Q, R)
+            return
+
+        assert solver == 'drake', f'unknown solver {solver}'
+
+        from pydrake.systems.controllers import FiniteHorizonLinearQuadraticRegulator
+        from pydrake.systems.controllers import FiniteHorizonLinearQuadraticRegulatorOptions
+
+        from cartpole.simulator.pydrake.system import CartPoleSystem
+
         options = FiniteHorizonLinearQuadraticRegulatorOptions()
         options.x0 = trajectory.states
         options.u0 = trajectory.targets
@@ -53,7 +81,6 @@ class TrajectoryLQRControl:
         system = CartPoleSystem()
         context = system.CreateContext(config, State().as_array())
         
-        self.trajectory = trajectory
         self.regulator = FiniteHorizonLinearQuadraticRegulator(
             system,
             context,
@@ -64,7 +91,15 @@ class TrajectoryLQRControl:
             options=options
         )
 
+        self.table = None
+        if rate:
+            self.table = TrajectoryTable.compile(
+                trajectory.states, trajectory.targets, self.regulator.K, rate)
+
     def __call__(self, stamp, state):
+        if self.table is not None:
+            return self.table.control(stamp, state.as_tuple())
+
         q = state.as_array_4x1()
         q0 = self.trajectory.states.value(stamp)
         u0 = self.trajectory.targets.value(stamp)
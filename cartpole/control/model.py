@@ -1,30 +1,44 @@
 import numpy as np
-import math
 
 
 class Model:
+    '''
+    Linearization of cartpole.simulator.pydrake.system.CartPoleSystem
+    dynamics for states q = (x, a, v, w) and cart acceleration u.
+    '''
+
     def __init__(self, params):
         self.params = params
 
         # caching
-        self.coef = 1.5 * self.params.pole_length
-
-        self.A = np.array(
-            [[0, 0, 1, 0],
-             [0, 0, 0, 1],
-             [0, 0, 0, 0],
-             [0, 0, 0, 0]],
-            dtype=np.float32
-        )
-
-        self.B = np.array([[0], [0], [1], [0]], dtype=np.float32)
+        self.coef = 1 / self.params.pole_length
 
     def linearize(self, q, u):
-        theta = q[1][0]
-        cos_theta = math.cos(theta)
-        sin_theta = math.sin(theta)
-
-        self.A[3][1] = self.coef * (u[0][0]*sin_theta - self.params.gravity*cos_theta)
-        self.B[3][0] = -self.coef * cos_theta
-
-        return self.A, self.B
\ No newline at end of file
+        '''
+        Returns A (4x4) and B (4x1) at state q (4x1) and input u (1x1).
+        '''
+        A, B = self.linearize_batch(np.reshape(q, (1, 4)), np.reshape(u, (1,)))
+        return A[0], B[0]
+
+    def linearize_batch(self, q, u):
+        '''
+        Returns stacks of A (Nx4x4) and B (Nx4x1) at states q (Nx4) and
+        inputs u (N), e.g. along a sampled trajectory.
+        '''
+        q = np.asarray(q, dtype=np.float64)
+        u = np.asarray(u, dtype=np.float64).reshape(-1)
+        n = len(q)
+
+        cos_theta = np.cos(q[:, 1])
+        sin_theta = np.sin(q[:, 1])
+
+        A = np.zeros((n, 4, 4))
+        A[:, 0, 2] = 1
+        A[:, 1, 3] = 1
+        A[:, 3, 1] = self.coef * (u * sin_theta - self.params.gravity * cos_theta)
+
+        B = np.zeros((n, 4, 1))
+        B[:, 2, 0] = 1
+        B[:, 3, 0] = -self.coef * cos_theta
+
+        return A, B
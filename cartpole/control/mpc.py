@@ -0,0 +1,288 @@
+from collections import deque
+from dataclasses import dataclass, field
+
+from cartpole.control.model import Model
+from cartpole.control.tvlqr import discretize
+
+import logging
+import math
+import numpy
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_Q = numpy.diag([10.0, 1, 1, 1])
+DEFAULT_R = numpy.diag([0.5])
+UPRIGHT = numpy.array([0.0, math.pi, 0.0, 0.0])
+
+POSITION, ANGLE, VELOCITY, ANGULAR_VELOCITY = range(4)
+CHECK_EVERY = 5
+HISTORY = 10000
+
+
+def dare(Ad, Bd, Q, R, iterations=100000, tolerance=1e-10):
+    '''
+    Solves discrete algebraic Riccati equation by value iteration,
+    returns cost-to-go P and gain K (u = -K e).
+    '''
+    P = numpy.array(Q, dtype=numpy.float64)
+    for _ in range(iterations):
+        K = numpy.linalg.solve(R + Bd.T @ P @ Bd, Bd.T @ P @ Ad)
+        P_next = Q + Ad.T @ P @ (Ad - Bd @ K)
+        if numpy.max(numpy.abs(P_next - P)) < tolerance * max(1.0, numpy.max(numpy.abs(P))):
+            return P_next, K
+        P = P_next
+
+    log.warning('DARE did not converge in %d iterations', iterations)
+    return P, K
+
+
+@dataclass
+class MPCStats:
+    '''
+    Solve statistics: solve_time in seconds (including QP setup) and ADMM
+    iterations of the last HISTORY ticks, counts of all ticks, ticks that
+    hit the deadline and ticks answered by LQR.
+    '''
+    solve_time: deque = field(default_factory=lambda: deque(maxlen=HISTORY))
+    iterations: deque = field(default_factory=lambda: deque(maxlen=HISTORY))
+    ticks: int = 0
+    overruns: int = 0
+    fallbacks: int = 0
+
+    def add(self, solve_time, iterations):
+        self.solve_time.append(solve_time)
+        self.iterations.append(iterations)
+        self.ticks += 1
+
+    def report(self):
+        if not self.solve_time:
+            return {'ticks': 0}
+
+        solve_time = numpy.array(self.solve_time) * 1e6
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'fallbacks': self.fallbacks,
+            'iterations_mean': float(numpy.mean(self.iterations)),
+            'solve_us_p50': float(numpy.percentile(solve_time, 50)),
+            'solve_us_p90': float(numpy.percentile(solve_time, 90)),
+            'solve_us_p99': float(numpy.percentile(solve_time, 99)),
+            'solve_us_max': float(solve_time.max()),
+        }
+
+
+class LinearMPC:
+    '''
+    Balancing MPC without Drake. Every tick the dynamics are linearized at
+    the current state and the previous input (Model.linearize), and the
+    condensed QP over horizon inputs is solved:
+
+        min sum(e'Q e + u'R u) + e_H' P e_H
+        s.t. |u| <= max_acceleration, |x| <= max_position, |v| <= max_velocity
+
+    where e is deviation from the upright state and P is the cost-to-go of
+    the LQR fallback. The QP is solved by ADMM warm started from the shifted
+    solution of the previous tick.
+
+    Solve stops at convergence, at the deadline (seconds since the call) or
+    after max_iterations. An unconverged iterate is used if at least
+    min_iterations were done and its predicted states violate the position
+    and velocity limits by at most tolerance or by less than the predicted
+    states of the LQR fallback, otherwise the LQR fallback. Q and R are weights of the continuous time
+    cost.
+    '''
+
+    def __init__(
+            self,
+            config,
+            horizon=20,
+            step=0.02,
+            Q=DEFAULT_Q,
+            R=DEFAULT_R,
+            deadline=0.005,
+            max_iterations=200,
+            min_iterations=10,
+            rho=0.1,
+            sigma=1e-6,
+            tolerance=1e-4,
+            clock=time.perf_counter):
+        self.config = config
+        self.model = Model(config)
+        self.horizon = horizon
+        self.step = step
+        self.Q = Q * step
+        self.R = R * step
+        self.deadline = deadline
+        self.max_iterations = max_iterations
+        self.min_iterations = min_iterations
+        self.rho = rho
+        self.sigma = sigma
+        self.tolerance = tolerance
+        self.clock = clock
+
+        A, B = self.model.linearize(UPRIGHT.reshape(4, 1), numpy.zeros((1, 1)))
+        Ad, Bd = discretize(A, B, step)
+        self.P, self.K = dare(Ad, Bd, self.Q, self.R)
+
+        # Constraint rows: inputs, positions and velocities of every step
+        n = horizon
+        self.lower = numpy.empty(3 * n)
+        self.upper = numpy.empty(3 * n)
+        self.C = numpy.zeros((3 * n, n))
+        self.C[:n] = numpy.eye(n)
+        self.Gamma = numpy.zeros((4 * n, n))
+        self.free = numpy.empty((n, 4))
+        self.weights = numpy.zeros((4 * n, 4 * n))
+        for k in range(n - 1):
+            self.weights[4 * k:4 * k + 4, 4 * k:4 * k + 4] = self.Q
+        self.weights[4 * n - 4:, 4 * n - 4:] = self.P
+
+        self.stats = MPCStats()
+        self.reset()
+
+    def reset(self):
+        self.inputs = numpy.zeros(self.horizon)
+        self.dual = numpy.zeros(3 * self.horizon)
+        self.target = 0.0
+
+    def lqr(self, error):
+        u = -float(self.K[0] @ error)
+        limit = self.config.max_acceleration
+        return max(-limit, min(u, limit))
+
+    def shift(self, values, blocks):
+        # Previous solution moved one step forward, the last step is repeated
+        values = values.reshape(blocks, self.horizon)
+        shifted = numpy.empty_like(values)
+        shifted[:, :-1] = values[:, 1:]
+        shifted[:, -1] = values[:, -1]
+        return shifted.reshape(-1)
+
+    def setup(self, q):
+        '''
+        Condensed prediction X = free + Gamma U around the current state q
+        and input, returns QP Hessian and gradient.
+        '''
+        n, u0 = self.horizon, self.target
+        A, B = self.model.linearize(q.reshape(4, 1), numpy.array([[u0]]))
+        Ad, Bd = discretize(A[None], B[None], self.step)
+        Ad, Bd = Ad[0], Bd[0]
+
+        # Affine term of the linearization around a point off equilibrium
+        x, a, v, w = q
+        f = numpy.array([v, w, u0, -(u0 * math.cos(a) + self.config.gravity * math.sin(a)) / self.config.pole_length])
+        c = f - A @ q - B[:, 0] * u0
+        cd = (numpy.eye(4) * self.step + A * (self.step * self.step / 2)) @ c
+        self.dynamics = Ad, Bd[:, 0], cd
+
+        Gamma, free = self.Gamma, self.free
+        previous, row = q, numpy.zeros((4, n))
+        for k in range(n):
+            row = Ad @ row
+            row[:, k] = Bd[:, 0]
+            previous = Ad @ previous + cd
+            Gamma[4 * k:4 * k + 4] = row
+            free[k] = previous
+
+        error = (free - UPRIGHT).reshape(-1)
+        WG = self.weights @ Gamma
+        hessian = Gamma.T @ WG + numpy.eye(n) * self.R[0, 0]
+        gradient = WG.T @ error
+
+        config = self.config
+        self.C[n:2 * n] = Gamma[POSITION::4]
+        self.C[2 * n:] = Gamma[VELOCITY::4]
+        self.lower[:n], self.upper[:n] = -config.max_acceleration, config.max_acceleration
+        self.lower[n:2 * n] = -config.max_position - free[:, POSITION]
+        self.upper[n:2 * n] = config.max_position - free[:, POSITION]
+        self.lower[2 * n:] = -config.max_velocity - free[:, VELOCITY]
+        self.upper[2 * n:] = config.max_velocity - free[:, VELOCITY]
+
+        return hessian, gradient
+
+    def solve(self, hessian, gradient, start):
+        '''
+        ADMM iterations until convergence, max_iterations or the deadline.
+        Returns inputs, duals, iterations, whether the deadline was hit and
+        whether the iterate converged.
+        '''
+        C, rho, sigma = self.C, self.rho, self.sigma
+        CT = C.T.copy()
+        inverse = numpy.linalg.inv(hessian + sigma * numpy.eye(self.horizon) + rho * CT @ C)
+
+        u = self.shift(self.inputs, 1)
+        y = self.shift(self.dual, 3)
+        z = numpy.clip(C @ u, self.lower, self.upper)
+
+        for iteration in range(1, self.max_iterations + 1):
+            u = inverse @ (sigma * u - gradient + CT @ (rho * z - y))
+            Cu = C @ u
+            z_previous = z
+            z = numpy.minimum(numpy.maximum(Cu + y / rho, self.lower), self.upper)
+            y = y + rho * (Cu - z)
+
+            # Residuals cost as much as an iteration, so they are checked sparsely
+            if iteration % CHECK_EVERY == 0:
+                primal = numpy.max(numpy.abs(Cu - z))
+                dual = rho * numpy.max(numpy.abs(CT @ (z - z_previous)))
+                if primal < self.tolerance and dual < self.tolerance:
+                    return u, y, iteration, False, True
+
+            if self.clock() - start > self.deadline:
+                return u, y, iteration, True, False
+
+        return u, y, self.max_iterations, False, False
+
+    def violation(self, u):
+        '''
+        Largest violation of the position and velocity limits by the states
+        predicted for inputs u, inputs themselves are clamped when applied.
+        '''
+        n = self.horizon
+        Cu = self.C[n:] @ u
+        return max(0.0, float(numpy.max(self.lower[n:] - Cu)), float(numpy.max(Cu - self.upper[n:])))
+
+    def lqr_inputs(self, q):
+        '''
+        Inputs of the LQR fallback over the horizon, predicted with the
+        dynamics linearized by setup.
+        '''
+        Ad, b, cd = self.dynamics
+        inputs = numpy.empty(self.horizon)
+        for k in range(self.horizon):
+            inputs[k] = self.lqr(q - UPRIGHT)
+            q = Ad @ q + b * inputs[k] + cd
+        return inputs
+
+    def usable(self, q, u):
+        '''
+        Whether an unconverged iterate u may be applied: it is within
+        tolerance of the limits, or closer to them than the LQR fallback
+        (e.g. when no inputs can keep the cart within the limits).
+        '''
+        violation = self.violation(u)
+        return violation <= self.tolerance or violation <= self.violation(self.lqr_inputs(q))
+
+    def __call__(self, state):
+        start = self.clock()
+        q = numpy.array(state.as_tuple(), dtype=numpy.float64)
+        q[ANGLE] = math.pi + math.remainder(q[ANGLE] - math.pi, 2 * math.pi)
+
+        hessian, gradient = self.setup(q)
+        u, y, iterations, overrun, converged = self.solve(hessian, gradient, start)
+
+        stats = self.stats
+        stats.overruns += overrun
+        if not converged and (iterations < self.min_iterations or not self.usable(q, u)):
+            stats.fallbacks += 1
+            target = self.lqr(q - UPRIGHT)
+            self.reset()
+        else:
+            limit = self.config.max_acceleration
+            self.inputs, self.dual = u, y
+            target = max(-limit, min(float(u[0]), limit))
+
+        self.target = target
+        stats.add(self.clock() - start, iterations)
+        return target
@@ -0,0 +1,92 @@
+import dataclasses as dc
+import math
+
+import numpy
+import pytest
+
+from cartpole.common import Config, State
+from cartpole.control.gain_schedule import GainSchedule, GainScheduledLQRControl, locate
+from cartpole.simulator.numpy_rk4 import CartPoleSimulator
+
+
+def make_schedule():
+    pole_lengths = numpy.array([0.2, 0.4])
+    angles = math.pi + numpy.array([-0.2, 0.0, 0.2])
+    gains = numpy.zeros((2, 3, 4))
+    gains[0, :, 1] = [10.0, 20.0, 30.0]
+    gains[1] = 2 * gains[0]
+    return GainSchedule(pole_lengths, angles, gains)
+
+
+def run(control, config, initial, ticks=500):
+    simulator = CartPoleSimulator()
+    simulator.reset_to(config, initial)
+    for _ in range(ticks):
+        simulator.set_target(control(simulator.get_state()))
+        simulator.advance(0.01)
+        if simulator.get_state().error:
+            break
+    return simulator.get_state()
+
+
+class TestGainSchedule:
+    def test_locate(self):
+        grid = [0.0, 1.0, 3.0]
+        assert locate(grid, -1.0) == (0, 0.0)
+        assert locate(grid, 0.25) == (0, 0.25)
+        assert locate(grid, 2.5) == (1, 0.75)
+        assert locate(grid, 3.0) == (2, 0.0)
+        assert locate(grid, 5.0) == (2, 0.0)
+
+    def test_for_pole_length(self):
+        schedule = make_schedule()
+        assert schedule.for_pole_length(0.3)[:, 1] == pytest.approx([15.0, 30.0, 45.0])
+        assert schedule.for_pole_length(1.0)[:, 1] == pytest.approx([20.0, 40.0, 60.0])
+
+    def test_save_load(self, tmp_path):
+        schedule = make_schedule()
+        schedule.save(tmp_path / 'gains.npz')
+        loaded = GainSchedule.load(tmp_path / 'gains.npz')
+        assert numpy.array_equal(loaded.gains, schedule.gains)
+        assert numpy.array_equal(loaded.angles, schedule.angles)
+
+
+class TestGainScheduledLQRControl:
+    def test_gain_interpolation_wraps_angle(self):
+        control = GainScheduledLQRControl(Config(pole_length=0.2), make_schedule())
+        assert control.gain(math.pi + 0.1)[1] == pytest.approx(25.0)
+        assert control.gain(-math.pi + 0.1)[1] == pytest.approx(25.0)
+        assert control.gain(math.pi + 1.0)[1] == pytest.approx(30.0)
+
+    def test_operating_point_feedforward(self):
+        config = Config(pole_length=0.2)
+        schedule = make_schedule()
+        schedule.gains[:] = 0
+        control = GainScheduledLQRControl(config, schedule)
+
+        # The pole at rest stays at its angle under the feedforward alone
+        state = State(pole_angle=math.pi + 0.1)
+        u = control(state)
+        assert u == pytest.approx(-config.gravity * math.tan(0.1))
+        assert math.cos(state.pole_angle) * u + config.gravity * math.sin(state.pole_angle) == pytest.approx(0.0)
+
+    def test_balances_further_than_balance_lqr(self):
+        pytest.importorskip('pydrake')
+        from cartpole.control.lqr import BalanceLQRControl
+
+        # Wide cart limits: only the pole is compared
+        config = dc.replace(Config(), hard_max_position=10.0, hard_max_velocity=100.0)
+        scheduled = GainScheduledLQRControl(config)
+        balance = BalanceLQRControl(config)
+
+        def clamped(state):
+            u = balance(state)
+            return max(-config.max_acceleration, min(u, config.max_acceleration))
+
+        initial = State(pole_angle=math.pi + 0.3)
+        state = run(scheduled, config, initial)
+        assert not state.error
+        assert abs(math.remainder(state.pole_angle - math.pi, 2 * math.pi)) < 0.01
+
+        state = run(clamped, config, initial)
+        assert state.error or abs(math.remainder(state.pole_angle - math.pi, 2 * math.pi)) > 0.1
@@ -0,0 +1,54 @@
+import math
+
+import numpy
+import pytest
+
+from cartpole.control.lookup import LookupTable, TrajectoryTable
+
+
+class TestLookupTable:
+    def test_interpolates_between_samples(self):
+        table = LookupTable(1.0, 0.5, [[0.0, 10.0], [1.0, 20.0], [3.0, 40.0]])
+        assert table.end == 2.0
+        assert table(1.25) == pytest.approx([0.5, 15.0])
+        assert table(1.5) == pytest.approx([1.0, 20.0])
+        assert table(1.875) == pytest.approx([2.5, 35.0])
+
+    def test_clamps_outside_of_grid(self):
+        table = LookupTable(0.0, 0.1, [[1.0], [2.0]])
+        assert table(-5.0) == [1.0]
+        assert table(0.1) == [2.0]
+        assert table(7.0) == [2.0]
+
+    def test_sample_matches_function(self):
+        table = LookupTable.sample(lambda t: [math.sin(t), t], 0.0, 1.0, rate=1000)
+        for t in numpy.linspace(0, 1, 37):
+            value = table(t)
+            assert value[0] == pytest.approx(math.sin(t), abs=1e-6)
+            assert value[1] == pytest.approx(t)
+
+
+class TestTrajectoryTable:
+    def test_control_tracks_with_negative_feedback(self):
+        states = numpy.array([[0.0, math.pi, 0.0, 0.0], [1.0, math.pi, 2.0, 0.0]])
+        targets = numpy.array([1.0, 3.0])
+        gains = numpy.array([[1.0, 2.0, 3.0, 4.0], [1.0, 2.0, 3.0, 4.0]])
+        table = TrajectoryTable.from_arrays(0.0, 1.0, states, targets, gains)
+
+        # On the nominal trajectory the control is the nominal target
+        assert table.control(0.5, (0.5, math.pi, 1.0, 0.0)) == pytest.approx(2.0)
+        # u = u0 - K (q - q0)
+        q = (0.6, math.pi + 0.1, 1.0, -0.2)
+        expected = 2.0 - (1.0 * 0.1 + 2.0 * 0.1 + 3.0 * 0.0 + 4.0 * -0.2)
+        assert table.control(0.5, q) == pytest.approx(expected)
+        assert table.duration == 1.0
+
+    def test_expected_state(self):
+        states = numpy.array([[0.0, 0.0, 0.0, 0.0], [2.0, 1.0, 4.0, 6.0]])
+        table = TrajectoryTable.from_arrays(0.0, 1.0, states, [0.0, 2.0], numpy.zeros((2, 4)))
+        state, target = table.expected(0.5)
+        assert state.cart_position == pytest.approx(1.0)
+        assert state.pole_angle == pytest.approx(0.5)
+        assert state.cart_velocity == pytest.approx(2.0)
+        assert state.pole_angular_velocity == pytest.approx(3.0)
+        assert target == pytest.approx(1.0)
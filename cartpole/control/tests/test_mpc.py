@@ -0,0 +1,123 @@
+import itertools
+import math
+from collections import deque
+
+import numpy
+
+from cartpole.common import Config, Error, State
+from cartpole.control.mpc import UPRIGHT, LinearMPC, MPCStats
+from cartpole.simulator.numpy_rk4 import CartPoleSimulator
+
+# One ADMM iteration breaks the position limit, LQR keeps within it
+INFEASIBLE_AFTER_ONE_ITERATION = State(
+    cart_position=0.07, cart_velocity=-0.7, pole_angle=math.pi - 0.28, pole_angular_velocity=-1.9)
+
+
+def run(control, config, initial, ticks=400):
+    simulator = CartPoleSimulator()
+    simulator.reset_to(config, initial)
+    max_abs_position = 0.0
+    for _ in range(ticks):
+        simulator.set_target(control(simulator.get_state()))
+        simulator.advance(0.01)
+        max_abs_position = max(max_abs_position, abs(simulator.get_state().cart_position))
+    return simulator.get_state(), max_abs_position
+
+
+class TestLinearMPC:
+    def test_balances_within_limits(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=1.0)
+        state, max_abs_position = run(mpc, config, State(cart_velocity=0.3, pole_angle=math.pi - 0.1))
+
+        assert state.error == Error.NO_ERROR
+        assert abs(state.pole_angle - math.pi) < 0.01
+        assert abs(state.cart_position) < 0.02
+        # Linearization error allows small violations of the soft limit
+        assert max_abs_position < config.max_position + 0.005
+
+        report = mpc.stats.report()
+        assert report['ticks'] == 400
+        assert report['overruns'] == 0
+        assert report['solve_us_p50'] <= report['solve_us_p99']
+
+    def test_warm_start_saves_iterations(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=1.0, tolerance=1e-6)
+        state = State(pole_angle=math.pi + 0.05)
+        mpc(state)
+        mpc(state)
+        cold, warm = mpc.stats.iterations
+        assert warm < cold
+
+    def test_deadline_falls_back_to_lqr(self):
+        config = Config()
+        ticks = itertools.count()
+        # Every clock read is one second later, so the first iteration overruns
+        mpc = LinearMPC(config, deadline=0.5, clock=lambda: float(next(ticks)))
+        state = State(cart_position=0.05, pole_angle=math.pi + 0.05)
+
+        target = mpc(state)
+        assert target == mpc.lqr(numpy.array(state.as_tuple()) - UPRIGHT)
+        assert mpc.stats.overruns == 1
+        assert mpc.stats.fallbacks == 1
+
+    def test_deadline_keeps_iterate_after_min_iterations(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=0.0, min_iterations=1)
+        mpc(State(pole_angle=math.pi + 0.05))
+        assert mpc.stats.overruns == 1
+        assert mpc.stats.fallbacks == 0
+
+    def test_deadline_rejects_infeasible_iterate(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=0.0, min_iterations=1)
+        state = INFEASIBLE_AFTER_ONE_ITERATION
+
+        target = mpc(state)
+        assert mpc.stats.overruns == 1
+        assert mpc.stats.fallbacks == 1
+        assert target == mpc.lqr(numpy.array(state.as_tuple()) - UPRIGHT)
+
+    def test_iteration_cap_falls_back_to_lqr(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=1.0, max_iterations=1)
+        state = State(cart_position=0.05, pole_angle=math.pi + 0.05)
+
+        target = mpc(state)
+        assert target == mpc.lqr(numpy.array(state.as_tuple()) - UPRIGHT)
+        assert mpc.stats.overruns == 0
+        assert mpc.stats.fallbacks == 1
+
+    def test_iteration_cap_rejects_infeasible_iterate(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=1.0, max_iterations=1, min_iterations=1)
+        state = INFEASIBLE_AFTER_ONE_ITERATION
+
+        target = mpc(state)
+        assert target == mpc.lqr(numpy.array(state.as_tuple()) - UPRIGHT)
+        assert mpc.stats.overruns == 0
+        assert mpc.stats.fallbacks == 1
+
+    def test_infeasible_problem_keeps_least_violating_iterate(self):
+        config = Config()
+        mpc = LinearMPC(config, deadline=1.0, max_iterations=1, min_iterations=1)
+        # The cart can not stop before the limit, the iterate violates it less than LQR
+        state = State(cart_position=config.max_position - 0.01, cart_velocity=config.max_velocity, pole_angle=math.pi)
+
+        mpc(state)
+        assert mpc.stats.fallbacks == 0
+
+
+class TestMPCStats:
+    def test_history_is_bounded(self):
+        stats = MPCStats()
+        stats.solve_time = deque(maxlen=3)
+        stats.iterations = deque(maxlen=3)
+        for tick in range(10):
+            stats.add(tick * 1e-6, tick)
+
+        assert list(stats.iterations) == [7, 8, 9]
+        report = stats.report()
+        assert report['ticks'] == 10
+        assert report['solve_us_max'] == 9.0
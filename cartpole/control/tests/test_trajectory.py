@@ -0,0 +1,87 @@
+import dataclasses as dc
+import math
+
+import numpy
+import pytest
+
+pytest.importorskip('pydrake')
+
+from cartpole.common import Config, State
+from cartpole.control import trajectory
+from cartpole.control.trajectory import (
+    TrajectoryLibrary,
+    cached_build_trajectory,
+    load_trajectory,
+    save_trajectory,
+    solve_trajectory,
+    trajectory_key,
+)
+
+
+class TestTrajectoryCache:
+    def test_save_load_round_trip(self, tmp_path):
+        states, targets, stats = solve_trajectory(Config(), State.home(), sample_n=30, max_duration=5)
+        assert stats.success
+
+        path = str(tmp_path / 'trajectory.npz')
+        save_trajectory(path, states, targets)
+        loaded_states, loaded_targets = load_trajectory(path)
+
+        times = numpy.linspace(states.start_time(), states.end_time(), 101)
+        assert numpy.allclose(loaded_states.vector_values(times), states.vector_values(times))
+        assert numpy.allclose(loaded_targets.vector_values(times), targets.vector_values(times))
+
+    def test_cached_build_reuses_solution(self, tmp_path):
+        first = cached_build_trajectory(Config(), State.home(), 30, 5, cache_dir=str(tmp_path))
+        assert len(list(tmp_path.glob('*.npz'))) == 1
+        second = cached_build_trajectory(Config(), State.home(), 30, 5, cache_dir=str(tmp_path))
+        assert first[0].end_time() == second[0].end_time()
+
+    def test_key_sensitivity(self, monkeypatch):
+        config, home = Config(), State.home()
+        key = trajectory_key(config, home, 30, 5)
+        assert key == trajectory_key(Config(), State.home(), 30, 5)
+
+        assert key != trajectory_key(dc.replace(config, pole_length=0.31), home, 30, 5)
+        assert key != trajectory_key(config, State(pole_angle=0.1), 30, 5)
+        assert key != trajectory_key(config, home, 31, 5)
+        assert key != trajectory_key(config, home, 30, 6)
+
+        monkeypatch.setattr(trajectory, 'FORMULATION_VERSION', trajectory.FORMULATION_VERSION + 1)
+        assert key != trajectory_key(config, home, 30, 5)
+
+
+class TestTrajectoryLibrary:
+    def test_nearest_entry(self):
+        library = TrajectoryLibrary(max_distance=1.0)
+        config = Config()
+        home = State.home()
+        library.add(config, home, 30, 5, 'home', None)
+        library.add(dc.replace(config, pole_length=0.4), home, 30, 5, 'long', None)
+        library.add(config, State(pole_angle=0.05), 40, 5, 'other sample_n', None)
+
+        nearest = library.nearest(dc.replace(config, pole_length=0.32), State(pole_angle=0.05), 30, 5)
+        assert nearest.states == 'home'
+
+        nearest = library.nearest(dc.replace(config, pole_length=0.38), home, 30, 5)
+        assert nearest.states == 'long'
+
+        # Too far from every entry
+        assert library.nearest(config, State(pole_angle=math.pi), 30, 5) is None
+        assert library.nearest(config, home, 50, 5) is None
+
+    def test_warm_start_needs_fewer_evaluations(self):
+        library = TrajectoryLibrary(count_evaluations=True)
+        config = Config()
+        *_, cold = library.plan(config, State.home(), sample_n=30, max_duration=5)
+        *_, warm = library.plan(dc.replace(config, pole_length=0.31), State.home(), sample_n=30, max_duration=5)
+
+        assert not cold.warm_start and warm.warm_start
+        assert warm.success
+        assert warm.evaluations < cold.evaluations
+        assert set(library.report()) == {'cold', 'warm'}
+
+    def test_evaluations_are_not_counted_by_default(self):
+        *_, stats = solve_trajectory(Config(), State.home(), sample_n=30, max_duration=5)
+        assert stats.success
+        assert stats.evaluations is None
@@ -0,0 +1,105 @@
+import math
+import sys
+
+import numpy
+import pytest
+
+import cartpole.control
+from cartpole.common import Config, Error, State
+from cartpole.control.lqr import TrajectoryLQRControl
+from cartpole.control.model import Model
+from cartpole.control.tvlqr import TVLQRControl, tvlqr
+from cartpole.simulator.numpy_rk4 import CartPoleSimulator
+from cartpole.simulator.numpy_rk4.simulator import derivatives
+
+
+class TestModel:
+    def test_linearize_batch_matches_finite_differences(self):
+        config = Config()
+        q = numpy.array([[0.1, 2.0, -0.3, 0.5], [0.0, math.pi, 0.0, 0.0]])
+        u = numpy.array([1.5, 0.0])
+        A, B = Model(config).linearize_batch(q, u)
+
+        eps = 1e-6
+        for k in range(len(q)):
+            for i in range(4):
+                dq = numpy.zeros(4)
+                dq[i] = eps
+                column = derivatives(q[k] + dq, u[k], config.gravity, config.pole_length)
+                column -= derivatives(q[k] - dq, u[k], config.gravity, config.pole_length)
+                assert numpy.allclose(A[k, :, i], column / (2 * eps), atol=1e-6)
+
+            column = derivatives(q[k], u[k] + eps, config.gravity, config.pole_length)
+            column -= derivatives(q[k], u[k] - eps, config.gravity, config.pole_length)
+            assert numpy.allclose(B[k, :, 0], column / (2 * eps), atol=1e-6)
+
+    def test_linearize_returns_fresh_arrays(self):
+        model = Model(Config())
+        A1, _ = model.linearize(numpy.zeros((4, 1)), numpy.zeros((1, 1)))
+        A2, _ = model.linearize(numpy.array([[0], [math.pi], [0], [0]]), numpy.zeros((1, 1)))
+        assert A1[3, 1] != A2[3, 1]
+
+
+class TestTVLQR:
+    def test_long_horizon_converges_to_stationary_gain(self):
+        config = Config()
+        n = 20000
+        states = numpy.tile([0.0, math.pi, 0.0, 0.0], (n, 1))
+        K = tvlqr(config, 0.001, states, numpy.zeros(n))
+
+        # Far from the horizon end the gain is stationary and stabilizing
+        assert numpy.allclose(K[0], K[n // 2], atol=1e-4)
+        A, B = Model(config).linearize_batch(states[:1], numpy.zeros(1))
+        closed = A[0] - B[0] @ K[:1]
+        assert numpy.linalg.eigvals(closed).real.max() < 0
+
+    def test_balances_numpy_simulator(self):
+        config = Config()
+        n, step = 6001, 0.001
+        states = numpy.tile([0.0, math.pi, 0.0, 0.0], (n, 1))
+        control = TVLQRControl(config, 0.0, step, states, numpy.zeros(n))
+
+        simulator = CartPoleSimulator()
+        simulator.reset_to(config, State(pole_angle=math.pi + 0.1))
+        for tick in range(500):
+            state = simulator.get_state()
+            simulator.set_target(control(tick * 0.01, state))
+            simulator.advance(0.01)
+
+        state = simulator.get_state()
+        assert state.error == Error.NO_ERROR
+        assert abs(state.pole_angle - math.pi) < 0.01
+        assert abs(state.cart_position) < 0.05
+
+
+class UprightTrajectory:
+    duration = 6.0
+
+    def sample(self, sample_n):
+        times = numpy.linspace(0.0, self.duration, sample_n)
+        states = numpy.tile([0.0, math.pi, 0.0, 0.0], (sample_n, 1))
+        return times, states, numpy.zeros((sample_n, 1))
+
+
+class TestWithoutDrake:
+    def test_numpy_solver(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'pydrake', None)
+        config = Config()
+        control = TrajectoryLQRControl(config, UprightTrajectory(), solver='numpy')
+
+        simulator = CartPoleSimulator()
+        simulator.reset_to(config, State(pole_angle=math.pi + 0.1))
+        for tick in range(500):
+            state = simulator.get_state()
+            simulator.set_target(control(tick * 0.01, state))
+            simulator.advance(0.01)
+
+        state = simulator.get_state()
+        assert state.error == Error.NO_ERROR
+        assert abs(state.pole_angle - math.pi) < 0.01
+
+    def test_trajectory_import_names_drake(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, 'pydrake', None)
+        monkeypatch.delitem(sys.modules, 'cartpole.control.trajectory', raising=False)
+        with pytest.raises(ImportError, match='pydrake'):
+            cartpole.control.Trajectory
@@ -6,13 +6,53 @@ from pydrake.systems.trajectory_optimization import DirectCollocation
 from pydrake.trajectories import PiecewisePolynomial
 
 from cartpole.common import Config, Error, State
+from cartpole.common.util import content_hash, get_cache_dir
 from cartpole.simulator.pydrake.system import CartPoleSystem
 
+from dataclasses import dataclass
+from typing import Optional
+
+import logging
 import math
 import numpy
+import os
+import tempfile
+import time
 
+log = logging.getLogger(__name__)
 
-def build_trajectory(config, initial_state, sample_n=100, max_duration=10):
+CACHE_NAME = 'trajectories'
+# Bump on any change of the collocation problem (costs, constraints, solver
+# options), so cached trajectories of the old problem are not loaded
+FORMULATION_VERSION = 1
+
+
+@dataclass
+class SolveStats:
+    success: bool
+    warm_start: bool
+    solve_time: float  # s
+    solver: str
+    # decision variable evaluations by the solver, None if not counted
+    evaluations: Optional[int] = None
+
+
+def solve_trajectory(
+        config,
+        initial_state,
+        sample_n=100,
+        max_duration=10,
+        initial_guess=None,
+        count_evaluations=False):
+    '''
+    Solves the swing-up problem with DirectCollocation. If initial_guess
+    (states, targets) is given, decision variables are seeded from it.
+    Returns states, targets and SolveStats.
+
+    Solvers used by Drake do not report iteration counts, so the work done
+    is measured by evaluations of decision variables, which costs a Python
+    callback per evaluation and is off by default.
+    '''
     system = CartPoleSystem()
     context = system.CreateContext(config, initial_state.as_array())
         
@@ -57,17 +97,209 @@ def build_trajectory(config, initial_state, sample_n=100, max_duration=10):
     # program.AddFinalCost(u**2)
     program.AddFinalCost(x**2)
 
+    if initial_guess is not None:
+        states, targets = initial_guess
+        program.SetInitialTrajectory(targets, states)
+
+    evaluations = 0
+
+    def count_evaluation(_):
+        nonlocal evaluations
+        evaluations += 1
+
+    if count_evaluations:
+        program.prog().AddVisualizationCallback(count_evaluation, program.initial_state())
+
+    start = time.perf_counter()
     result = Solve(program.prog())
-    assert result.is_success(), 'Impossible find trajectory'
-    
+    stats = SolveStats(
+        success=result.is_success(),
+        warm_start=initial_guess is not None,
+        solve_time=time.perf_counter() - start,
+        solver=result.get_solver_id().name(),
+        evaluations=evaluations if count_evaluations else None,
+    )
+    log.debug('Trajectory solve: %s', stats)
+
     targets = program.ReconstructInputTrajectory(result)
     states = program.ReconstructStateTrajectory(result)
+
+    return states, targets, stats
+
+
+def build_trajectory(config, initial_state, sample_n=100, max_duration=10):
+    states, targets, stats = solve_trajectory(config, initial_state, sample_n, max_duration)
+    assert stats.success, 'Impossible find trajectory'
     
     return states, targets
 
+
+@dataclass
+class LibraryEntry:
+    config: Config
+    initial_state: State
+    sample_n: int
+    max_duration: float
+    states: PiecewisePolynomial
+    targets: PiecewisePolynomial
+
+
+class TrajectoryLibrary:
+    '''
+    Solved trajectories, used to warm start solves of similar problems.
+
+    Distance between problems is a weighted euclidean distance between
+    their initial states (angles are wrapped) and physical parameters,
+    only problems with the same sample_n and max_duration are compared.
+    '''
+
+    def __init__(
+            self,
+            max_distance=1.0,
+            state_weights=(10.0, 1.0, 1.0, 0.1),
+            pole_length_weight=10.0,
+            count_evaluations=False):
+        self.max_distance = max_distance
+        self.state_weights = numpy.array(state_weights)
+        self.pole_length_weight = pole_length_weight
+        self.count_evaluations = count_evaluations
+        self.entries = []
+        self.history = []
+
+    def distance(self, entry, config, initial_state):
+        delta = initial_state.as_array() - entry.initial_state.as_array()
+        delta[1] = math.remainder(delta[1], 2 * math.pi)
+        delta_length = config.pole_length - entry.config.pole_length
+        return math.sqrt(
+            numpy.sum((self.state_weights * delta)**2) +
+            (self.pole_length_weight * delta_length)**2
+        )
+
+    def nearest(self, config, initial_state, sample_n, max_duration):
+        candidates = [
+            (self.distance(entry, config, initial_state), index)
+            for index, entry in enumerate(self.entries)
+            if entry.sample_n == sample_n and entry.max_duration == max_duration
+        ]
+        if not candidates:
+            return None
+
+        distance, index = min(candidates)
+        return self.entries[index] if distance <= self.max_distance else None
+
+    def add(self, config, initial_state, sample_n, max_duration, states, targets):
+        self.entries.append(LibraryEntry(
+            config, initial_state, sample_n, max_duration, states, targets))
+
+    def plan(self, config, initial_state, sample_n=100, max_duration=10):
+        '''
+        Solves the problem warm started from the nearest solved one (if any),
+        falls back to a cold solve if the warm one fails. Solution is added
+        to the library, stats of all solves are kept in history.
+        '''
+        nearest = self.nearest(config, initial_state, sample_n, max_duration)
+        if nearest is not None:
+            guess = (nearest.states, nearest.targets)
+            states, targets, stats = solve_trajectory(
+                config, initial_state, sample_n, max_duration,
+                initial_guess=guess, count_evaluations=self.count_evaluations)
+            self.history.append(stats)
+            if stats.success:
+                self.add(config, initial_state, sample_n, max_duration, states, targets)
+                return states, targets, stats
+            log.warning('Warm started solve failed, solving from scratch')
+
+        states, targets, stats = solve_trajectory(
+            config, initial_state, sample_n, max_duration,
+            count_evaluations=self.count_evaluations)
+        self.history.append(stats)
+        assert stats.success, 'Impossible find trajectory'
+        self.add(config, initial_state, sample_n, max_duration, states, targets)
+
+        return states, targets, stats
+
+    def report(self):
+        '''
+        Mean solve time (and evaluations, if counted) of cold and warm
+        started solves.
+        '''
+        report = {}
+        for warm_start, name in ((False, 'cold'), (True, 'warm')):
+            solves = [stats for stats in self.history if stats.warm_start == warm_start]
+            if solves:
+                report[name] = {
+                    'solves': len(solves),
+                    'success_rate': sum(stats.success for stats in solves) / len(solves),
+                    'solve_time': sum(stats.solve_time for stats in solves) / len(solves),
+                }
+                if self.count_evaluations:
+                    report[name]['evaluations'] = sum(stats.evaluations for stats in solves) / len(solves)
+        return report
+
+
+def trajectory_key(config, initial_state, sample_n, max_duration):
+    return content_hash(FORMULATION_VERSION, config, initial_state.as_tuple(), sample_n, max_duration)
+
+
+def save_trajectory(path, states, targets):
+    '''
+    Stores knot points of trajectories reconstructed by DirectCollocation:
+    states are cubic Hermite splines and targets are first order holds,
+    so breaks, samples and state derivatives define them exactly.
+    '''
+    breaks = numpy.array(states.get_segment_times())
+    arrays = dict(
+        breaks=breaks,
+        state_samples=states.vector_values(breaks),
+        state_derivatives=states.derivative(1).vector_values(breaks),
+        target_samples=targets.vector_values(breaks),
+    )
+
+    # Write to temporary file first, so parallel readers never see partial data
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            numpy.savez(file, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_trajectory(path):
+    with numpy.load(path) as data:
+        breaks = data['breaks']
+        states = PiecewisePolynomial.CubicHermite(
+            breaks, data['state_samples'], data['state_derivatives'])
+        targets = PiecewisePolynomial.FirstOrderHold(breaks, data['target_samples'])
+
+    return states, targets
+
+
+def cached_build_trajectory(config, initial_state, sample_n=100, max_duration=10, cache_dir=None):
+    '''
+    Same as build_trajectory, but solutions are stored on disk and keyed by
+    hash of all the arguments, so repeat runs load them instead of solving.
+    '''
+    cache_dir = cache_dir or get_cache_dir(CACHE_NAME)
+    key = trajectory_key(config, initial_state, sample_n, max_duration)
+    path = os.path.join(cache_dir, f'{key}.npz')
+
+    if os.path.exists(path):
+        log.debug('Load trajectory %s', key)
+        return load_trajectory(path)
+
+    states, targets = build_trajectory(config, initial_state, sample_n, max_duration)
+    save_trajectory(path, states, targets)
+    log.debug('Save trajectory %s', key)
+
+    return states, targets
+
+
 class Trajectory:
-    def __init__(self, config, initial_state, sample_n=100, max_duration=5):
-        states, targets = build_trajectory(config, initial_state, sample_n, max_duration)
+    def __init__(self, config, initial_state, sample_n=100, max_duration=5, cache=True):
+        build = cached_build_trajectory if cache else build_trajectory
+        states, targets = build(config, initial_state, sample_n, max_duration)
         self.states = states
         self.targets = targets
         self.duration = targets.end_time() - targets.start_time()
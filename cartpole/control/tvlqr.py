@@ -0,0 +1,89 @@
+import numpy
+
+from cartpole.control.lookup import TrajectoryTable
+from cartpole.control.model import Model
+
+DEFAULT_Q = numpy.diag([1.0, 1, 1, 1])
+DEFAULT_R = numpy.diag([1.0])
+
+
+def discretize(A, B, dt):
+    '''
+    Second order discretization of continuous dynamics stacks A (Nx4x4),
+    B (Nx4x1) with step dt: Ad = I + A dt + A^2 dt^2/2, Bd = (I dt + A dt^2/2) B.
+    '''
+    eye = numpy.eye(A.shape[-1])
+    A2 = A @ A
+    Ad = eye + A * dt + A2 * (dt * dt / 2)
+    Bd = (eye * dt + A * (dt * dt / 2)) @ B
+    return Ad, Bd
+
+
+def riccati(Ad, Bd, Q, R, Qf):
+    '''
+    Discrete Riccati backward pass over stacks Ad (NxSxS), Bd (NxSxM), returns
+    gains K (NxMxS) such that u_k = -K_k e_k minimizes
+    sum(e'Q e + u'R u) + e_N' Qf e_N.
+    '''
+    n, s, m = Bd.shape
+    K = numpy.empty((n, m, s))
+
+    # Buffers are reused by every step of the pass
+    P = numpy.array(Qf, dtype=numpy.float64)
+    PA = numpy.empty((s, s))
+    PB = numpy.empty((s, m))
+    S = numpy.empty((m, m))
+    closed = numpy.empty((s, s))
+
+    for k in range(n - 1, -1, -1):
+        A, B = Ad[k], Bd[k]
+        numpy.matmul(P, A, out=PA)
+        numpy.matmul(P, B, out=PB)
+        numpy.matmul(B.T, PB, out=S)
+        S += R
+        K[k] = numpy.linalg.solve(S, B.T @ PA)
+
+        # P = Q + A'P (A - B K)
+        numpy.matmul(B, K[k], out=closed)
+        numpy.subtract(A, closed, out=closed)
+        numpy.matmul(PA.T, closed, out=P)
+        P += Q
+        # Keep P symmetric against round-off
+        P += P.T
+        P *= 0.5
+
+    return K
+
+
+def tvlqr(config, step, states, targets, Q=DEFAULT_Q, R=DEFAULT_R, Qf=None):
+    '''
+    Time-varying LQR gains (Nx4) along a trajectory sampled with uniform step:
+    states (Nx4) and targets (N). Q and R are weights of the continuous time
+    cost, as in FiniteHorizonLinearQuadraticRegulator, Qf defaults to Q.
+    '''
+    Qf = Q if Qf is None else Qf
+    A, B = Model(config).linearize_batch(states, targets)
+    Ad, Bd = discretize(A, B, step)
+    K = riccati(Ad, Bd, Q * step, R * step, Qf)
+    return K[:, 0, :]
+
+
+def tvlqr_table(config, start, step, states, targets, Q=DEFAULT_Q, R=DEFAULT_R, Qf=None):
+    '''
+    Same as tvlqr, but returns gains together with the trajectory as TrajectoryTable.
+    '''
+    gains = tvlqr(config, step, states, targets, Q, R, Qf)
+    return TrajectoryTable.from_arrays(start, step, states, targets, gains)
+
+
+class TVLQRControl:
+    '''
+    Drake-free trajectory tracking with time-varying LQR, the trajectory is
+    given by uniform samples of states (Nx4) and targets (N) from start.
+    '''
+
+    def __init__(self, config, start, step, states, targets, Q=DEFAULT_Q, R=DEFAULT_R, Qf=None):
+        self.table = tvlqr_table(config, start, step, states, targets, Q, R, Qf)
+
+    def __call__(self, stamp, state):
+        return self.table.control(stamp, state.as_tuple())
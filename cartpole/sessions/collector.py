@@ -156,7 +156,7 @@ class CollectorProxy(CartPoleBase):
             action = stack[1][3] if stack[1][3] != '__enter__' else stack[2][3]
         trace = SessionData.TimeTrace(action=action, start_timestamp=self._timestamp())
         yield trace
-        trace.finish_timestamp = self._timestamp()
+        trace.end_timestamp = self._timestamp()
         self.data.time_traces.append(trace)
 
     def _add_value(self, key, x, y):
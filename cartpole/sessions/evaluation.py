@@ -0,0 +1,258 @@
+import dataclasses as dc
+import itertools
+import logging
+import math
+import multiprocessing as mp
+import os
+import random
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Type, Union
+
+import numpy as np
+
+from cartpole.common.interface import CartPoleBase, Config, Error, State
+from cartpole.common.util import reward
+from cartpole.sessions.actor import Actor
+
+
+LOGGER = logging.getLogger(__name__)
+BACKENDS = ('pydrake', 'pytorch', 'numpy')
+COLUMNS = (
+    'episode', 'config_index', 'seed',
+    'initial_position', 'initial_angle', 'initial_velocity', 'initial_angular_velocity',
+    'success', 'time_to_balance', 'max_abs_position', 'reward', 'error', 'duration',
+)
+
+
+@dc.dataclass
+class Episode:
+    index: int
+    config_index: int
+    config: Config
+    initial_state: State
+    seed: int
+
+
+@dc.dataclass
+class EvaluationSettings:
+    duration: float = 10.0  # s
+    step: float = 0.01  # s
+    # pole is balanced if it is within tolerance of upright pose
+    angle_tolerance: float = 0.1  # rad
+    angular_velocity_tolerance: float = 1.0  # rad/s
+
+
+def make_device(backend: str) -> CartPoleBase:
+    if backend == 'pydrake':
+        from cartpole.simulator.pydrake import CartPoleSimulator
+        return CartPoleSimulator()
+    if backend == 'pytorch':
+        from cartpole.simulator.pytorch.simulator import CartPoleSimulator
+        return CartPoleSimulator()
+    if backend == 'numpy':
+        from cartpole.simulator.numpy_rk4 import CartPoleSimulator
+        return CartPoleSimulator()
+    raise ValueError(f'Unknown backend {backend}, expected one of {BACKENDS}')
+
+
+def check_step(backend: str, step: float) -> None:
+    '''
+    Raises ValueError if the backend can not run control steps of the given
+    length. The pytorch engine integrates whole simulation steps, a shorter
+    remainder would make episodes use a different integration step.
+    '''
+    if not step > 0:
+        raise ValueError(f'Step must be positive, got {step}')
+    if backend != 'pytorch':
+        return
+
+    from cartpole.simulator.pytorch.config import DiscretizationParameters
+    step_n = DiscretizationParameters().simulation_step_n
+    substeps = step * step_n
+    if round(substeps) < 1 or not math.isclose(substeps, round(substeps)):
+        raise ValueError(f'Step {step}s is not a multiple of the pytorch simulation step 1/{step_n}s')
+
+
+def episode_matrix(
+        initial_states: Iterable[State],
+        configs: Iterable[Config],
+        seeds: Iterable[int]) -> List[Episode]:
+    '''
+    Returns all combinations of initial states, configs and seeds.
+    '''
+    configs = list(enumerate(configs))
+    product = itertools.product(initial_states, configs, seeds)
+    return [
+        Episode(index, config_index, config, dc.replace(state), seed)
+        for index, (state, (config_index, config), seed) in enumerate(product)
+    ]
+
+
+def is_balanced(state: State, settings: EvaluationSettings) -> bool:
+    angle = math.remainder(state.pole_angle - math.pi, 2 * math.pi)
+    return (
+        abs(angle) < settings.angle_tolerance
+        and abs(state.pole_angular_velocity) < settings.angular_velocity_tolerance
+    )
+
+
+def run_episode(
+        device: CartPoleBase,
+        actor: Actor,
+        episode: Episode,
+        settings: EvaluationSettings) -> Dict[str, float]:
+    '''
+    Runs one closed-loop episode and returns its metrics:
+    * success - no error happened and the pole is balanced at the end
+    * time_to_balance - time after which the pole stays balanced (nan if never)
+    * max_abs_position - maximum |x| over the episode
+    * reward - sum of cartpole.common.util.reward over steps
+    '''
+    random.seed(episode.seed)
+    np.random.seed(episode.seed)
+
+    device.reset_to(episode.config, episode.initial_state)
+    state = device.get_state()
+    balanced_since = None
+    max_abs_position = abs(state.cart_position)
+    total_reward = 0.0
+    steps = int(round(settings.duration / settings.step))
+    stamp = 0.0
+
+    for step in range(steps):
+        stamp = step * settings.step
+        device.set_target(actor(state, stamp=stamp))
+        device.advance(settings.step)
+        state = device.get_state()
+        stamp = (step + 1) * settings.step
+
+        max_abs_position = max(max_abs_position, abs(state.cart_position))
+        total_reward += reward(state)
+        if state.error:
+            break
+
+        if is_balanced(state, settings):
+            balanced_since = stamp if balanced_since is None else balanced_since
+        else:
+            balanced_since = None
+
+    error = Error(state.error)
+    return {
+        'success': not error and balanced_since is not None,
+        'time_to_balance': balanced_since if balanced_since is not None and not error else math.nan,
+        'max_abs_position': max_abs_position,
+        'reward': total_reward,
+        'error': int(error),
+        'duration': stamp,
+    }
+
+
+def to_columns(rows: List[Dict[str, float]]) -> Dict[str, np.ndarray]:
+    rows = sorted(rows, key=lambda row: row['episode'])
+    return {name: np.array([row[name] for row in rows]) for name in COLUMNS}
+
+
+def save_columns(path: Union[str, Path], rows: List[Dict[str, float]]) -> None:
+    columns = to_columns(rows)
+    tmp = Path(str(path) + '.tmp.npz')
+    np.savez(tmp, **columns)
+    os.replace(tmp, path)
+
+
+def load_columns(paths: Iterable[Union[str, Path]]) -> Dict[str, np.ndarray]:
+    '''
+    Loads and concatenates columnar result files, sorted by episode.
+    '''
+    parts = [dict(np.load(path)) for path in paths]
+    if not parts:
+        return {name: np.array([]) for name in COLUMNS}
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+    order = np.argsort(columns['episode'], kind='stable')
+    return {name: column[order] for name, column in columns.items()}
+
+
+def _run_shard(
+        shard: int,
+        episodes: List[Episode],
+        backend: str,
+        actor_class: Type[Actor],
+        actor_config: dict,
+        settings: EvaluationSettings,
+        output: Optional[str]) -> List[Dict[str, float]]:
+    # Device is created once per shard and reset for every episode
+    device = make_device(backend)
+    rows = []
+    for episode in episodes:
+        actor = actor_class(**actor_config)
+        metrics = run_episode(device, actor, episode, settings)
+        state = episode.initial_state
+        rows.append(dict(
+            episode=episode.index,
+            config_index=episode.config_index,
+            seed=episode.seed,
+            initial_position=state.cart_position,
+            initial_angle=state.pole_angle,
+            initial_velocity=state.cart_velocity,
+            initial_angular_velocity=state.pole_angular_velocity,
+            **metrics,
+        ))
+    device.close()
+
+    if output is not None:
+        save_columns(Path(output) / f'part-{shard:05d}.npz', rows)
+    return rows
+
+
+def _run_shard_args(args) -> List[Dict[str, float]]:
+    return _run_shard(*args)
+
+
+def evaluate(
+        episodes: List[Episode],
+        actor_class: Type[Actor],
+        actor_config: Optional[dict] = None,
+        backend: str = 'pytorch',
+        settings: Optional[EvaluationSettings] = None,
+        workers: Optional[int] = None,
+        shard_size: int = 16,
+        output: Optional[Union[str, Path]] = None) -> Dict[str, np.ndarray]:
+    '''
+    Runs episodes over a process pool and returns metrics as columns
+    (see COLUMNS), one row per episode.
+
+    Episodes are split into shards of shard_size, each shard is run by one
+    worker. If output directory is given, results of every shard are written
+    there as soon as it is done (part-*.npz), and merged into results.npz
+    at the end. Actor class and config must be picklable.
+    '''
+    actor_config = actor_config or {}
+    settings = settings or EvaluationSettings()
+    workers = workers or os.cpu_count() or 1
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown backend {backend}, expected one of {BACKENDS}')
+    check_step(backend, settings.step)
+
+    if output is not None:
+        output = Path(output)
+        output.mkdir(parents=True, exist_ok=True)
+
+    shards = [
+        (shard, episodes[begin:begin + shard_size], backend,
+         actor_class, actor_config, settings, None if output is None else str(output))
+        for shard, begin in enumerate(range(0, len(episodes), shard_size))
+    ]
+
+    rows = []
+    if workers == 1:
+        results = map(_run_shard_args, shards)
+        rows = [row for shard_rows in results for row in shard_rows]
+    else:
+        with mp.get_context('spawn').Pool(workers) as pool:
+            # Shards are collected as soon as they are done
+            for shard_rows in pool.imap_unordered(_run_shard_args, shards):
+                rows.extend(shard_rows)
+                LOGGER.info('Evaluated %d/%d episodes', len(rows), len(episodes))
+
+    if output is not None:
+        save_columns(output / 'results.npz', rows)
+    return to_columns(rows)
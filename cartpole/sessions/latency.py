@@ -0,0 +1,200 @@
+import bisect
+import collections
+import dataclasses as dc
+from typing import Dict, Iterable, List, Optional, Sequence, Type
+
+import numpy as np
+
+from cartpole.common.interface import CartPoleBase, Config, State
+from cartpole.sessions.actor import Actor
+from cartpole.sessions.collector import SessionData
+from cartpole.sessions.evaluation import EvaluationSettings, Episode, make_device, run_episode
+
+
+class Delay:
+    '''
+    Random delay in seconds: base + uniform(0, jitter), or a sample of
+    recorded delays if samples are given.
+    '''
+
+    def __init__(self, base: float = 0.0, jitter: float = 0.0, samples: Sequence[float] = None, seed: int = None):
+        self.base = base
+        self.jitter = jitter
+        self.samples = None if samples is None else np.asarray(samples, dtype=float)
+        self.rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def from_session(data: SessionData, action: str, seed: int = None) -> 'Delay':
+        '''
+        Recorded distribution of durations of the given action (e.g. get_state)
+        from session time traces.
+        '''
+        samples = []
+        for trace in data.time_traces:
+            if trace.action == action and trace.end_timestamp is not None:
+                samples.append((trace.end_timestamp - trace.start_timestamp) / 1e6)  # us -> s
+        assert samples, f'no time traces of {action}'
+        return Delay(samples=samples, seed=seed)
+
+    def sample(self) -> float:
+        if self.samples is not None:
+            return float(self.rng.choice(self.samples))
+        if self.jitter > 0:
+            return self.base + float(self.rng.uniform(0, self.jitter))
+        return self.base
+
+
+class LatencyProxy(CartPoleBase):
+    '''
+    Emulates the I/O path of the real device for a simulator: get_state
+    returns the state observed `sensing` delay ago, set_target is applied
+    `actuation` delay later. Commands keep their order, as on a serial link.
+
+    States are recorded at every advance and command, so sensing delay has
+    the resolution of the control loop step unless `resolution` is given.
+    Ticks are split at actuation times, so the simulator must advance by
+    arbitrary deltas, not only by whole simulation steps.
+    '''
+
+    def __init__(
+            self,
+            cart_pole: CartPoleBase,
+            sensing: Delay = None,
+            actuation: Delay = None,
+            resolution: float = None,
+            history: float = 1.0):
+        '''
+        resolution - maximum time between recorded states, s
+        history - how long recorded states are kept, s
+        '''
+        self.cart_pole = cart_pole
+        self.sensing = sensing or Delay()
+        self.actuation = actuation or Delay()
+        self.resolution = resolution
+        self.history = history
+        self._start()
+
+    def _start(self):
+        self._stamps = collections.deque()
+        self._states = collections.deque()
+        self._pending = collections.deque()  # (apply time, target)
+        self._target = 0.0
+
+    def _record(self):
+        now = self.cart_pole.timestamp()
+        self._stamps.append(now)
+        self._states.append(self.cart_pole.get_state())
+        while self._stamps and self._stamps[0] < now - self.history:
+            self._stamps.popleft()
+            self._states.popleft()
+
+    def reset(self, config: Config) -> None:
+        self.cart_pole.reset(config)
+        self._start()
+        self._record()
+
+    def reset_to(self, config: Config, state: State) -> None:
+        self.cart_pole.reset_to(config, state)
+        self._start()
+        self._record()
+
+    def get_state(self) -> State:
+        # Tolerance keeps states recorded exactly at the observed time
+        observed = self.cart_pole.timestamp() - self.sensing.sample() + 1e-9
+        index = bisect.bisect_right(self._stamps, observed) - 1
+        return self._states[max(index, 0)]
+
+    def get_info(self) -> dict:
+        return self.cart_pole.get_info()
+
+    def get_target(self) -> float:
+        return self._target
+
+    def set_target(self, target: float) -> None:
+        self._target = target
+        apply_at = self.cart_pole.timestamp() + self.actuation.sample()
+        if self._pending:
+            apply_at = max(apply_at, self._pending[-1][0])
+        self._pending.append((apply_at, target))
+
+    def _advance_to(self, stamp: float) -> None:
+        while True:
+            delta = stamp - self.cart_pole.timestamp()
+            if delta <= 1e-12:
+                return
+            if self.resolution is not None:
+                delta = min(delta, self.resolution)
+            self.cart_pole.advance(delta)
+            self._record()
+            if self.cart_pole.get_state().error:
+                return
+
+    def advance(self, delta: float = None) -> None:
+        end = self.cart_pole.timestamp() + delta
+        while self._pending and self._pending[0][0] <= end:
+            apply_at, target = self._pending.popleft()
+            self._advance_to(apply_at)
+            self.cart_pole.set_target(target)
+            self._record()
+        self._advance_to(end)
+
+    def timestamp(self):
+        return self.cart_pole.timestamp()
+
+    def close(self) -> None:
+        self.cart_pole.close()
+
+
+def latency_sweep(
+        actor_class: Type[Actor],
+        actor_config: dict,
+        delays: Iterable[float],
+        initial_states: List[State],
+        config: Config = None,
+        seeds: Iterable[int] = (0,),
+        jitter: float = 0.0,
+        sensing_ratio: float = 0.5,
+        backend: str = 'numpy',
+        settings: EvaluationSettings = None) -> List[Dict[str, float]]:
+    '''
+    Evaluates an actor for every round-trip delay (split between sensing
+    and actuation by sensing_ratio) and returns success rate per delay.
+    '''
+    config = config or Config()
+    settings = settings or EvaluationSettings()
+    seeds = list(seeds)
+    rows = []
+
+    for delay in delays:
+        results = []
+        for index, state in enumerate(initial_states):
+            for seed in seeds:
+                device = LatencyProxy(
+                    make_device(backend),
+                    sensing=Delay(delay * sensing_ratio, jitter * sensing_ratio, seed=seed),
+                    actuation=Delay(delay * (1 - sensing_ratio), jitter * (1 - sensing_ratio), seed=seed + 1),
+                )
+                episode = Episode(index, 0, config, dc.replace(state), seed)
+                results.append(run_episode(device, actor_class(**actor_config), episode, settings))
+
+        rows.append({
+            'delay': delay,
+            'success_rate': float(np.mean([result['success'] for result in results])),
+            'time_to_balance': float(np.nanmean([result['time_to_balance'] for result in results]))
+                if any(result['success'] for result in results) else float('nan'),
+            'max_abs_position': float(np.max([result['max_abs_position'] for result in results])),
+        })
+
+    return rows
+
+
+def tolerated_delay(rows: List[Dict[str, float]], min_success_rate: float = 1.0) -> Optional[float]:
+    '''
+    Largest delay such that the actor succeeds at it and all smaller delays.
+    '''
+    tolerated = None
+    for row in sorted(rows, key=lambda row: row['delay']):
+        if row['success_rate'] < min_success_rate:
+            break
+        tolerated = row['delay']
+    return tolerated
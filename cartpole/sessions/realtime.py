@@ -0,0 +1,140 @@
+import dataclasses as dc
+import logging
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from cartpole.common.interface import CartPoleBase, Config, State
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dc.dataclass
+class TickStats:
+    '''
+    Per-tick timing of a paced loop, seconds.
+    slack - time left before the deadline when advance was called
+    (negative on overrun), elapsed - simulated time advanced by the tick.
+    '''
+    period: float
+    slack: List[float] = dc.field(default_factory=list)
+    elapsed: List[float] = dc.field(default_factory=list)
+
+    @property
+    def ticks(self) -> int:
+        return len(self.slack)
+
+    @property
+    def overruns(self) -> int:
+        return sum(1 for slack in self.slack if slack < 0)
+
+    def report(self) -> Dict[str, float]:
+        if not self.slack:
+            return {'ticks': 0, 'overruns': 0}
+
+        slack = np.array(self.slack)
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'overrun_ratio': self.overruns / self.ticks,
+            'max_overrun': float(max(0.0, -slack.min())),
+            'slack_p1': float(np.percentile(slack, 1)),
+            'slack_p50': float(np.percentile(slack, 50)),
+            # fraction of the period used by the controller at p99
+            'load_p99': float(1 - np.percentile(slack, 1) / self.period),
+        }
+
+
+class RealTimeProxy(CartPoleBase):
+    '''
+    Paces any CartPoleBase to the wall clock: advance(delta) returns when
+    delta seconds have passed since the previous tick, and simulated time
+    follows the wall clock.
+
+    If the controller overruns its budget, the tick is late: the simulation
+    is advanced by the whole elapsed wall time with the last target, as the
+    real cart would move. Slack of every tick is recorded in `stats`.
+    For CartPoleDevice, whose advance does nothing, the proxy only paces.
+    '''
+
+    def __init__(
+            self,
+            cart_pole: CartPoleBase,
+            period: float = 0.01,
+            spin: float = 2e-4,
+            clock: Callable[[], float] = time.perf_counter,
+            sleep: Callable[[float], None] = time.sleep):
+        '''
+        period - default tick length, s
+        spin - the last part of a wait is busy-waiting, as sleep is coarse
+        '''
+        self.cart_pole = cart_pole
+        self.period = period
+        self.spin = spin
+        self.clock = clock
+        self.sleep = sleep
+        self.stats = TickStats(period)
+        self._last_tick = None
+
+    def reset(self, config: Config) -> None:
+        self.cart_pole.reset(config)
+        self._start()
+
+    def reset_to(self, config: Config, state: State) -> None:
+        self.cart_pole.reset_to(config, state)
+        self._start()
+
+    def _start(self):
+        self.stats = TickStats(self.period)
+        self._last_tick = self.clock()
+
+    def get_state(self) -> State:
+        return self.cart_pole.get_state()
+
+    def get_info(self) -> dict:
+        info = self.cart_pole.get_info()
+        info['realtime'] = self.stats.report()
+        return info
+
+    def get_target(self) -> float:
+        return self.cart_pole.get_target()
+
+    def set_target(self, target: float) -> None:
+        self.cart_pole.set_target(target)
+
+    def _wait(self, deadline: float) -> None:
+        remaining = deadline - self.clock()
+        if remaining > self.spin:
+            self.sleep(remaining - self.spin)
+        while self.clock() < deadline:
+            pass
+
+    def advance(self, delta: float = None) -> None:
+        delta = self.period if delta is None else delta
+        assert self._last_tick is not None, 'reset must be called first'
+
+        deadline = self._last_tick + delta
+        slack = deadline - self.clock()
+        if slack > 0:
+            self._wait(deadline)
+            elapsed = delta
+        else:
+            elapsed = delta - slack
+            LOGGER.debug('tick overrun by %.6f s', -slack)
+
+        self.stats.slack.append(slack)
+        self.stats.elapsed.append(elapsed)
+        self._last_tick += elapsed
+        self.cart_pole.advance(elapsed)
+
+    def timestamp(self):
+        return self.cart_pole.timestamp()
+
+    def close(self) -> None:
+        report = self.stats.report()
+        if report['overruns']:
+            LOGGER.warning('%d of %d ticks overran, max by %.6f s',
+                report['overruns'], report['ticks'], report['max_overrun'])
+        self.cart_pole.close()
@@ -0,0 +1,80 @@
+import math
+
+import numpy as np
+import pytest
+
+from cartpole.common.interface import Config, State
+from cartpole.sessions.actor import Actor
+from cartpole.sessions.evaluation import (
+    COLUMNS,
+    EvaluationSettings,
+    check_step,
+    episode_matrix,
+    evaluate,
+    load_columns,
+)
+
+
+class ConstantActor(Actor):
+    def __init__(self, target=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.target = target
+
+    def __call__(self, state, stamp=None):
+        return self.target
+
+
+class TestEvaluation:
+    def test_upright_pole_is_balanced(self, tmp_path):
+        episodes = episode_matrix(
+            initial_states=[State(pole_angle=math.pi), State(pole_angle=math.pi - 1)],
+            configs=[Config(), Config(pole_length=0.5)],
+            seeds=[0, 1],
+        )
+        settings = EvaluationSettings(duration=0.2)
+
+        results = evaluate(
+            episodes,
+            ConstantActor,
+            settings=settings,
+            workers=2,
+            shard_size=3,
+            output=tmp_path,
+        )
+        assert set(results) == set(COLUMNS)
+        assert list(results['episode']) == list(range(8))
+
+        # Upright pole stays balanced for a short while, tilted one does not
+        upright = results['initial_angle'] == math.pi
+        assert results['success'][upright].all()
+        assert (results['time_to_balance'][upright] <= settings.step + 1e-9).all()
+        assert not results['success'][~upright].any()
+        assert np.isnan(results['time_to_balance'][~upright]).all()
+
+        parts = load_columns(sorted(tmp_path.glob('part-*.npz')))
+        merged = load_columns([tmp_path / 'results.npz'])
+        for name in COLUMNS:
+            assert np.array_equal(parts[name], merged[name], equal_nan=True)
+
+    def test_overflow_stops_episode(self):
+        episodes = episode_matrix([State()], [Config()], [0])
+        results = evaluate(
+            episodes,
+            ConstantActor,
+            actor_config=dict(target=5.0),
+            settings=EvaluationSettings(duration=2.0),
+            workers=1,
+        )
+        assert not results['success'][0]
+        assert results['error'][0] != 0
+        assert results['duration'][0] < 2.0
+
+    def test_step_is_checked_against_backend(self):
+        episodes = episode_matrix([State()], [Config()], [0])
+        for step in (0.005, 0.015, 0.0):
+            with pytest.raises(ValueError):
+                evaluate(episodes, ConstantActor, backend='pytorch', settings=EvaluationSettings(step=step), workers=1)
+
+        check_step('pytorch', 0.02)
+        check_step('pytorch', 0.07)
+        check_step('numpy', 0.015)
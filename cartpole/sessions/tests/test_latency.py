@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from cartpole.common.interface import Config, State
+from cartpole.sessions.actor import Actor
+from cartpole.sessions.collector import CollectorProxy, SessionData
+from cartpole.sessions.evaluation import EvaluationSettings, make_device
+from cartpole.sessions.latency import Delay, LatencyProxy, latency_sweep, tolerated_delay
+from cartpole.simulator.numpy_rk4 import CartPoleSimulator
+
+
+class UprightActor(Actor):
+    '''PD controller of the pole angle around the upright pose'''
+
+    def __init__(self, gravity=9.8, **kwargs):
+        super().__init__(**kwargs)
+        self.gravity = gravity
+
+    def __call__(self, state, stamp=None):
+        error = math.remainder(state.pole_angle - math.pi, 2 * math.pi)
+        return -(self.gravity + 20) * error - 3 * state.pole_angular_velocity
+
+
+class TestDelay:
+    def test_from_saved_session(self, tmp_path):
+        proxy = CollectorProxy(CartPoleSimulator(), UprightActor, {})
+        proxy.reset(Config())
+        for _ in range(5):
+            proxy.get_state()
+            proxy.advance(0.01)
+        proxy.close()
+        path = proxy.save(tmp_path / 'session.json')
+
+        data = SessionData.load(path)
+        traces = [trace for trace in data.time_traces if trace.action == 'get_state']
+        assert len(traces) == 5
+        assert all(trace.end_timestamp >= trace.start_timestamp for trace in traces)
+
+        delay = Delay.from_session(data, 'get_state')
+        assert len(delay.samples) == 5
+        assert all(sample >= 0 for sample in delay.samples)
+
+
+class TestLatencyProxy:
+    def test_actuation_delay(self):
+        proxy = LatencyProxy(CartPoleSimulator(), actuation=Delay(0.02))
+        proxy.reset(Config())
+
+        proxy.set_target(1.0)
+        proxy.advance(0.05)
+        state = proxy.cart_pole.get_state()
+        assert state.cart_velocity == pytest.approx(0.03)
+
+    def test_sub_step_delay_matches_numpy(self):
+        # Cart motion does not depend on the pole model, so the backends agree
+        states = {}
+        for backend in ('numpy', 'pytorch'):
+            proxy = LatencyProxy(make_device(backend), actuation=Delay(0.005))
+            proxy.reset(Config())
+            proxy.set_target(1.0)
+            for _ in range(10):
+                proxy.advance(0.01)
+            assert proxy.timestamp() == pytest.approx(0.1)
+            states[backend] = proxy.cart_pole.get_state()
+
+        assert states['numpy'].cart_velocity == pytest.approx(0.095)
+        assert states['pytorch'].cart_velocity == pytest.approx(states['numpy'].cart_velocity, abs=1e-9)
+        assert states['pytorch'].cart_position == pytest.approx(states['numpy'].cart_position, abs=1e-9)
+
+    def test_sensing_delay(self):
+        proxy = LatencyProxy(CartPoleSimulator(), sensing=Delay(0.03))
+        proxy.reset_to(Config(), State(pole_angle=1.0))
+
+        states = []
+        for _ in range(10):
+            states.append(proxy.cart_pole.get_state())
+            proxy.advance(0.01)
+
+        assert proxy.get_state().pole_angle == states[-3].pole_angle
+
+    def test_sweep(self):
+        rows = latency_sweep(
+            UprightActor,
+            {},
+            delays=[0.0, 0.4],
+            initial_states=[State(pole_angle=math.pi - 0.1)],
+            settings=EvaluationSettings(duration=1.0),
+        )
+        assert [row['success_rate'] for row in rows] == [1.0, 0.0]
+        assert tolerated_delay(rows) == 0.0
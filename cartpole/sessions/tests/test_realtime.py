@@ -0,0 +1,55 @@
+import pytest
+
+from cartpole.common.interface import Config
+from cartpole.sessions.realtime import RealTimeProxy
+from cartpole.simulator.numpy_rk4 import CartPoleSimulator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        # Every reading takes a bit of time, so busy-waiting ends
+        self.now += 1e-6
+        return self.now
+
+    def sleep(self, duration):
+        self.now += duration
+
+
+class TestRealTimeProxy:
+    def test_slack_and_overruns(self):
+        clock = FakeClock()
+        simulator = CartPoleSimulator()
+        proxy = RealTimeProxy(simulator, period=0.01, clock=clock, sleep=clock.sleep)
+        proxy.reset(Config())
+
+        for compute in [0.002, 0.015, 0.004]:
+            clock.sleep(compute)
+            proxy.advance()
+
+        slack = proxy.stats.slack
+        assert slack[0] == pytest.approx(0.008, abs=1e-4)
+        assert slack[1] == pytest.approx(-0.005, abs=1e-4)
+        assert slack[2] == pytest.approx(0.006, abs=1e-4)
+
+        # Late tick advances the simulation by the whole elapsed time
+        assert proxy.stats.elapsed[1] == pytest.approx(0.015, abs=1e-4)
+        assert simulator.timestamp() == pytest.approx(0.035, abs=1e-4)
+        assert clock.now == pytest.approx(0.035, abs=1e-4)
+
+        report = proxy.stats.report()
+        assert report['ticks'] == 3
+        assert report['overruns'] == 1
+        assert report['max_overrun'] == pytest.approx(0.005, abs=1e-4)
+
+    def test_wall_clock_pacing(self):
+        proxy = RealTimeProxy(CartPoleSimulator(), period=0.005)
+        proxy.reset(Config())
+
+        start = proxy.clock()
+        for _ in range(10):
+            proxy.advance()
+
+        assert proxy.clock() - start >= 0.05
@@ -0,0 +1 @@
+from cartpole.simulator.numpy_rk4.simulator import CartPoleSimulator, MultiCartPoleSimulator
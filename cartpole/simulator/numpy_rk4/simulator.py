@@ -0,0 +1,242 @@
+from cartpole.common import CartPoleBase, Error, State
+
+import logging
+import math
+import numpy
+
+log = logging.getLogger('simulator')
+
+DEFAULT_STEP = 1e-3  # s
+
+
+def derivatives(q, u, g, l):
+    '''
+    Time derivative of states q = (x, a, v, w) with shape (4, ...) for inputs u,
+    same dynamics as cartpole.simulator.pydrake.system.CartPoleSystem.
+    '''
+    x, a, v, w = q
+    return numpy.stack([v, w, u, -(u * numpy.cos(a) + g * numpy.sin(a)) / l])
+
+
+def rk4_step(q, u, dt, g, l):
+    k1 = derivatives(q, u, g, l)
+    k2 = derivatives(q + dt / 2 * k1, u, g, l)
+    k3 = derivatives(q + dt / 2 * k2, u, g, l)
+    k4 = derivatives(q + dt * k3, u, g, l)
+    return q + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def substeps(delta, step):
+    '''
+    Splits delta into equal substeps not longer than step.
+    '''
+    n = max(1, math.ceil(delta / step - 1e-9))
+    return n, delta / n
+
+
+def clamp(value, limit):
+    if value > limit:
+        return limit, True
+
+    if value < -limit:
+        return -limit, True
+
+    return value, False
+
+
+class CartPoleSimulator(CartPoleBase):
+    '''
+    Description:
+        Simulation of the cart-pole device without Drake. Same dynamics,
+        Config limits and Error semantics as pydrake CartPoleSimulator.
+    Technical details:
+        Fixed-step RK4 integration with step not longer than `step` seconds.
+        A single cart is integrated with scalar math, which is faster than
+        numpy for 4 numbers. Use MultiCartPoleSimulator for many carts.
+    '''
+
+    def __init__(self, step=DEFAULT_STEP):
+        self.step = step
+        self.config = None
+        self.q = (0.0, 0.0, 0.0, 0.0)
+        self.time = 0.0
+        self.error = Error.NEED_RESET # Formally, we need reset env to reset error.
+        self.target_acceleration = 0
+
+    def reset_to(self, config, state):
+        self.config = config
+        self.q = tuple(float(value) for value in state.as_tuple())
+        self.time = 0.0
+        self.error = Error.NO_ERROR
+        self.target_acceleration = 0
+
+    def reset(self, config):
+        self.reset_to(config, State.home())
+
+    def get_state(self):
+        state = State.from_array(self.q)
+        state.error = self.error
+        state.cart_acceleration = self.target_acceleration
+        return state
+
+    def get_target(self):
+        return self.target_acceleration
+
+    def get_config(self):
+        assert self.config
+        return self.config
+
+    def set_target(self, target):
+        if self.error:
+            log.warning('set target, error=%s', self.error)
+            return
+
+        config = self.get_config()
+
+        self.target_acceleration, clamped = clamp(target, config.hard_max_acceleration)
+
+        if clamped:
+            self.error = Error.A_OVERFLOW
+            return
+
+        log.debug('set acc=%.2f', target)
+
+    def validate(self):
+        config = self.get_config()
+        x, _, v, _ = self.q
+
+        if abs(x) > config.hard_max_position:
+            self.error = Error.X_OVERFLOW
+            return False
+
+        if abs(v) > config.hard_max_velocity:
+            self.error = Error.V_OVERFLOW
+            return False
+
+        return True
+
+    def advance(self, delta):
+        if self.error:
+            log.warning('advance, error=%i', self.error)
+            return
+
+        config = self.get_config()
+        g, l = config.gravity, config.pole_length
+        u = self.target_acceleration
+        n, dt = substeps(delta, self.step)
+
+        def dw(a):
+            return -(u * math.cos(a) + g * math.sin(a)) / l
+
+        x, a, v, w = self.q
+        for _ in range(n):
+            dw1 = dw(a)
+            a2, w2 = a + dt / 2 * w, w + dt / 2 * dw1
+            dw2 = dw(a2)
+            a3, w3 = a + dt / 2 * w2, w + dt / 2 * dw2
+            dw3 = dw(a3)
+            a4, w4 = a + dt * w3, w + dt * dw3
+            dw4 = dw(a4)
+
+            x += dt * v + dt * dt / 2 * u
+            a += dt / 6 * (w + 2 * w2 + 2 * w3 + w4)
+            v += dt * u
+            w += dt / 6 * (dw1 + 2 * dw2 + 2 * dw3 + dw4)
+
+        self.q = (x, a, v, w)
+        self.time += delta
+
+        if not self.validate():
+            return
+
+    def timestamp(self):
+        return self.time
+
+    def get_info(self):
+        return {
+            'time': self.time,
+        }
+
+    def close(self):
+        pass
+
+
+class MultiCartPoleSimulator:
+    '''
+    Vectorized simulation of N independent carts with a shared Config.
+
+    States are stored as (4, N) array q = (x, a, v, w). Every cart has its own
+    error, carts with errors are frozen until reset, same as a single
+    CartPoleSimulator.
+    '''
+
+    def __init__(self, step=DEFAULT_STEP):
+        self.step = step
+        self.config = None
+        self.q = numpy.zeros((4, 0))
+        self.targets = numpy.zeros(0)
+        self.errors = numpy.zeros(0, dtype=int)
+        self.time = 0.0
+
+    @property
+    def size(self):
+        return self.q.shape[1]
+
+    def reset_to(self, config, states):
+        '''
+        Resets carts to states, given as (4, N) array or list of State.
+        '''
+        if not isinstance(states, numpy.ndarray):
+            states = numpy.array([state.as_tuple() for state in states]).T
+
+        assert states.ndim == 2 and states.shape[0] == 4, 'states must be (4, N) array'
+        self.config = config
+        self.q = states.astype(float)
+        self.targets = numpy.zeros(self.size)
+        self.errors = numpy.full(self.size, int(Error.NO_ERROR))
+        self.time = 0.0
+
+    def reset(self, config, n):
+        self.reset_to(config, numpy.zeros((4, n)))
+
+    def get_states(self):
+        states = []
+        for q, error, target in zip(self.q.T.tolist(), self.errors, self.targets):
+            state = State.from_array(q)
+            state.error = Error(error)
+            state.cart_acceleration = float(target)
+            states.append(state)
+        return states
+
+    def set_target(self, targets):
+        '''
+        Sets target accelerations of carts without errors.
+        '''
+        limit = self.config.hard_max_acceleration
+        targets = numpy.broadcast_to(numpy.asarray(targets, dtype=float), (self.size,))
+        active = self.errors == Error.NO_ERROR
+
+        clamped = active & (numpy.abs(targets) > limit)
+        self.targets = numpy.where(active, numpy.clip(targets, -limit, limit), self.targets)
+        self.errors[clamped] = Error.A_OVERFLOW
+
+    def advance(self, delta):
+        config = self.config
+        active = self.errors == Error.NO_ERROR
+        n, dt = substeps(delta, self.step)
+
+        q = self.q[:, active]
+        u = self.targets[active]
+        for _ in range(n):
+            q = rk4_step(q, u, dt, config.gravity, config.pole_length)
+        self.q[:, active] = q
+        self.time += delta
+
+        # V_OVERFLOW is set first, so X_OVERFLOW wins as in CartPoleSimulator.validate
+        errors = self.errors[active]
+        errors[numpy.abs(q[2]) > config.hard_max_velocity] = Error.V_OVERFLOW
+        errors[numpy.abs(q[0]) > config.hard_max_position] = Error.X_OVERFLOW
+        self.errors[active] = errors
+
+    def timestamp(self):
+        return self.time
@@ -0,0 +1,90 @@
+import math
+
+import numpy
+
+from cartpole.common import Config, Error, State
+from cartpole.simulator.numpy_rk4 import CartPoleSimulator, MultiCartPoleSimulator
+from cartpole.simulator.numpy_rk4.simulator import rk4_step
+
+
+def energy(state, config):
+    # Energy of a free pendulum per unit of mass, the cart is at rest
+    height = -config.pole_length * math.cos(state.pole_angle)
+    speed = config.pole_length * state.pole_angular_velocity
+    return config.gravity * height + speed**2 / 2
+
+
+class TestCartPoleSimulator:
+    def test_free_pendulum_conserves_energy(self):
+        config = Config()
+        simulator = CartPoleSimulator()
+        simulator.reset_to(config, State(pole_angle=2.0))
+        initial = energy(simulator.get_state(), config)
+
+        for _ in range(200):
+            simulator.set_target(0)
+            simulator.advance(0.01)
+
+        state = simulator.get_state()
+        assert state.error == Error.NO_ERROR
+        assert abs(energy(state, config) - initial) < 1e-8
+        assert abs(simulator.timestamp() - 2) < 1e-9
+
+    def test_matches_vectorized_rk4(self):
+        config = Config()
+        simulator = CartPoleSimulator(step=0.002)
+        simulator.reset_to(config, State(0.1, -0.2, 1.0, 0.5))
+        simulator.set_target(1.5)
+        simulator.advance(0.01)
+
+        q = State(0.1, -0.2, 1.0, 0.5).as_array()
+        for _ in range(5):
+            q = rk4_step(q, 1.5, 0.002, config.gravity, config.pole_length)
+
+        assert numpy.allclose(simulator.get_state().as_array(), q, atol=1e-12)
+
+    def test_errors(self):
+        config = Config()
+        simulator = CartPoleSimulator()
+
+        simulator.reset(config)
+        simulator.set_target(config.hard_max_acceleration + 1)
+        assert simulator.get_state().error == Error.A_OVERFLOW
+
+        simulator.reset(config)
+        for _ in range(100):
+            simulator.set_target(config.hard_max_acceleration)
+            simulator.advance(0.01)
+        assert simulator.get_state().error == Error.X_OVERFLOW
+
+        # Simulation is stopped after an error
+        stopped = simulator.get_state()
+        simulator.advance(0.01)
+        assert simulator.get_state().cart_position == stopped.cart_position
+
+
+class TestMultiCartPoleSimulator:
+    def test_matches_single_simulators(self):
+        config = Config()
+        initial = [State(pole_angle=angle) for angle in (0.5, 1.0, 3.0)]
+        targets = numpy.array([0.0, 1.0, config.hard_max_acceleration + 1])
+
+        multi = MultiCartPoleSimulator()
+        multi.reset_to(config, initial)
+        singles = [CartPoleSimulator() for _ in initial]
+
+        for _ in range(20):
+            multi.set_target(targets)
+            multi.advance(0.01)
+            for simulator, state, target in zip(singles, initial, targets):
+                if simulator.config is None:
+                    simulator.reset_to(config, state)
+                simulator.set_target(target)
+                simulator.advance(0.01)
+
+        for state, simulator in zip(multi.get_states(), singles):
+            expected = simulator.get_state()
+            assert state.error == expected.error
+            assert numpy.allclose(state.as_array(), expected.as_array(), atol=1e-9)
+
+        assert multi.get_states()[2].error == Error.A_OVERFLOW
@@ -35,6 +35,8 @@ class CartPoleSimulator(CartPoleBase):
         The target is desired acceleration of cart.
     Technical details:
         Each environment runs its own isolated pybullet physics engine.
+        Context and simulator are created once and reset in place,
+        so resets are cheap.
     '''
 
     def __init__(self):
@@ -47,12 +49,13 @@ class CartPoleSimulator(CartPoleBase):
         
     def reset_to(self, config, state):
         self.config = config
-        self.context = self.system.CreateContext(config, state.as_array())
-        self.simulator = Simulator(self.system, self.context)
+        self.system.ResetContext(self.context, config, state.as_array())
 
         self.error = Error.NO_ERROR
         self.target_acceleration = 0
         self.system.get_input_port().FixValue(self.context, numpy.array([0]))
+        # Integrator keeps step size and other data of the previous episode
+        self.simulator.Initialize()
 
     def reset(self, config):
         self.reset_to(config, State.home())
@@ -57,6 +57,13 @@ def CartPoleSystem_(T):
 
         def CreateContext(self, config, q):
             context = self.CreateDefaultContext()
+            self.ResetContext(context, config, q)
+            return context
+
+        def ResetContext(self, context, config, q):
+            """
+            Resets time, parameters and state of the existing context in place.
+            """
             context.SetTime(0)
 
             params = context.get_mutable_numeric_parameter(self.parameter_index)
@@ -66,8 +73,6 @@ def CartPoleSystem_(T):
 
             context.SetContinuousState(q)
 
-            return context
-
     return Impl
 
 CartPoleSystem = CartPoleSystem_[float]
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+This module contains BatchPipeline which prepares batches of states for
+`MultiSystemLearningContext.update_batch` in a background thread, so
+sampling of indices and gathering of states overlap with evaluation of
+transitions.
+
+Batches are written into a fixed ring of reused buffers, no tensors are
+allocated per batch once the pipeline is running.
+"""
+
+
+import queue
+import threading
+from typing import List, Optional
+
+import torch
+from torch import DoubleTensor, LongTensor
+
+from .discreditizer import Discreditizer
+
+SAMPLING_METHODS = ["uniform", "without_replacement", "stratified", "sobol"]
+
+
+class BatchSampler:
+    """
+    Samples indices of states from a discretized state space.
+
+    Supported methods:
+    - `uniform`: independent uniform indices, same as `torch.randint`;
+    - `without_replacement`: indices are taken from a random permutation of
+      the whole space, so every state is visited once per epoch;
+    - `stratified`: the space is split into `batch_size` equal strata
+      and one index is taken uniformly from each of them;
+    - `sobol`: scrambled Sobol sequence over the four state dimensions,
+      a low-discrepancy sample which covers every axis evenly.
+    """
+
+    def __init__(
+        self,
+        discreditizer: Discreditizer,
+        batch_size: int,
+        method: str = "uniform",
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        discreditizer : Discreditizer
+        batch_size : int
+            Number of indices per batch.
+        method : str
+            Sampling method, one of `SAMPLING_METHODS`.
+        seed : int, optional
+            Seed of the random generator, random by default.
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown or `batch_size` was less than 1 or
+            greater than the total number of states.
+        """
+        if method not in SAMPLING_METHODS:
+            raise ValueError(f"Unknown sampling method {method}")
+        if not (0 < batch_size <= discreditizer.space_size):
+            raise ValueError("Invalid batch size")
+
+        self.method = method
+        self.batch_size = batch_size
+        self.space_size = discreditizer.space_size
+        self.axes_sizes = [len(axis) for axis in discreditizer.axes]
+
+        self._generator = torch.Generator()
+        if seed is None:
+            self._generator.seed()
+        else:
+            self._generator.manual_seed(seed)
+
+        self._permutation: Optional[LongTensor] = None
+        self._position = 0
+        self._sobol: Optional[torch.quasirandom.SobolEngine] = None
+        if method == "sobol":
+            self._sobol = torch.quasirandom.SobolEngine(
+                dimension=len(self.axes_sizes),
+                scramble=True,
+                seed=int(torch.randint(0, 2**31, (1,), generator=self._generator)),
+            )
+
+        # Stratum i is [begins[i], begins[i] + widths[i])
+        bounds = torch.linspace(
+            0, self.space_size, batch_size + 1, dtype=torch.float64
+        ).long()
+        self._begins = bounds[:-1]
+        self._widths = (bounds[1:] - bounds[:-1]).double()
+        self._uniform = torch.empty(batch_size, dtype=torch.float64)
+
+    def sample(self, out: LongTensor) -> LongTensor:
+        """
+        Samples a batch of indices.
+
+        Parameters
+        ----------
+        out : LongTensor
+            1xK tensor to write indices to, K is the batch size.
+
+        Returns
+        -------
+        LongTensor
+            `out` tensor.
+        """
+        if self.method == "uniform":
+            return out.random_(0, self.space_size, generator=self._generator)
+        if self.method == "without_replacement":
+            return self._sample_without_replacement(out)
+        if self.method == "stratified":
+            return self._sample_stratified(out)
+        return self._sample_sobol(out)
+
+    def _sample_without_replacement(self, out: LongTensor) -> LongTensor:
+        filled = 0
+        while filled < self.batch_size:
+            if self._permutation is None or self._position == self.space_size:
+                self._permutation = torch.randperm(
+                    self.space_size, generator=self._generator
+                )  # type: ignore
+                self._position = 0
+
+            taken = min(self.batch_size - filled, self.space_size - self._position)
+            end = self._position + taken
+            out[filled : filled + taken] = self._permutation[self._position : end]
+            self._position = end
+            filled += taken
+
+        return out
+
+    def _sample_stratified(self, out: LongTensor) -> LongTensor:
+        self._uniform.uniform_(generator=self._generator)
+        self._uniform.mul_(self._widths).floor_()
+        torch.add(self._begins, self._uniform.long(), out=out)
+        return out
+
+    def _sample_sobol(self, out: LongTensor) -> LongTensor:
+        assert self._sobol is not None
+        points = self._sobol.draw(self.batch_size, dtype=torch.float64)
+
+        out.zero_()
+        for dim, size in enumerate(self.axes_sizes):
+            # Last dimension is the least significant one, as in `Discreditizer`
+            out.mul_(size)
+            out.add_((points[:, dim] * size).long().clamp_(max=size - 1))
+
+        return out
+
+
+class BatchPipeline:
+    """
+    Background producer of batches of states.
+
+    A worker thread samples indices with `BatchSampler`, gathers states and
+    keeps up to `prefetch_n` batches ready. A batch returned by `next` stays
+    valid until the following call of `next`, then its buffer is reused.
+
+    Buffers are pinned if CUDA is available, so copies to a device may be
+    asynchronous. The pipeline should be closed after use, it is also
+    a context manager.
+    """
+
+    def __init__(
+        self,
+        discreditizer: Discreditizer,
+        batch_size: int,
+        prefetch_n: int = 2,
+        method: str = "uniform",
+        seed: Optional[int] = None,
+        pin_memory: Optional[bool] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        discreditizer : Discreditizer
+        batch_size : int
+            Number of states per batch.
+        prefetch_n : int
+            Number of batches prepared ahead.
+        method : str
+            Sampling method, see `BatchSampler`.
+        seed : int, optional
+            Seed of the sampler.
+        pin_memory : bool, optional
+            Whether to pin buffers, by default only if CUDA is available.
+
+        Raises
+        ------
+        ValueError
+            If `prefetch_n` was less than 1, see also `BatchSampler`.
+        """
+        if prefetch_n < 1:
+            raise ValueError("Invalid number of prefetched batches")
+        if pin_memory is None:
+            pin_memory = torch.cuda.is_available()
+
+        self.discreditizer = discreditizer
+        self.sampler = BatchSampler(discreditizer, batch_size, method, seed)
+
+        # One buffer is held by the consumer, the others are in flight
+        dtype = discreditizer.config.dtype
+        self._states: List[DoubleTensor] = []
+        self._indices: List[LongTensor] = []
+        for _ in range(prefetch_n + 1):
+            states = torch.empty((4, batch_size), dtype=dtype, pin_memory=pin_memory)
+            indices = torch.empty(batch_size, dtype=torch.long)
+            self._states.append(states)  # type: ignore
+            self._indices.append(indices)  # type: ignore
+
+        self._free: "queue.Queue[int]" = queue.Queue()
+        self._ready: "queue.Queue[Optional[int]]" = queue.Queue()
+        for slot in range(prefetch_n):
+            self._free.put(slot)
+        self._held = prefetch_n
+
+        self._error: Optional[BaseException] = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Returns the number of states per batch.
+
+        Returns
+        -------
+        int
+        """
+        return self.sampler.batch_size
+
+    def __enter__(self) -> "BatchPipeline":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _produce(self) -> None:
+        try:
+            while True:
+                slot = self._free.get()
+                if self._stopped.is_set():
+                    break
+
+                indices = self.sampler.sample(self._indices[slot])
+                self.discreditizer.get_states(indices, out=self._states[slot])
+                self._ready.put(slot)
+        except BaseException as error:  # pylint: disable=broad-except
+            self._error = error
+        finally:
+            # Wakes up a consumer waiting for a batch
+            self._ready.put(None)
+
+    def next(self) -> DoubleTensor:
+        """
+        Returns the next batch of states.
+
+        Returns
+        -------
+        DoubleTensor
+            4xK tensor with states, valid until the next call.
+
+        Raises
+        ------
+        RuntimeError
+            If the pipeline is closed or the worker failed.
+        """
+        if self._stopped.is_set():
+            raise RuntimeError("Pipeline is closed")
+
+        slot = self._ready.get()
+        if slot is None:
+            # The worker is gone, later calls must not wait for it
+            self._ready.put(None)
+            raise RuntimeError("Batch worker failed") from self._error
+
+        self._free.put(self._held)
+        self._held = slot
+        return self._states[slot]
+
+    @property
+    def batch_indices(self) -> LongTensor:
+        """
+        Returns indices of states of the last batch returned by `next`.
+
+        Returns
+        -------
+        LongTensor
+            1xK tensor, valid until the next call of `next`.
+        """
+        return self._indices[self._held]
+
+    def close(self) -> None:
+        """
+        Stops the worker thread.
+        """
+        if self._stopped.is_set():
+            return
+
+        self._stopped.set()
+        self._free.put(self._held)
+        self._thread.join()
@@ -0,0 +1,143 @@
+"""
+This module contains TransitionCache, an on-disk cache of data derived
+from a `SystemConfiguration`: the discretized state space and transition
+tables.
+
+Data is stored as `.npy` files in a directory named after a hash of the
+configuration and memory-mapped on load, so worker processes share one
+copy through the page cache and start without recomputation.
+"""
+
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import torch
+from torch import Tensor
+
+from cartpole.common.util import content_hash, get_cache_dir
+
+from .config import SystemConfiguration
+
+CACHE_NAME = "pytorch_simulator"
+
+
+class TransitionCache:
+    """
+    Content-addressed cache of tensors derived from a configuration.
+
+    The key is a hash of system parameters, limits, discretization
+    parameters and floating point type, so any change of them leads to
+    a new cache entry.
+    """
+
+    def __init__(
+        self,
+        config: SystemConfiguration,
+        root: Optional[Union[str, Path]] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        config : SystemConfiguration
+        root : str or Path, optional
+            Cache root directory. By default `get_cache_dir` is used.
+        """
+        self.config = config
+        self.key = content_hash(
+            config.parameters,
+            config.limits,
+            config.discretization,
+            config.dtype,
+        )
+
+        root = Path(root) if root is not None else get_cache_dir(CACHE_NAME)
+        self.path = root / self.key
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        description = self.path / "config.json"
+        if not description.exists():
+            self._write_atomic(
+                description,
+                lambda file: file.write(self._describe().encode("utf-8")),
+            )
+
+    def _describe(self) -> str:
+        return json.dumps(
+            {
+                "parameters": vars(self.config.parameters),
+                "limits": vars(self.config.limits),
+                "discretization": vars(self.config.discretization),
+                "dtype": str(self.config.dtype),
+            },
+            indent=2,
+        )
+
+    def _write_atomic(self, path: Path, write) -> None:
+        # Readers never see partially written files
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                write(file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _file(self, name: str) -> Path:
+        return self.path / f"{name}.npy"
+
+    def contains(self, name: str) -> bool:
+        """
+        Checks if a tensor is cached.
+
+        Parameters
+        ----------
+        name : str
+            Name of the tensor.
+
+        Returns
+        -------
+        bool
+        """
+        return self._file(name).exists()
+
+    def load(self, name: str) -> Optional[Tensor]:
+        """
+        Loads a memory-mapped tensor.
+
+        Pages are shared between processes until a process writes to
+        the tensor (copy-on-write), cached files are never modified.
+
+        Parameters
+        ----------
+        name : str
+            Name of the tensor.
+
+        Returns
+        -------
+        Tensor, optional
+            Cached tensor or None if there is no such tensor.
+        """
+        if not self.contains(name):
+            return None
+
+        array = np.load(self._file(name), mmap_mode="c")
+        return torch.from_numpy(array)
+
+    def store(self, name: str, tensor: Tensor) -> None:
+        """
+        Stores a tensor.
+
+        Parameters
+        ----------
+        name : str
+            Name of the tensor.
+        tensor : Tensor
+        """
+        array = tensor.detach().cpu().contiguous().numpy()
+        self._write_atomic(self._file(name), lambda file: np.save(file, array))
@@ -1,10 +1,13 @@
 """
 Defines configuration of the system - its limits and physical parameters
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+import torch
 from torch import pi
 
+from cartpole.common.interface import Config
+
 
 @dataclass
 class SystemLimits:
@@ -57,6 +60,21 @@ class DiscretizationParameters:
         We assume the input is the same during the timestep.
         Value of 10 would mean that we update the state of the system
         10 times before adjusting the input.
+
+    `integrator` : str
+        Integration method: `rk2`, `rk4`, `semi_implicit_euler` or
+        `adaptive`. Higher order methods reach the same accuracy with
+        smaller `integration_step_n`.
+
+    `integration_tolerance` : float
+        Maximum local error of one integration step.
+        Only used by the `adaptive` integrator, which treats
+        `integration_step_n` as the initial number of steps.
+
+    `fused_integrator` : bool
+        Whether to run integration steps as one compiled kernel
+        (`torch.compile` or TorchScript). Compilation takes a while,
+        so it only pays off for long runs.
     """
 
     cart_position: int = 50
@@ -68,6 +86,10 @@ class DiscretizationParameters:
     simulation_step_n: int = 100
     integration_step_n: int = 10
 
+    integrator: str = "rk2"
+    integration_tolerance: float = 1e-6
+    fused_integrator: bool = False
+
 
 @dataclass
 class SystemParameters:
@@ -113,8 +135,44 @@ class SystemConfiguration:
         Parameters of the system which are used for discretization of
         continuos space and time.
         Basically contains the number of pieces we split each dimension in.
+
+    `dtype` : torch.dtype
+        Floating point type of all the tensors. `torch.float32` halves
+        memory usage and speeds up calculations at the cost of accuracy.
     """
 
-    parameters: SystemParameters = SystemParameters()
-    limits: SystemLimits = SystemLimits()
-    discretization: DiscretizationParameters = DiscretizationParameters()
+    parameters: SystemParameters = field(default_factory=SystemParameters)
+    limits: SystemLimits = field(default_factory=SystemLimits)
+    discretization: DiscretizationParameters = field(
+        default_factory=DiscretizationParameters
+    )
+    dtype: torch.dtype = torch.float64
+
+    @staticmethod
+    def from_config(config: Config) -> "SystemConfiguration":
+        """
+        Creates a configuration from the device `Config`.
+
+        Hardware limits are used, as they are the ones which stop the
+        device (same as in the pydrake simulator).
+
+        Parameters
+        ----------
+        config : Config
+
+        Returns
+        -------
+        SystemConfiguration
+        """
+        return SystemConfiguration(
+            parameters=SystemParameters(
+                pole_length=config.pole_length,
+                pole_mass=config.pole_mass,
+                gravity=config.gravity,
+            ),
+            limits=SystemLimits(
+                max_abs_position=config.hard_max_position,
+                max_abs_velocity=config.hard_max_velocity,
+                max_abs_acceleration=config.hard_max_acceleration,
+            ),
+        )
@@ -6,10 +6,12 @@ velocities) and action space (cart accelerations).
 
 
 from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
 import torch
-from torch import DoubleTensor
+from torch import BoolTensor, DoubleTensor, LongTensor
 
+from .cache import TransitionCache
 from .config import SystemConfiguration
 
 
@@ -20,67 +22,76 @@ class Discreditizer:
     velocities) and action space (cart accelerations) according to the config.
 
     After discretization, stores the results.
+
+    In lazy mode the state space is not materialized: states are decoded
+    from their indices on demand with `get_states`, so memory usage does
+    not depend on the grid size. `all_states` is still available, but it
+    materializes the whole state space on every access.
+
+    If a `TransitionCache` is given, the materialized state space is loaded
+    from it (or stored to it on the first run).
     """
 
     config: SystemConfiguration
+    lazy: bool = False
+    cache: Optional[TransitionCache] = None
 
     cart_accelerations: DoubleTensor = None  # type: ignore
+    axes: List[DoubleTensor] = None  # type: ignore
     _all_states: DoubleTensor = None  # type: ignore
 
     def __post_init__(self) -> None:
         """
         Generates all states from configuration.
+        States are not generated in lazy mode.
         """
         positions = torch.linspace(  # type: ignore
             start=-self.config.limits.max_abs_position,
             end=self.config.limits.max_abs_position,
             steps=self.config.discretization.cart_position,
-            dtype=torch.float64,
+            dtype=self.config.dtype,
         )
         angles = torch.linspace(  # type: ignore
             start=0.0,
             end=2 * torch.pi,
             steps=self.config.discretization.pole_angle,
-            dtype=torch.float64,
+            dtype=self.config.dtype,
         )
         velocities = torch.linspace(  # type: ignore
             start=-self.config.limits.max_abs_velocity,
             end=self.config.limits.max_abs_velocity,
             steps=self.config.discretization.cart_velocity,
-            dtype=torch.float64,
+            dtype=self.config.dtype,
         )
         angular_velocities = torch.linspace(  # type: ignore
             start=-self.config.limits.max_abs_angular_velocity,
             end=self.config.limits.max_abs_angular_velocity,
             steps=self.config.discretization.pole_angular_velocity,
-            dtype=torch.float64,
+            dtype=self.config.dtype,
         )
         self.cart_accelerations = torch.linspace(  # type: ignore
             start=-self.config.limits.max_abs_acceleration,
             end=self.config.limits.max_abs_acceleration,
             steps=self.config.discretization.cart_acceleration,
-            dtype=torch.float64,
+            dtype=self.config.dtype,
         )
 
-        # Generate all possible states tensor
-        positions, angles, velocities, angular_velocities = torch.meshgrid(
-            [
-                positions,
-                angles,
-                velocities,
-                angular_velocities,
-            ],
-            indexing="ij",
-        )
+        self.axes = [positions, angles, velocities, angular_velocities]
 
-        self._all_states = torch.vstack(  # type: ignore
-            [
-                positions.flatten(),
-                angles.flatten(),
-                velocities.flatten(),
-                angular_velocities.flatten(),
-            ]
-        )
+        if not self.lazy:
+            self._all_states = self._load_states()
+
+    def _load_states(self) -> DoubleTensor:
+        if self.cache is not None:
+            states = self.cache.load("all_states")
+            if states is not None:
+                return states  # type: ignore
+
+        states = self.get_states(torch.arange(self.space_size))
+        if self.cache is not None:
+            self.cache.store("all_states", states)
+
+        return states
 
     @property
     def space_size(self) -> int:
@@ -91,7 +102,46 @@ class Discreditizer:
         -------
         int
         """
-        return self._all_states.shape[1]
+        size = 1
+        for axis in self.axes:
+            size *= len(axis)
+        return size
+
+    def get_states(
+        self,
+        indices: LongTensor,
+        out: Optional[DoubleTensor] = None,
+    ) -> DoubleTensor:
+        """
+        Decodes flat state indices into states.
+
+        Index of a state is a mixed-radix number, where digits are indices
+        along cart positions, pole angles, cart velocities and pole angular
+        velocities (the last one is the least significant).
+
+        Parameters
+        ----------
+        indices : LongTensor
+            1xK Tensor with indices of states.
+        out : DoubleTensor, optional
+            Preallocated 4xK tensor to write states to.
+
+        Returns
+        -------
+        DoubleTensor
+            4xK Tensor with states.
+        """
+        states = out
+        if states is None:
+            states = torch.empty((4, len(indices)), dtype=self.config.dtype)
+        rest = indices.clone()
+
+        for dim in reversed(range(len(self.axes))):
+            axis = self.axes[dim]
+            states[dim] = axis[rest % len(axis)]
+            rest //= len(axis)
+
+        return states  # type: ignore
 
     @property
     def cart_positions(self) -> DoubleTensor:
@@ -101,7 +151,7 @@ class Discreditizer:
         DoubleTensor
             1xN Tensor with cart positions.
         """
-        return self._all_states[0]  # type: ignore
+        return self.all_states[0]  # type: ignore
 
     @property
     def pole_angles(self) -> DoubleTensor:
@@ -111,7 +161,7 @@ class Discreditizer:
         DoubleTensor
             1xN Tensor with pole angles.
         """
-        return self._all_states[1]  # type: ignore
+        return self.all_states[1]  # type: ignore
 
     @property
     def cart_velocities(self) -> DoubleTensor:
@@ -121,7 +171,7 @@ class Discreditizer:
         DoubleTensor
             1xN Tensor with cart velocities.
         """
-        return self._all_states[2]  # type: ignore
+        return self.all_states[2]  # type: ignore
 
     @property
     def pole_angular_velocities(self) -> DoubleTensor:
@@ -131,7 +181,7 @@ class Discreditizer:
         DoubleTensor
             1xN Tensor with pole angular velocities.
         """
-        return self._all_states[3]  # type: ignore
+        return self.all_states[3]  # type: ignore
 
     @property
     def all_states(self) -> DoubleTensor:
@@ -142,4 +192,62 @@ class Discreditizer:
             4xN Tensor storing cart positions, pole angles, cart velocities
             and pole angular velocities.
         """
+        if self.lazy:
+            return self.get_states(torch.arange(self.space_size))
         return self._all_states
+
+    @property
+    def shape(self) -> Tuple[int, int, int, int]:
+        """
+        Returns the number of samples for each state dimension.
+
+        Returns
+        -------
+        Tuple[int, int, int, int]
+            Number of cart positions, pole angles, cart velocities
+            and pole angular velocities.
+        """
+        return tuple(len(axis) for axis in self.axes)  # type: ignore
+
+    def nearest_indices(self, states: DoubleTensor) -> Tuple[LongTensor, BoolTensor]:
+        """
+        Finds the nearest grid state for each of the given states.
+
+        Pole angles are wrapped to `[0, 2*pi)`, other dimensions are clamped
+        to the grid. States outside of the limits are reported in a mask.
+
+        Parameters
+        ----------
+        states : DoubleTensor
+            4xN tensor with states.
+
+        Returns
+        -------
+        Tuple[LongTensor, BoolTensor]
+            1xN Tensor with indices of the nearest states in `all_states`
+            and 1xN Tensor which is `True` for states outside of the limits.
+        """
+        indices = torch.zeros(states.shape[1], dtype=torch.long)
+        outside = torch.zeros(states.shape[1], dtype=torch.bool)
+
+        for dim, axis in enumerate(self.axes):
+            values = states[dim]
+            if dim == 1:
+                values = torch.remainder(values, 2 * torch.pi)
+            else:
+                outside |= (values < axis[0]) | (values > axis[-1])
+
+            if len(axis) == 1:
+                position = torch.zeros_like(indices)
+            else:
+                step = (axis[-1] - axis[0]) / (len(axis) - 1)
+                position = torch.round((values - axis[0]) / step).long()
+                if dim == 1:
+                    # Angles 0 and 2*pi are both on the grid, prefer the first
+                    position.remainder_(len(axis) - 1)
+                else:
+                    position.clamp_(0, len(axis) - 1)
+
+            indices = indices * len(axis) + position
+
+        return indices, outside  # type: ignore
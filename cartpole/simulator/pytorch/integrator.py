@@ -0,0 +1,423 @@
+"""
+This module contains integrators which advance multiple CartPole systems
+by one simulation step. The integration method is selected with
+`DiscretizationParameters.integrator`.
+
+Integrators work in-place: intermediate results are kept in work buffers
+which are allocated once and reused by subsequent calls, so a step does
+not allocate new tensors. The buffers belong to an integrator instance,
+which must not be stepped from several threads at once.
+"""
+
+import threading
+from typing import Callable, Dict, List, Tuple, Type
+
+import torch
+from torch import DoubleTensor, Tensor
+
+from .config import DiscretizationParameters, SystemConfiguration
+
+
+class Integrator:
+    """
+    Base class for in-place integrators of the CartPole dynamics.
+
+    Subclasses implement `substep`, which advances states by `d_time`.
+    """
+
+    buffers_n: int = 0
+    """
+    Number of 4xN work buffers used by `substep`.
+    """
+
+    def __init__(self) -> None:
+        self._workspace: Tensor = torch.empty(0, dtype=torch.float64)
+
+    def buffers(self, like: DoubleTensor) -> List[DoubleTensor]:
+        """
+        Returns work buffers for states like given ones.
+        The buffers are only reallocated if they are too small.
+
+        Parameters
+        ----------
+        like : DoubleTensor
+            4xN tensor with states.
+
+        Returns
+        -------
+        List[DoubleTensor]
+            `buffers_n` contiguous 4xN tensors and one 1xN tensor.
+        """
+        size = like.shape[1]
+        numel = (4 * self.buffers_n + 1) * size
+
+        if (
+            self._workspace.numel() < numel
+            or self._workspace.dtype != like.dtype
+            or self._workspace.device != like.device
+        ):
+            self._workspace = torch.empty(numel, dtype=like.dtype, device=like.device)
+
+        chunks = self._workspace[:numel].split(4 * size)
+        return [chunk.view(4, size) for chunk in chunks[:-1]] + [chunks[-1]]
+
+    @staticmethod
+    def derivative(
+        config: SystemConfiguration,
+        states: DoubleTensor,
+        inputs: DoubleTensor,
+        out: DoubleTensor,
+        tmp: DoubleTensor,
+    ) -> DoubleTensor:
+        """
+        Calculates time derivative of states without allocations.
+
+        Parameters
+        ----------
+        config : SystemConfiguration
+        states : DoubleTensor
+            4xN tensor with states.
+        inputs : DoubleTensor
+            A 1xN tensor containing input cart accelerations.
+        out : DoubleTensor
+            4xN tensor the derivative is written to.
+        tmp : DoubleTensor
+            1xN work buffer.
+
+        Returns
+        -------
+        DoubleTensor
+            `out` filled with derivatives.
+        """
+        grav = config.parameters.gravity
+        pole_len = config.parameters.pole_length
+
+        out[0].copy_(states[2])
+        out[1].copy_(states[3])
+        out[2].copy_(inputs)
+
+        # -1.5 / l * (u * cos(a) + g * sin(a))
+        torch.cos(states[1], out=out[3])
+        out[3].mul_(inputs)
+        torch.sin(states[1], out=tmp)
+        out[3].add_(tmp, alpha=grav)
+        out[3].mul_(-1.5 / pole_len)
+
+        return out
+
+    def substep(
+        self,
+        config: SystemConfiguration,
+        states: DoubleTensor,
+        inputs: DoubleTensor,
+        d_time: float,
+    ) -> None:
+        """
+        Advances states by `d_time` in-place.
+        """
+        raise NotImplementedError
+
+    def step(
+        self,
+        config: SystemConfiguration,
+        states: DoubleTensor,
+        inputs: DoubleTensor,
+    ) -> None:
+        """
+        Advances states by one simulation step in-place.
+
+        Parameters
+        ----------
+        config : SystemConfiguration
+        states : DoubleTensor
+            4xN tensor with states, which is overwritten with new states.
+        inputs : DoubleTensor
+            A 1xN tensor containing input cart accelerations.
+        """
+        steps = config.discretization.integration_step_n
+        d_time = 1 / (steps * config.discretization.simulation_step_n)
+
+        for _ in range(steps):
+            self.substep(config, states, inputs, d_time)
+
+
+class HeunIntegrator(Integrator):
+    """
+    Second order Runge-Kutta (Heun) method.
+    """
+
+    buffers_n = 3
+
+    def substep(self, config, states, inputs, d_time):
+        ds1, ds2, stage, tmp = self.buffers(states)
+
+        self.derivative(config, states, inputs, ds1, tmp)
+        torch.add(states, ds1, alpha=d_time, out=stage)
+        self.derivative(config, stage, inputs, ds2, tmp)
+
+        states.add_(ds1.add_(ds2), alpha=d_time / 2)
+
+
+class RK4Integrator(Integrator):
+    """
+    Classic fourth order Runge-Kutta method.
+    """
+
+    buffers_n = 5
+
+    def substep(self, config, states, inputs, d_time):
+        ds1, ds2, ds3, ds4, stage, tmp = self.buffers(states)
+
+        self.derivative(config, states, inputs, ds1, tmp)
+        torch.add(states, ds1, alpha=d_time / 2, out=stage)
+        self.derivative(config, stage, inputs, ds2, tmp)
+        torch.add(states, ds2, alpha=d_time / 2, out=stage)
+        self.derivative(config, stage, inputs, ds3, tmp)
+        torch.add(states, ds3, alpha=d_time, out=stage)
+        self.derivative(config, stage, inputs, ds4, tmp)
+
+        ds1.add_(ds2, alpha=2).add_(ds3, alpha=2).add_(ds4)
+        states.add_(ds1, alpha=d_time / 6)
+
+
+class SemiImplicitEulerIntegrator(Integrator):
+    """
+    Semi-implicit (symplectic) Euler method: velocities are updated first
+    and new velocities are used to update positions.
+    """
+
+    buffers_n = 1
+
+    def substep(self, config, states, inputs, d_time):
+        ds, tmp = self.buffers(states)
+
+        self.derivative(config, states, inputs, ds, tmp)
+        states[2:].add_(ds[2:], alpha=d_time)
+        states[:2].add_(states[2:], alpha=d_time)
+
+
+class AdaptiveHeunIntegrator(HeunIntegrator):
+    """
+    Heun method with adaptive step size. Local error is estimated with the
+    embedded Euler method, and one step size is shared by the whole batch.
+
+    `integration_step_n` sets the initial step size and
+    `integration_tolerance` sets the maximum local error.
+    """
+
+    min_step_ratio: float = 1e-6
+
+    def step(self, config, states, inputs):
+        sim_time = 1 / config.discretization.simulation_step_n
+        tolerance = config.discretization.integration_tolerance
+
+        d_time = sim_time / config.discretization.integration_step_n
+        min_d_time = sim_time * self.min_step_ratio
+        time = 0.0
+
+        ds1, ds2, stage, tmp = self.buffers(states)
+
+        while time < sim_time:
+            last = d_time >= sim_time - time
+            if last:
+                d_time = sim_time - time
+            d_time = max(d_time, min_d_time)
+
+            self.derivative(config, states, inputs, ds1, tmp)
+            torch.add(states, ds1, alpha=d_time, out=stage)
+            self.derivative(config, stage, inputs, ds2, tmp)
+
+            # Difference between Heun and Euler solutions
+            torch.sub(ds2, ds1, out=stage).abs_()
+            error = float(stage.max()) * d_time / 2
+            if error <= tolerance or d_time <= min_d_time:
+                states.add_(ds1.add_(ds2), alpha=d_time / 2)
+                time = sim_time if last else time + d_time
+
+            scale = 0.9 * (tolerance / error) ** 0.5 if error > 0 else 2.0
+            d_time *= min(2.0, max(0.2, scale))
+
+
+def _heun_fused(
+    states: Tensor,
+    inputs: Tensor,
+    d_time: float,
+    steps: int,
+    grav: float,
+    pole_len: float,
+) -> Tensor:
+    coef = -1.5 / pole_len
+    x, a, v, w = states[0], states[1], states[2], states[3]
+    for _ in range(steps):
+        dw1 = coef * (inputs * torch.cos(a) + grav * torch.sin(a))
+        a2 = a + w * d_time
+        w2 = w + dw1 * d_time
+        dw2 = coef * (inputs * torch.cos(a2) + grav * torch.sin(a2))
+        x = x + (2 * v + inputs * d_time) * (d_time / 2)
+        a = a + (w + w2) * (d_time / 2)
+        v = v + inputs * d_time
+        w = w + (dw1 + dw2) * (d_time / 2)
+    return torch.stack((x, a, v, w))
+
+
+def _rk4_fused(
+    states: Tensor,
+    inputs: Tensor,
+    d_time: float,
+    steps: int,
+    grav: float,
+    pole_len: float,
+) -> Tensor:
+    coef = -1.5 / pole_len
+    half = d_time / 2
+    x, a, v, w = states[0], states[1], states[2], states[3]
+    for _ in range(steps):
+        dw1 = coef * (inputs * torch.cos(a) + grav * torch.sin(a))
+        a2 = a + half * w
+        w2 = w + half * dw1
+        dw2 = coef * (inputs * torch.cos(a2) + grav * torch.sin(a2))
+        a3 = a + half * w2
+        w3 = w + half * dw2
+        dw3 = coef * (inputs * torch.cos(a3) + grav * torch.sin(a3))
+        a4 = a + d_time * w3
+        w4 = w + d_time * dw3
+        dw4 = coef * (inputs * torch.cos(a4) + grav * torch.sin(a4))
+        x = x + d_time * v + (d_time * d_time / 2) * inputs
+        a = a + d_time / 6 * (w + 2 * w2 + 2 * w3 + w4)
+        v = v + d_time * inputs
+        w = w + d_time / 6 * (dw1 + 2 * dw2 + 2 * dw3 + dw4)
+    return torch.stack((x, a, v, w))
+
+
+def _semi_implicit_euler_fused(
+    states: Tensor,
+    inputs: Tensor,
+    d_time: float,
+    steps: int,
+    grav: float,
+    pole_len: float,
+) -> Tensor:
+    coef = -1.5 / pole_len
+    x, a, v, w = states[0], states[1], states[2], states[3]
+    for _ in range(steps):
+        dw = coef * (inputs * torch.cos(a) + grav * torch.sin(a))
+        v = v + inputs * d_time
+        w = w + dw * d_time
+        x = x + v * d_time
+        a = a + w * d_time
+    return torch.stack((x, a, v, w))
+
+
+FusedKernel = Callable[[Tensor, Tensor, float, int, float, float], Tensor]
+
+
+def _compile(kernel: Callable) -> FusedKernel:
+    """
+    Compiles a kernel with `torch.compile` when it is available
+    (torch >= 2.0) and with TorchScript otherwise.
+    """
+    if hasattr(torch, "compile"):
+        return torch.compile(kernel, dynamic=True)  # type: ignore
+    return torch.jit.script(kernel)  # type: ignore
+
+
+class FusedIntegrator(Integrator):
+    """
+    Runs all the integration substeps of a simulation step as one compiled
+    kernel. Compilation happens on the first call.
+    """
+
+    def __init__(self, kernel: Callable) -> None:
+        super().__init__()
+        self._kernel = kernel
+        self._compiled: FusedKernel = None  # type: ignore
+
+    def step(self, config, states, inputs):
+        if self._compiled is None:
+            self._compiled = _compile(self._kernel)
+
+        steps = config.discretization.integration_step_n
+        d_time = 1 / (steps * config.discretization.simulation_step_n)
+
+        new_states = self._compiled(
+            states,
+            inputs,
+            d_time,
+            steps,
+            config.parameters.gravity,
+            config.parameters.pole_length,
+        )
+        states.copy_(new_states)
+
+
+INTEGRATORS: Dict[str, Type[Integrator]] = {
+    "rk2": HeunIntegrator,
+    "rk4": RK4Integrator,
+    "semi_implicit_euler": SemiImplicitEulerIntegrator,
+    "adaptive": AdaptiveHeunIntegrator,
+}
+
+FUSED_KERNELS: Dict[str, Callable] = {
+    "rk2": _heun_fused,
+    "rk4": _rk4_fused,
+    "semi_implicit_euler": _semi_implicit_euler_fused,
+}
+
+_local = threading.local()
+
+
+def make_integrator(discretization: DiscretizationParameters) -> Integrator:
+    """
+    Creates a new integrator selected by discretization parameters.
+
+    Parameters
+    ----------
+    discretization : DiscretizationParameters
+
+    Returns
+    -------
+    Integrator
+
+    Raises
+    ------
+    ValueError
+        If the integrator is unknown or has no fused implementation
+        while `fused_integrator` is set.
+    """
+    name = discretization.integrator
+    if discretization.fused_integrator:
+        if name not in FUSED_KERNELS:
+            raise ValueError(f"No fused implementation of integrator {name}")
+        return FusedIntegrator(FUSED_KERNELS[name])
+
+    if name not in INTEGRATORS:
+        raise ValueError(f"Unknown integrator {name}")
+    return INTEGRATORS[name]()
+
+
+def get_integrator(discretization: DiscretizationParameters) -> Integrator:
+    """
+    Returns integrator selected by discretization parameters.
+    Integrators are shared by the calls of one thread, so their work
+    buffers are reused, and every thread has its own ones.
+
+    Parameters
+    ----------
+    discretization : DiscretizationParameters
+
+    Returns
+    -------
+    Integrator
+
+    Raises
+    ------
+    ValueError
+        See `make_integrator`.
+    """
+    instances: Dict[Tuple[str, bool], Integrator] = getattr(_local, "instances", {})
+    _local.instances = instances
+
+    key = (discretization.integrator, discretization.fused_integrator)
+    if key not in instances:
+        instances[key] = make_integrator(discretization)
+    return instances[key]
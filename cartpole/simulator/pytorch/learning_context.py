@@ -5,11 +5,12 @@ works with batches (multiple systems at a time).
 """
 
 from dataclasses import dataclass
-from typing import Callable
+from typing import Callable, Optional
 
 import torch
 from torch import DoubleTensor, LongTensor
 
+from .batch_pipeline import BatchPipeline
 from .config import SystemConfiguration
 from .discreditizer import Discreditizer
 from .state import MultiSystemState
@@ -22,6 +23,9 @@ class MultiSystemLearningContext:
     """
     A container for all the data which is used to train a model which
     works with batches (multiple systems at a time).
+
+    If `batch_pipeline` is set, `update_batch` takes prefetched batches
+    from it instead of sampling them in place.
     """
 
     states_cost_fn: CostFunction
@@ -29,6 +33,7 @@ class MultiSystemLearningContext:
     config: SystemConfiguration
     batch_state: MultiSystemState
     discreditizer: Discreditizer
+    batch_pipeline: Optional[BatchPipeline] = None
 
     def update_batch(self, batch_size: int) -> None:
         """
@@ -43,8 +48,19 @@ class MultiSystemLearningContext:
         ------
         ValueError
             If `batch_size` was less than 1 or greater than
-            the total number of states.
+            the total number of states, or differs from the batch size
+            of `batch_pipeline`.
         """
+        if self.batch_pipeline is not None:
+            if batch_size != self.batch_pipeline.batch_size:
+                raise ValueError("Batch size differs from the pipeline one")
+
+            # The buffer is reused after the next call, as the batch itself
+            self.batch_state = MultiSystemState(
+                _state_space=self.batch_pipeline.next(),
+            )
+            return
+
         total_states = self.discreditizer.space_size
 
         if not (0 < batch_size <= total_states):
@@ -56,9 +72,8 @@ class MultiSystemLearningContext:
             size=(batch_size,),  # type: ignore
         )  # type: ignore
 
-        self.batch_state = MultiSystemState.create_from_batch(
-            self.discreditizer.all_states,
-            batch,
+        self.batch_state = MultiSystemState(
+            _state_space=self.discreditizer.get_states(batch),
         )
 
     @property
@@ -0,0 +1,201 @@
+"""
+This module contains ShardedExecutor which splits a batch of systems
+across a pool of worker processes. States and results live in shared
+memory, so workers read and write them in-place and only shard bounds
+are sent between processes.
+"""
+
+
+import os
+from typing import List, Optional, Tuple
+
+import torch
+import torch.multiprocessing as mp
+from torch import DoubleTensor
+
+from .discreditizer import Discreditizer
+from .learning_context import CostFunction, MultiSystemLearningContext
+from .state import MultiSystemState
+from .system import DEFAULT_CHUNK_SIZE, CartPoleMultiSystem
+
+# Context of the current worker process, set by `_init_worker`
+_worker_context: Optional[MultiSystemLearningContext] = None
+
+
+def _init_worker(
+    config,
+    states_cost_fn: CostFunction,
+    inputs_cost_fn: CostFunction,
+) -> None:
+    global _worker_context
+
+    # Workers are parallel already, intra-op threads would oversubscribe cores
+    torch.set_num_threads(1)
+
+    _worker_context = MultiSystemLearningContext(
+        states_cost_fn=states_cost_fn,
+        inputs_cost_fn=inputs_cost_fn,
+        config=config,
+        batch_state=None,  # type: ignore
+        discreditizer=Discreditizer(config, lazy=True),
+    )
+
+
+def _eval_transitions_shard(
+    states: DoubleTensor,
+    inputs: DoubleTensor,
+    begin: int,
+    end: int,
+) -> None:
+    context = _worker_context
+    assert context is not None, "Worker is not initialized"
+
+    context.batch_state = MultiSystemState(states[:, begin:end])  # type: ignore
+    CartPoleMultiSystem.eval_transitions(context, inputs[begin:end])  # type: ignore
+
+
+def _eval_best_inputs_shard(
+    states: DoubleTensor,
+    best_inputs: DoubleTensor,
+    best_costs: DoubleTensor,
+    begin: int,
+    end: int,
+    chunk_size: int,
+) -> None:
+    context = _worker_context
+    assert context is not None, "Worker is not initialized"
+
+    context.batch_state = MultiSystemState(states[:, begin:end])  # type: ignore
+    inputs, costs = CartPoleMultiSystem.eval_best_inputs(context, chunk_size)
+    best_inputs[begin:end] = inputs
+    best_costs[begin:end] = costs
+
+
+class ShardedExecutor:
+    """
+    Runs `CartPoleMultiSystem` calls for a context in a pool of worker
+    processes. The batch is split into one contiguous shard per worker.
+
+    The batch state tensor is moved to shared memory on the first call.
+    Workers are started with the `spawn` method by default, so cost
+    functions have to be picklable (e.g. defined at module level).
+
+    The executor should be closed after use, it is also a context manager.
+    """
+
+    def __init__(
+        self,
+        context: MultiSystemLearningContext,
+        workers_n: Optional[int] = None,
+        start_method: str = "spawn",
+    ) -> None:
+        """
+        Parameters
+        ----------
+        context : MultiSystemLearningContext
+        workers_n : int, optional
+            Number of worker processes, the number of CPUs by default.
+        start_method : str
+            Multiprocessing start method.
+
+        Raises
+        ------
+        ValueError
+            If `workers_n` is less than 1.
+        """
+        if workers_n is None:
+            workers_n = os.cpu_count() or 1
+        if workers_n < 1:
+            raise ValueError("Invalid number of workers")
+
+        self.context = context
+        self.workers_n = workers_n
+        self._pool = mp.get_context(start_method).Pool(
+            processes=workers_n,
+            initializer=_init_worker,
+            initargs=(
+                context.config,
+                context.states_cost_fn,
+                context.inputs_cost_fn,
+            ),
+        )
+
+    def __enter__(self) -> "ShardedExecutor":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stops worker processes.
+        """
+        self._pool.close()
+        self._pool.join()
+
+    def _shards(self) -> List[Tuple[int, int]]:
+        size = self.context.batch_size
+        bounds = torch.linspace(0, size, self.workers_n + 1).round().long()
+        return [
+            (int(begin), int(end))
+            for begin, end in zip(bounds[:-1], bounds[1:])
+            if end > begin
+        ]
+
+    def _shared_states(self) -> DoubleTensor:
+        states = self.context.batch_state.states
+        if not states.is_shared():
+            states.share_memory_()
+        return states
+
+    def eval_transitions(self, inputs: DoubleTensor) -> None:
+        """
+        Calculates new states and writes them in-place,
+        same as `CartPoleMultiSystem.eval_transitions`.
+
+        Parameters
+        ----------
+        inputs : DoubleTensor
+            A 1xN tensor containing input cart accelerations.
+        """
+        states = self._shared_states()
+        inputs = inputs.share_memory_() if not inputs.is_shared() else inputs
+
+        self._pool.starmap(
+            _eval_transitions_shard,
+            [(states, inputs, begin, end) for begin, end in self._shards()],
+        )
+
+    def eval_best_inputs(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Tuple[DoubleTensor, DoubleTensor]:
+        """
+        Evaluates best input for each state,
+        same as `CartPoleMultiSystem.eval_best_inputs`.
+
+        Parameters
+        ----------
+        chunk_size : int
+            Maximum number of (action, state) pairs evaluated at once
+            by each worker.
+
+        Returns
+        -------
+        Tuple[DoubleTensor, DoubleTensor]
+            1xK Tensor with best inputs for all the states and
+            1xK Tensor with costs of these inputs.
+        """
+        states = self._shared_states()
+        best_inputs = torch.empty(states.shape[1], dtype=states.dtype).share_memory_()
+        best_costs = torch.empty(states.shape[1], dtype=states.dtype).share_memory_()
+
+        self._pool.starmap(
+            _eval_best_inputs_shard,
+            [
+                (states, best_inputs, best_costs, begin, end, chunk_size)
+                for begin, end in self._shards()
+            ],
+        )
+
+        return best_inputs, best_costs  # type: ignore
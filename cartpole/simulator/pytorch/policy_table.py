@@ -0,0 +1,103 @@
+"""
+This module tabulates policies over the discretized state space into a
+`PolicyTable`, a compact array of action indices which is looked up by
+`cartpole.actors.policy_table.PolicyTableActor` without torch.
+"""
+
+
+import dataclasses as dc
+from typing import Optional
+
+import torch
+from torch import DoubleTensor, LongTensor
+
+from cartpole.common.policy_table import GridAxis, PolicyTable
+
+from .discreditizer import Discreditizer
+from .learning_context import MultiSystemLearningContext
+from .state import MultiSystemState
+from .system import DEFAULT_CHUNK_SIZE, CartPoleMultiSystem
+from .value_iteration import ValueFunction
+
+
+def _axis(values: DoubleTensor) -> GridAxis:
+    return GridAxis(float(values[0]), float(values[-1]), len(values))
+
+
+def make_policy_table(discreditizer: Discreditizer, policy: LongTensor) -> PolicyTable:
+    """
+    Packs action indices of all the grid states into a `PolicyTable`.
+
+    Parameters
+    ----------
+    discreditizer : Discreditizer
+    policy : LongTensor
+        1xS tensor with the index of an action in `cart_accelerations`
+        for every state.
+
+    Returns
+    -------
+    PolicyTable
+
+    Raises
+    ------
+    ValueError
+        If the size of `policy` differs from the number of states.
+    """
+    if policy.shape != (discreditizer.space_size,):
+        raise ValueError("Invalid policy shape")
+
+    accelerations = discreditizer.cart_accelerations
+    dtype = PolicyTable.action_dtype(len(accelerations))
+    actions = policy.numpy().astype(dtype).reshape(discreditizer.shape)
+
+    return PolicyTable(
+        axes=[_axis(axis) for axis in discreditizer.axes],
+        accelerations=_axis(accelerations),
+        actions=actions,
+    )
+
+
+def tabulate_policy(
+    context: MultiSystemLearningContext,
+    value_function: Optional[ValueFunction] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> PolicyTable:
+    """
+    Tabulates the best action for every grid state.
+
+    The greedy policy of a solved value function is used if it is given,
+    otherwise the best actions are evaluated with
+    `CartPoleMultiSystem.eval_best_inputs`. The batch state of the context
+    is left untouched.
+
+    Parameters
+    ----------
+    context : MultiSystemLearningContext
+    value_function : ValueFunction, optional
+        Solution of `ValueIteration` for the same grid.
+    chunk_size : int
+        Maximum number of (state, action) pairs evaluated at once.
+
+    Returns
+    -------
+    PolicyTable
+    """
+    discreditizer = context.discreditizer
+    if value_function is not None:
+        return make_policy_table(discreditizer, value_function.policy)
+
+    accelerations = discreditizer.cart_accelerations
+    space_size = discreditizer.space_size
+    policy = torch.empty(space_size, dtype=torch.long)
+    states_step = max(1, chunk_size // len(accelerations))
+
+    for begin in range(0, space_size, states_step):
+        end = min(begin + states_step, space_size)
+        states = discreditizer.get_states(torch.arange(begin, end))  # type: ignore
+        batch = dc.replace(context, batch_state=MultiSystemState(states))
+        best_inputs, _ = CartPoleMultiSystem.eval_best_inputs(batch, chunk_size)
+        # Best inputs are taken from the grid, so the search is exact
+        policy[begin:end] = torch.searchsorted(accelerations, best_inputs)
+
+    return make_policy_table(discreditizer, policy)  # type: ignore
@@ -0,0 +1,379 @@
+"""
+This module contains a functional rollout of multiple CartPole systems.
+
+Unlike `CartPoleMultiSystem.eval_transitions`, which works in-place,
+functions here never modify their arguments, so they are compatible with
+autograd: gradients of trajectory costs may be taken with respect to input
+sequences, initial states and system parameters. This allows batched
+shooting-based trajectory optimization from many initial states at once.
+"""
+
+
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import torch
+from torch import DoubleTensor, Tensor
+
+from .config import SystemConfiguration
+
+TrajectoryCost = Callable[[DoubleTensor, DoubleTensor], DoubleTensor]
+"""
+Function of a (T+1)x4xN tensor with trajectories and a TxN tensor with
+inputs, which returns a 1xN tensor with costs of the trajectories.
+"""
+
+
+@dataclass
+class RolloutParameters:
+    """
+    System parameters as tensors, so gradients may be taken with respect
+    to them.
+
+    Fields
+    ------
+    gravity : Tensor
+        Scalar tensor with gravity.
+    pole_length : Tensor
+        Scalar tensor with pole length.
+    """
+
+    gravity: Tensor
+    pole_length: Tensor
+
+    @staticmethod
+    def from_config(
+        config: SystemConfiguration,
+        requires_grad: bool = False,
+    ) -> "RolloutParameters":
+        """
+        Creates parameters from a system configuration.
+
+        Parameters
+        ----------
+        config : SystemConfiguration
+        requires_grad : bool
+            Whether gradients with respect to the parameters are required.
+
+        Returns
+        -------
+        RolloutParameters
+        """
+
+        def make(value: float) -> Tensor:
+            return torch.tensor(value, dtype=config.dtype, requires_grad=requires_grad)
+
+        return RolloutParameters(
+            gravity=make(config.parameters.gravity),
+            pole_length=make(config.parameters.pole_length),
+        )
+
+
+def derivative(
+    states: DoubleTensor,
+    inputs: DoubleTensor,
+    parameters: RolloutParameters,
+) -> DoubleTensor:
+    """
+    Calculates time derivative of states, same as `Integrator.derivative`.
+
+    Parameters
+    ----------
+    states : DoubleTensor
+        4xN tensor with states.
+    inputs : DoubleTensor
+        A 1xN tensor containing input cart accelerations.
+    parameters : RolloutParameters
+
+    Returns
+    -------
+    DoubleTensor
+        4xN tensor with derivatives.
+    """
+    angles = states[1]
+    dw = (
+        -1.5
+        / parameters.pole_length
+        * (inputs * torch.cos(angles) + parameters.gravity * torch.sin(angles))
+    )
+    return torch.stack([states[2], states[3], inputs, dw])  # type: ignore
+
+
+def _heun(states, inputs, parameters, d_time):
+    k1 = derivative(states, inputs, parameters)
+    k2 = derivative(states + d_time * k1, inputs, parameters)
+    return states + d_time / 2 * (k1 + k2)
+
+
+def _rk4(states, inputs, parameters, d_time):
+    k1 = derivative(states, inputs, parameters)
+    k2 = derivative(states + d_time / 2 * k1, inputs, parameters)
+    k3 = derivative(states + d_time / 2 * k2, inputs, parameters)
+    k4 = derivative(states + d_time * k3, inputs, parameters)
+    return states + d_time / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def _semi_implicit_euler(states, inputs, parameters, d_time):
+    dw = derivative(states, inputs, parameters)[3]
+    v = states[2] + inputs * d_time
+    w = states[3] + dw * d_time
+    return torch.stack([states[0] + v * d_time, states[1] + w * d_time, v, w])
+
+
+SUBSTEPS = {
+    "rk2": _heun,
+    "rk4": _rk4,
+    "semi_implicit_euler": _semi_implicit_euler,
+}
+
+
+def step(
+    config: SystemConfiguration,
+    states: DoubleTensor,
+    inputs: DoubleTensor,
+    parameters: Optional[RolloutParameters] = None,
+) -> DoubleTensor:
+    """
+    Advances systems by one simulation step without modifying `states`.
+
+    Parameters
+    ----------
+    config : SystemConfiguration
+    states : DoubleTensor
+        4xN tensor with states.
+    inputs : DoubleTensor
+        A 1xN tensor containing input cart accelerations.
+    parameters : RolloutParameters, optional
+        System parameters, taken from `config` by default.
+
+    Returns
+    -------
+    DoubleTensor
+        4xN tensor with new states.
+
+    Raises
+    ------
+    ValueError
+        If the integrator is not supported. The adaptive integrator is not,
+        its step size depends on the states.
+    """
+    discretization = config.discretization
+    if discretization.integrator not in SUBSTEPS:
+        raise ValueError(f"Unsupported integrator {discretization.integrator}")
+
+    if parameters is None:
+        parameters = RolloutParameters.from_config(config)
+
+    substep = SUBSTEPS[discretization.integrator]
+    steps = discretization.integration_step_n
+    d_time = 1 / (steps * discretization.simulation_step_n)
+
+    for _ in range(steps):
+        states = substep(states, inputs, parameters, d_time)
+
+    return states
+
+
+def rollout(
+    config: SystemConfiguration,
+    initial_states: DoubleTensor,
+    inputs: DoubleTensor,
+    parameters: Optional[RolloutParameters] = None,
+) -> DoubleTensor:
+    """
+    Simulates systems for a sequence of inputs.
+
+    Parameters
+    ----------
+    config : SystemConfiguration
+    initial_states : DoubleTensor
+        4xN tensor with initial states.
+    inputs : DoubleTensor
+        TxN tensor with input cart accelerations, one row per step.
+    parameters : RolloutParameters, optional
+        System parameters, taken from `config` by default.
+
+    Returns
+    -------
+    DoubleTensor
+        (T+1)x4xN tensor with trajectories, including initial states.
+
+    Raises
+    ------
+    ValueError
+        If shapes of `initial_states` and `inputs` do not match.
+    """
+    if initial_states.dim() != 2 or initial_states.shape[0] != 4:
+        raise ValueError("Invalid initial states shape")
+    if inputs.dim() != 2 or inputs.shape[1] != initial_states.shape[1]:
+        raise ValueError("Invalid inputs shape")
+
+    if parameters is None:
+        parameters = RolloutParameters.from_config(config)
+
+    states = initial_states
+    trajectory = [states]
+    for step_inputs in inputs:
+        states = step(config, states, step_inputs, parameters)  # type: ignore
+        trajectory.append(states)
+
+    return torch.stack(trajectory)  # type: ignore
+
+
+@dataclass
+class RolloutGradients:
+    """
+    Result of `rollout_gradients`.
+
+    Fields
+    ------
+    trajectories : DoubleTensor
+        (T+1)x4xN tensor with trajectories.
+    costs : DoubleTensor
+        1xN tensor with costs of the trajectories.
+    inputs : DoubleTensor
+        TxN tensor with gradients of costs with respect to inputs.
+    gravity : DoubleTensor
+        1xN tensor with gradients of costs with respect to gravity.
+    pole_length : DoubleTensor
+        1xN tensor with gradients of costs with respect to pole length.
+    """
+
+    trajectories: DoubleTensor
+    costs: DoubleTensor
+    inputs: DoubleTensor
+    gravity: DoubleTensor
+    pole_length: DoubleTensor
+
+
+def rollout_gradients(
+    config: SystemConfiguration,
+    initial_states: DoubleTensor,
+    inputs: DoubleTensor,
+    cost_fn: TrajectoryCost,
+) -> RolloutGradients:
+    """
+    Simulates systems and calculates gradients of trajectory costs with
+    respect to inputs and system parameters.
+
+    Systems are independent, so the gradient with respect to inputs of a
+    system only depends on its own cost. Parameters are shared, so their
+    gradients are calculated per system with a separate copy of parameters
+    for each of them.
+
+    Parameters
+    ----------
+    config : SystemConfiguration
+    initial_states : DoubleTensor
+        4xN tensor with initial states.
+    inputs : DoubleTensor
+        TxN tensor with input cart accelerations.
+    cost_fn : TrajectoryCost
+
+    Returns
+    -------
+    RolloutGradients
+    """
+    systems_n = initial_states.shape[1]
+    inputs = inputs.detach().clone().requires_grad_(True)
+
+    # Per-system copies of parameters broadcast as 1xN tensors
+    gravity = torch.full(
+        (systems_n,), config.parameters.gravity, dtype=config.dtype, requires_grad=True
+    )
+    pole_length = torch.full(
+        (systems_n,),
+        config.parameters.pole_length,
+        dtype=config.dtype,
+        requires_grad=True,
+    )
+    parameters = RolloutParameters(gravity, pole_length)
+
+    trajectories = rollout(config, initial_states.detach(), inputs, parameters)
+    costs = cost_fn(trajectories, inputs)  # type: ignore
+    inputs_grad, gravity_grad, pole_length_grad = torch.autograd.grad(
+        costs.sum(), [inputs, gravity, pole_length]
+    )
+
+    return RolloutGradients(
+        trajectories=trajectories.detach(),  # type: ignore
+        costs=costs.detach(),  # type: ignore
+        inputs=inputs_grad,  # type: ignore
+        gravity=gravity_grad,  # type: ignore
+        pole_length=pole_length_grad,  # type: ignore
+    )
+
+
+def optimize_inputs(
+    config: SystemConfiguration,
+    initial_states: DoubleTensor,
+    horizon: int,
+    cost_fn: TrajectoryCost,
+    iterations: int = 100,
+    learning_rate: float = 0.1,
+    initial_inputs: Optional[DoubleTensor] = None,
+) -> Tuple[DoubleTensor, DoubleTensor, DoubleTensor]:
+    """
+    Optimizes input sequences for all the initial states at once with
+    single shooting and Adam.
+
+    Inputs are parametrized as `max_abs_acceleration * tanh(z)`, so they
+    always satisfy the acceleration limit.
+
+    Parameters
+    ----------
+    config : SystemConfiguration
+    initial_states : DoubleTensor
+        4xN tensor with initial states.
+    horizon : int
+        Number of simulation steps T.
+    cost_fn : TrajectoryCost
+    iterations : int
+        Number of optimizer steps.
+    learning_rate : float
+        Learning rate of Adam.
+    initial_inputs : DoubleTensor, optional
+        TxN tensor with initial guess, zeros by default.
+
+    Returns
+    -------
+    Tuple[DoubleTensor, DoubleTensor, DoubleTensor]
+        TxN tensor with optimized inputs, (T+1)x4xN tensor with their
+        trajectories and 1xN tensor with their costs.
+
+    Raises
+    ------
+    ValueError
+        If `horizon` is less than 1 or shape of `initial_inputs` is invalid.
+    """
+    if horizon < 1:
+        raise ValueError("Invalid horizon")
+
+    systems_n = initial_states.shape[1]
+    max_acc = config.limits.max_abs_acceleration
+
+    if initial_inputs is None:
+        initial_inputs = torch.zeros((horizon, systems_n), dtype=config.dtype)
+    if initial_inputs.shape != (horizon, systems_n):
+        raise ValueError("Invalid initial inputs shape")
+
+    # Keeps atanh finite for inputs on the limit
+    ratio = (initial_inputs / max_acc).clamp(-1 + 1e-6, 1 - 1e-6)
+    latent = torch.atanh(ratio).to(config.dtype).requires_grad_(True)
+    optimizer = torch.optim.Adam([latent], lr=learning_rate)
+    parameters = RolloutParameters.from_config(config)
+    initial_states = initial_states.detach()
+
+    for _ in range(iterations):
+        optimizer.zero_grad()
+        inputs = max_acc * torch.tanh(latent)
+        trajectories = rollout(config, initial_states, inputs, parameters)
+        cost_fn(trajectories, inputs).sum().backward()  # type: ignore
+        optimizer.step()
+
+    with torch.no_grad():
+        inputs = max_acc * torch.tanh(latent)
+        trajectories = rollout(config, initial_states, inputs, parameters)
+        costs = cost_fn(trajectories, inputs)  # type: ignore
+
+    return inputs, trajectories, costs  # type: ignore
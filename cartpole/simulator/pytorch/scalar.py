@@ -0,0 +1,141 @@
+"""
+This module contains scalar versions of the integrators, which advance a
+single CartPole system with plain float math. Stepping one system with
+tensors is dominated by torch dispatch overhead, so `CartPoleSystem` uses
+these instead.
+
+The dynamics and integration methods are the same as in `integrator`.
+"""
+
+
+from math import cos, sin
+from typing import Callable, Tuple
+
+from .config import SystemConfiguration
+
+ScalarState = Tuple[float, float, float, float]
+"""
+Cart position, pole angle, cart velocity and pole angular velocity.
+"""
+
+ScalarStepper = Callable[[ScalarState, float, float], ScalarState]
+
+
+def make_stepper(config: SystemConfiguration) -> ScalarStepper:
+    """
+    Creates a function which advances a system by a simulation step,
+    or by a part of it. The step is split into `integration_step_n`
+    substeps either way.
+
+    Parameters
+    ----------
+    config : SystemConfiguration
+
+    Returns
+    -------
+    ScalarStepper
+        Function of a state, an input cart acceleration and the step
+        duration, which returns the new state.
+
+    Raises
+    ------
+    ValueError
+        If the integrator is unknown.
+    """
+    discretization = config.discretization
+    coef = -1.5 / config.parameters.pole_length
+    grav = config.parameters.gravity
+
+    steps = discretization.integration_step_n
+    full_time = 1 / discretization.simulation_step_n
+
+    def heun(state: ScalarState, u: float, sim_time: float) -> ScalarState:
+        d_time = sim_time / steps
+        half = d_time / 2
+        x, a, v, w = state
+        for _ in range(steps):
+            dw1 = coef * (u * cos(a) + grav * sin(a))
+            a2 = a + w * d_time
+            w2 = w + dw1 * d_time
+            dw2 = coef * (u * cos(a2) + grav * sin(a2))
+            x += (2 * v + u * d_time) * half
+            a += (w + w2) * half
+            v += u * d_time
+            w += (dw1 + dw2) * half
+        return x, a, v, w
+
+    def rk4(state: ScalarState, u: float, sim_time: float) -> ScalarState:
+        d_time = sim_time / steps
+        half = d_time / 2
+        x, a, v, w = state
+        for _ in range(steps):
+            dw1 = coef * (u * cos(a) + grav * sin(a))
+            a2 = a + half * w
+            w2 = w + half * dw1
+            dw2 = coef * (u * cos(a2) + grav * sin(a2))
+            a3 = a + half * w2
+            w3 = w + half * dw2
+            dw3 = coef * (u * cos(a3) + grav * sin(a3))
+            a4 = a + d_time * w3
+            w4 = w + d_time * dw3
+            dw4 = coef * (u * cos(a4) + grav * sin(a4))
+            x += d_time * v + d_time * half * u
+            a += d_time / 6 * (w + 2 * w2 + 2 * w3 + w4)
+            v += d_time * u
+            w += d_time / 6 * (dw1 + 2 * dw2 + 2 * dw3 + dw4)
+        return x, a, v, w
+
+    def semi_implicit_euler(
+        state: ScalarState, u: float, sim_time: float
+    ) -> ScalarState:
+        d_time = sim_time / steps
+        x, a, v, w = state
+        for _ in range(steps):
+            dw = coef * (u * cos(a) + grav * sin(a))
+            v += u * d_time
+            w += dw * d_time
+            x += v * d_time
+            a += w * d_time
+        return x, a, v, w
+
+    tolerance = discretization.integration_tolerance
+    min_d_time = full_time * 1e-6
+
+    def adaptive(state: ScalarState, u: float, sim_time: float) -> ScalarState:
+        x, a, v, w = state
+        time, step = 0.0, sim_time / steps
+        while time < sim_time:
+            last = step >= sim_time - time
+            if last:
+                step = sim_time - time
+            step = max(step, min_d_time)
+
+            dw1 = coef * (u * cos(a) + grav * sin(a))
+            a2 = a + w * step
+            w2 = w + dw1 * step
+            dw2 = coef * (u * cos(a2) + grav * sin(a2))
+
+            # Difference between Heun and Euler solutions
+            error = max(abs(u) * step, abs(w2 - w), abs(dw2 - dw1)) * step / 2
+            if error <= tolerance or step <= min_d_time:
+                x += (2 * v + u * step) * step / 2
+                a += (w + w2) * step / 2
+                v += u * step
+                w += (dw1 + dw2) * step / 2
+                time = sim_time if last else time + step
+
+            scale = 0.9 * (tolerance / error) ** 0.5 if error > 0 else 2.0
+            step *= min(2.0, max(0.2, scale))
+        return x, a, v, w
+
+    steppers = {
+        "rk2": heun,
+        "rk4": rk4,
+        "semi_implicit_euler": semi_implicit_euler,
+        "adaptive": adaptive,
+    }
+
+    if discretization.integrator not in steppers:
+        raise ValueError(f"Unknown integrator {discretization.integrator}")
+
+    return steppers[discretization.integrator]
@@ -0,0 +1,109 @@
+"""
+This module contains CartPoleSimulator which exposes `CartPoleSystem`
+with the same interface as the pydrake simulator: device `Config` and
+`cartpole.common.State`, so both backends are interchangeable in sessions.
+"""
+
+
+from typing import Optional
+
+from cartpole.common import CartPoleBase, Config, Error
+from cartpole.common import State as DeviceState
+
+from .config import DiscretizationParameters, SystemConfiguration
+from .state import State
+from .system import CartPoleSystem
+
+
+class CartPoleSimulator(CartPoleBase):
+    """
+    Adapter of `CartPoleSystem` to the device interface.
+    """
+
+    def __init__(
+        self,
+        discretization: Optional[DiscretizationParameters] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        discretization : DiscretizationParameters, optional
+            Time discretization and integration method, defaults otherwise.
+        """
+        self.system = CartPoleSystem()
+        self.discretization = discretization or DiscretizationParameters()
+        self.config: Optional[Config] = None
+
+    def reset_to(self, config: Config, state: DeviceState) -> None:
+        """
+        Resets the system to the given state.
+        """
+        self.config = config
+        system_config = SystemConfiguration.from_config(config)
+        system_config.discretization = self.discretization
+        self.system.reset_to_state(
+            system_config,
+            State(
+                cart_position=state.cart_position,
+                pole_angle=state.pole_angle,
+                cart_velocity=state.cart_velocity,
+                angular_velocity=state.pole_angular_velocity,
+            ),
+        )
+
+    def reset(self, config: Config) -> None:
+        """
+        Resets the system to the home state.
+        """
+        self.reset_to(config, DeviceState.home())
+
+    def get_state(self) -> DeviceState:
+        """
+        Returns current state.
+        """
+        state = self.system.get_state()
+        return DeviceState(
+            cart_position=state.cart_position,
+            cart_velocity=state.cart_velocity,
+            pole_angle=state.pole_angle,
+            pole_angular_velocity=state.angular_velocity,
+            error=self.system.get_error(),
+            cart_acceleration=self.system.get_target(),
+        )
+
+    def get_info(self) -> dict:
+        """
+        Returns usefull debug information.
+        """
+        return {"time": self.system.timestamp()}
+
+    def get_target(self) -> float:
+        """
+        Returns current target acceleration.
+        """
+        return self.system.get_target()
+
+    def set_target(self, target: float) -> None:
+        """
+        Set desired target acceleration.
+        """
+        self.system.set_target(target)
+
+    def advance(self, delta: float) -> None:
+        """
+        Advance the dynamic system by delta seconds.
+        """
+        if self.system.get_error() != Error.NO_ERROR:
+            return
+        self.system.advance(delta)
+
+    def timestamp(self) -> float:
+        """
+        Current time.
+        """
+        return self.system.timestamp()
+
+    def close(self) -> None:
+        """
+        Free all allocated resources.
+        """
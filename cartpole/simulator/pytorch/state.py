@@ -7,9 +7,10 @@ The latter one is usually a batch.
 
 
 from dataclasses import dataclass
-from typing import Collection
+from typing import Collection, Optional
 
 from numpy import pi
+import torch
 from torch import DoubleTensor, LongTensor
 
 
@@ -76,23 +77,29 @@ class State:
             angular_velocity=0,
         )
 
-    def as_tensor(self) -> DoubleTensor:
+    def as_tensor(self, dtype: torch.dtype = torch.float64) -> DoubleTensor:
         """
         Returns current state as a 1x4 tensor
 
+        Parameters
+        ----------
+        dtype : torch.dtype
+            Floating point type of the tensor.
+
         Returns
         -------
         DoubleTensor
             1x4 Tensor containing `cart_position`,
             `pole_angle`, `cart_velocity` and `angular_velocity`
         """
-        return DoubleTensor(
+        return torch.tensor(  # type: ignore
             [
                 self.cart_position,
                 self.pole_angle,
                 self.cart_velocity,
                 self.angular_velocity,
-            ]
+            ],
+            dtype=dtype,
         )
 
     @staticmethod
@@ -142,7 +149,10 @@ class MultiSystemState:
     """
 
     @staticmethod
-    def home(systems_num: int) -> "MultiSystemState":
+    def home(
+        systems_num: int,
+        dtype: torch.dtype = torch.float64,
+    ) -> "MultiSystemState":
         """
         Initializes a MultiSystemState with home states.
 
@@ -150,16 +160,15 @@ class MultiSystemState:
         ----------
         systems_num : int
             Number of systems to simulate.
+        dtype : torch.dtype
+            Floating point type of states.
 
         Returns
         -------
         MultiSystemState
         """
-        data = DoubleTensor(size=(4, systems_num))
-        home_state = State.home().as_tensor()
-
-        for i in range(systems_num):
-            data[:, i] = home_state
+        home_state = State.home().as_tensor(dtype).reshape(4, 1)
+        data = home_state.repeat(1, systems_num)
 
         return MultiSystemState(_state_space=data)  # type: ignore
 
@@ -213,3 +222,51 @@ class MultiSystemState:
             - `state_space[3]` is a 1xN DoubleTensor containing angular velocities
         """
         return self._state_space
+
+    def snapshot(self, out: Optional[DoubleTensor] = None) -> DoubleTensor:
+        """
+        Copies all states, so they can be restored later.
+
+        Parameters
+        ----------
+        out : DoubleTensor, optional
+            Preallocated 4xN tensor to copy states to.
+            A new tensor is allocated if not given.
+
+        Returns
+        -------
+        DoubleTensor
+            4xN tensor with a copy of all states.
+
+        Raises
+        ------
+        ValueError
+            If shape of `out` differs from the shape of states.
+        """
+        if out is None:
+            return self._state_space.clone()  # type: ignore
+
+        if out.shape != self._state_space.shape:
+            raise ValueError("Invalid snapshot shape")
+
+        out.copy_(self._state_space)
+        return out
+
+    def restore(self, snapshot: DoubleTensor) -> None:
+        """
+        Overwrites all states in-place with a snapshot.
+
+        Parameters
+        ----------
+        snapshot : DoubleTensor
+            4xN tensor with states.
+
+        Raises
+        ------
+        ValueError
+            If shape of `snapshot` differs from the shape of states.
+        """
+        if snapshot.shape != self._state_space.shape:
+            raise ValueError("Invalid snapshot shape")
+
+        self._state_space.copy_(snapshot)
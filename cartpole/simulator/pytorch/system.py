@@ -10,18 +10,26 @@ evaluating new states (after inputs are applied).
 """
 
 
+import math
 from dataclasses import dataclass
+from typing import Optional, Tuple
 
 import torch
-from torch import DoubleTensor, cos, sin
+from torch import DoubleTensor
 
 from cartpole.common import CartPoleBase
 from cartpole.common import Error
 
 from .config import SystemConfiguration
-from .discreditizer import Discreditizer
+from .integrator import Integrator, get_integrator
 from .learning_context import MultiSystemLearningContext
-from .state import MultiSystemState, State
+from .scalar import ScalarState, ScalarStepper, make_stepper
+from .state import State
+
+# Default maximum number of (action, state) pairs evaluated at once
+DEFAULT_CHUNK_SIZE = 1 << 20
+# Relative to the simulation step, absorbs rounding of deltas like 0.29 s
+STEP_TOLERANCE = 1e-9
 
 
 class CartPoleMultiSystem:
@@ -33,6 +41,32 @@ class CartPoleMultiSystem:
     neccessary calculations for multiple CartPole systems at a time.
     """
 
+    @staticmethod
+    def integrate(
+        config: SystemConfiguration,
+        states: DoubleTensor,
+        inputs: DoubleTensor,
+        integrator: Optional[Integrator] = None,
+    ) -> None:
+        """
+        Integrates system dynamics over one simulation step, in-place.
+        The integration method is selected by discretization parameters.
+
+        Parameters
+        ----------
+        config : SystemConfiguration
+        states : DoubleTensor
+            4xN tensor with states, which is overwritten with new states.
+        inputs : DoubleTensor
+            A 1xN tensor containing input cart accelerations.
+        integrator : Integrator, optional
+            Integrator with own work buffers, the one shared by the calls
+            of the current thread by default.
+        """
+        if integrator is None:
+            integrator = get_integrator(config.discretization)
+        integrator.step(config, states, inputs)
+
     @staticmethod
     def eval_transitions(
         context: MultiSystemLearningContext, inputs: DoubleTensor
@@ -46,38 +80,68 @@ class CartPoleMultiSystem:
         inputs : DoubleTensor
             A 1xN tensor containing input cart accelerations.
         """
-        # Current state
-        cur_st = context.batch_state.states
-        steps: int = context.config.discretization.integration_step_n
-        # dynamics delta time
-        d_time: float = 1 / (steps * context.config.discretization.simulation_step_n)
-
-        # Gravitational constant
-        grav: float = context.config.parameters.gravity
-        pole_len: float = context.config.parameters.pole_length
-
-        def compute_derivative(state: DoubleTensor):
-            # FIXME : Use 2 pre-allocated arrays instead of creating new ones
-            ang = state[1]
-            return torch.vstack(
-                (
-                    state[2],
-                    state[3],
-                    inputs,
-                    -1.5 / pole_len * (inputs * cos(ang) + grav * sin(ang)),
-                )
-            )
+        CartPoleMultiSystem.integrate(
+            context.config,
+            context.batch_state.states,
+            inputs,
+        )
+
+    @staticmethod
+    def eval_transitions_into(
+        context: MultiSystemLearningContext,
+        inputs: DoubleTensor,
+        out: DoubleTensor,
+    ) -> DoubleTensor:
+        """
+        Calculates new states without changing the batch state.
+
+        Every call starts from the current batch state, so candidate inputs
+        can be scored against the same start state. Use `commit_transitions`
+        to make the chosen states current.
+
+        Parameters
+        ----------
+        context : MultiSystemLearningContext
+        inputs : DoubleTensor
+            A 1xN tensor containing input cart accelerations.
+        out : DoubleTensor
+            Preallocated 4xN tensor the new states are written to.
+
+        Returns
+        -------
+        DoubleTensor
+            `out` filled with new states.
+
+        Raises
+        ------
+        ValueError
+            If shape of `out` differs from the batch state shape.
+        """
+        context.batch_state.snapshot(out)
+        CartPoleMultiSystem.integrate(context.config, out, inputs)
+        return out
 
-        for _ in range(steps):
-            # Evaluate derivatives
-            ds1 = compute_derivative(cur_st)  # type: ignore
-            ds2 = compute_derivative(cur_st + ds1 * d_time)  # type: ignore
-            cur_st += (ds1 + ds2) / 2 * d_time  # type: ignore
+    @staticmethod
+    def commit_transitions(
+        context: MultiSystemLearningContext,
+        new_states: DoubleTensor,
+    ) -> None:
+        """
+        Makes states calculated by `eval_transitions_into` current.
+
+        Parameters
+        ----------
+        context : MultiSystemLearningContext
+        new_states : DoubleTensor
+            4xN tensor with new states.
+        """
+        context.batch_state.restore(new_states)
 
     @staticmethod
     def eval_transition_costs(
         context: MultiSystemLearningContext,
         inputs: DoubleTensor,
+        states: Optional[DoubleTensor] = None,
     ) -> DoubleTensor:
         """
         Evaluates new states cost and action costs.
@@ -87,6 +151,8 @@ class CartPoleMultiSystem:
         context : MultiSystemLearningContext
         inputs : DoubleTensor
             The inputs applied
+        states : DoubleTensor, optional
+            4xK tensor with new states, the batch state is used by default.
 
         Returns
         -------
@@ -94,57 +160,119 @@ class CartPoleMultiSystem:
             1xK Tensor containing total cost of applying
             i-th action to i-th state.
         """
-        states_cost = context.states_cost_fn(context.batch_state.states)
+        if states is None:
+            states = context.batch_state.states
+
+        states_cost = context.states_cost_fn(states)
         inputs_cost = context.inputs_cost_fn(inputs)
 
         return states_cost + inputs_cost  # type: ignore
 
     @staticmethod
-    def get_best_accelerations(context: MultiSystemLearningContext) -> DoubleTensor:
+    def eval_best_inputs(
+        context: MultiSystemLearningContext,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> Tuple[DoubleTensor, DoubleTensor]:
         """
-        Returns best input for each state.
+        Evaluates every (action, state) pair and chooses the cheapest action
+        for each state. The batch state is left untouched.
+
+        All the pairs are processed as a single broadcasted tensor of shape
+        4x(A*N), split into chunks of at most `chunk_size` pairs to bound
+        memory usage.
 
         Parameters
         ----------
         context : MultiSystemLearningContext
+        chunk_size : int
+            Maximum number of (action, state) pairs evaluated at once.
+
         Returns
         -------
-        DoubleTensor
-            1xK Tensor with best inputs for all the states.
+        Tuple[DoubleTensor, DoubleTensor]
+            1xK Tensor with best inputs for all the states and
+            1xK Tensor with costs of these inputs.
+
+        Raises
+        ------
+        ValueError
+            If `chunk_size` is less than 1.
         """
+        if chunk_size < 1:
+            raise ValueError("Invalid chunk size")
+
+        accelerations = context.discreditizer.cart_accelerations
+        actions_n = accelerations.shape[0]
+        states = context.batch_state.states
+        size = context.batch_size
+
         best_costs: DoubleTensor = torch.full(
-            size=(context.batch_size,),
+            size=(size,),
             fill_value=torch.inf,
-            dtype=torch.float64,
-        )  # type: ignore
-        best_inputs: DoubleTensor = torch.zeros(
-            size=(context.batch_size,),
-            dtype=torch.float64,
+            dtype=states.dtype,
         )  # type: ignore
+        best_indices = torch.zeros(size=(size,), dtype=torch.long)
+
+        states_step = min(size, chunk_size)
+        actions_step = min(actions_n, max(1, chunk_size // states_step))
+
+        # Buffers are allocated once and reused by every chunk
+        pairs_buffer = torch.empty(
+            size=(4, actions_step * states_step),
+            dtype=states.dtype,
+        )
+        inputs_buffer = torch.empty(
+            size=(actions_step * states_step,),
+            dtype=states.dtype,
+        )
+
+        for begin in range(0, size, states_step):
+            end = min(begin + states_step, size)
+            batch = states[:, begin:end]
 
-        for acc in context.discreditizer.cart_accelerations:
-            inputs: DoubleTensor = torch.full(
-                size=(context.batch_size,),
-                fill_value=acc,  # type: ignore
-                dtype=torch.float64,
-            )  # type: ignore
+            for first in range(0, actions_n, actions_step):
+                last = min(first + actions_step, actions_n)
+                pairs_n = (last - first) * (end - begin)
 
-            CartPoleMultiSystem.eval_transitions(context, inputs)
-            costs = CartPoleMultiSystem.eval_transition_costs(
-                context,
-                inputs,
-            )
+                # Action-major layout: pair `i * n + j` is (action i, state j)
+                next_states = pairs_buffer[:, :pairs_n]
+                next_states.view(4, last - first, -1).copy_(batch.unsqueeze(1))
+                inputs = inputs_buffer[:pairs_n]
+                inputs.view(last - first, -1).copy_(
+                    accelerations[first:last].unsqueeze(1)
+                )
 
-            # Define a mask which says if i-th cost was better than current one
-            rng = range(context.batch_size)
+                CartPoleMultiSystem.integrate(context.config, next_states, inputs)
+                costs = CartPoleMultiSystem.eval_transition_costs(
+                    context, inputs, next_states  # type: ignore
+                )
 
-            better_mask = [costs[i] < best_costs[i] for i in rng]
+                chunk_costs, chunk_indices = costs.reshape(last - first, -1).min(0)
 
-            # update minimum costs
-            best_costs = torch.minimum(best_costs, costs)  # type: ignore
-            # update best inputs
-            best_inputs[better_mask] = acc
+                better = chunk_costs < best_costs[begin:end]
+                best_costs[begin:end] = torch.where(
+                    better, chunk_costs, best_costs[begin:end]
+                )
+                best_indices[begin:end] = torch.where(
+                    better, chunk_indices + first, best_indices[begin:end]
+                )
+
+        return accelerations[best_indices], best_costs  # type: ignore
+
+    @staticmethod
+    def get_best_accelerations(context: MultiSystemLearningContext) -> DoubleTensor:
+        """
+        Returns best input for each state.
 
+        Parameters
+        ----------
+        context : MultiSystemLearningContext
+        Returns
+        -------
+        DoubleTensor
+            1xK Tensor with best inputs for all the states.
+        """
+        best_inputs, _ = CartPoleMultiSystem.eval_best_inputs(context)
         return best_inputs
 
 
@@ -161,27 +289,21 @@ class CartPoleSystem(CartPoleBase):
         described by Barto, Sutton, and Anderson
     Initial state:
         A pole is at starting position 0 with no velocity and acceleration.
+    Technical details:
+        A single system is advanced with scalar float math (see `scalar`),
+        which gives the same results as `CartPoleMultiSystem` without
+        torch dispatch overhead.
     """
 
-    _context: MultiSystemLearningContext
+    _state: ScalarState
+    _stepper: ScalarStepper
     _current_input: float = 0
-    _config: SystemConfiguration = SystemConfiguration()
+    _config: SystemConfiguration
     _current_time: float = 0
     _error: Error = Error.NO_ERROR
 
-    def _setup_context(
-        self,
-        state: State,
-    ) -> None:
-        batch_state = state.as_tensor().reshape(4, -1)
-        batch_ms_state = MultiSystemState(batch_state)  # type: ignore
-        self._context = MultiSystemLearningContext(
-            states_cost_fn=None,  # type: ignore
-            inputs_cost_fn=None,  # type: ignore
-            config=self._config,
-            discreditizer=Discreditizer(self._config),
-            batch_state=batch_ms_state,
-        )
+    def __init__(self) -> None:
+        self.reset(SystemConfiguration())
 
     def reset(self, config: SystemConfiguration) -> None:
         """
@@ -189,23 +311,26 @@ class CartPoleSystem(CartPoleBase):
         The pole is at rest position and cart is centered.
         It must be called at the beginning of any session.
         """
-        self._setup_context(State.home())
-
-        self._config = config
-        self._current_time = 0
+        self.reset_to_state(config, State.home())
 
     def reset_to_state(self, config: SystemConfiguration, state: State) -> None:
-        self._setup_context(state)
-
         self._config = config
+        self._stepper = make_stepper(config)
+        self._state = (
+            float(state.cart_position),
+            float(state.pole_angle),
+            float(state.cart_velocity),
+            float(state.angular_velocity),
+        )
+        self._current_input = 0
         self._current_time = 0
+        self._error = Error.NO_ERROR
 
     def get_state(self) -> State:
         """
         Returns current device state.
         """
-        state_tensor = self._context.batch_state.states.flatten()
-        return State.from_collection(state_tensor)  # type: ignore
+        return State.from_collection(self._state)
 
     def get_info(self) -> dict:
         """
@@ -219,6 +344,12 @@ class CartPoleSystem(CartPoleBase):
         """
         return self._current_input
 
+    def get_error(self) -> Error:
+        """
+        Returns the error which stopped the simulation.
+        """
+        return self._error
+
     def set_target(self, target: float) -> None:
         """
         Set desired target acceleration.
@@ -233,6 +364,8 @@ class CartPoleSystem(CartPoleBase):
     def advance(self, delta: float) -> None:
         """
         Advance the dynamic system by delta seconds.
+        A delta which is not a whole number of simulation steps
+        ends with a shorter step.
         """
         if self._error != Error.NO_ERROR:
             print(f"Error occurred: {self._error}. Simulation is stopped")
@@ -241,24 +374,31 @@ class CartPoleSystem(CartPoleBase):
         max_x = self._config.limits.max_abs_position
         max_v = self._config.limits.max_abs_velocity
 
-        sim_steps = self._config.discretization.simulation_step_n
-        for _ in range(int(delta * sim_steps)):
-            CartPoleMultiSystem.eval_transitions(
-                context=self._context,
-                inputs=torch.full(
-                    size=(1,),
-                    fill_value=self._current_input,  # type: ignore
-                    dtype=torch.float64,
-                ),
-            )
+        stepper = self._stepper
+        state = self._state
+        target = self._current_input
+
+        # Whole simulation steps, then the remainder as a shorter step,
+        # so the state always matches the timestamp
+        sim_time = 1 / self._config.discretization.simulation_step_n
+        whole = math.floor(delta / sim_time + STEP_TOLERANCE)
+        remainder = delta - whole * sim_time
+        if remainder <= STEP_TOLERANCE * sim_time:
+            remainder = 0.0
+
+        for step in range(whole + (remainder > 0)):
+            duration = sim_time if step < whole else remainder
+            state = stepper(state, target, duration)
 
             # Check that all the limits are ok
-            state = self._context.batch_state.states[:, 0]
             if not -max_x <= state[0] <= max_x:
                 self._error = Error.X_OVERFLOW
-            if not -max_v <= state[1] <= max_v:
+                break
+            if not -max_v <= state[2] <= max_v:
                 self._error = Error.V_OVERFLOW
+                break
 
+        self._state = state
         self._current_time += delta
 
     def timestamp(self) -> float:
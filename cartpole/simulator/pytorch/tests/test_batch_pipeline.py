@@ -0,0 +1,81 @@
+import pytest
+import torch
+
+from cartpole.simulator.pytorch.batch_pipeline import (
+    SAMPLING_METHODS,
+    BatchPipeline,
+    BatchSampler,
+)
+from cartpole.simulator.pytorch.discreditizer import Discreditizer
+from cartpole.simulator.pytorch.tests.test_system import get_config, get_context
+
+
+class TestBatchSampler:
+    @pytest.mark.parametrize("method", SAMPLING_METHODS)
+    def test_indices_are_valid(self, method):
+        discreditizer = Discreditizer(get_config())
+        sampler = BatchSampler(discreditizer, 100, method, seed=0)
+        out = torch.empty(100, dtype=torch.long)
+
+        for _ in range(5):
+            indices = sampler.sample(out)
+            assert indices is out
+            assert 0 <= indices.min() and indices.max() < discreditizer.space_size
+
+    def test_without_replacement_covers_space(self):
+        discreditizer = Discreditizer(get_config())
+        size = discreditizer.space_size
+        sampler = BatchSampler(discreditizer, size // 5, "without_replacement", seed=0)
+        out = torch.empty(size // 5, dtype=torch.long)
+
+        seen = torch.cat([sampler.sample(out).clone() for _ in range(5)])
+        assert torch.equal(seen.sort().values, torch.arange(size))
+
+    def test_stratified_hits_every_stratum(self):
+        discreditizer = Discreditizer(get_config())
+        sampler = BatchSampler(discreditizer, 50, "stratified", seed=0)
+        indices = sampler.sample(torch.empty(50, dtype=torch.long))
+
+        strata = indices * 50 // discreditizer.space_size
+        assert torch.equal(strata, torch.arange(50))
+
+
+class TestBatchPipeline:
+    def test_batches_match_indices(self):
+        context = get_context(1)
+        discreditizer = context.discreditizer
+
+        with BatchPipeline(discreditizer, 64, prefetch_n=2, seed=0) as pipeline:
+            buffers = set()
+            for _ in range(6):
+                states = pipeline.next()
+                expected = discreditizer.get_states(pipeline.batch_indices)
+                assert torch.equal(states, expected)
+                buffers.add(states.data_ptr())
+
+            # Buffers are reused
+            assert len(buffers) == 3
+
+    def test_update_batch(self):
+        context = get_context(1)
+
+        with BatchPipeline(context.discreditizer, 32, seed=0) as pipeline:
+            context.batch_pipeline = pipeline
+            context.update_batch(32)
+            assert context.batch_size == 32
+
+            with pytest.raises(ValueError):
+                context.update_batch(16)
+
+    def test_worker_error_is_raised_by_every_call(self, monkeypatch):
+        discreditizer = get_context(1).discreditizer
+
+        def fail(*_, **__):
+            raise IndexError("broken")
+
+        monkeypatch.setattr(discreditizer, "get_states", fail)
+        with BatchPipeline(discreditizer, 32, seed=0) as pipeline:
+            for _ in range(3):
+                with pytest.raises(RuntimeError) as error:
+                    pipeline.next()
+                assert isinstance(error.value.__cause__, IndexError)
@@ -0,0 +1,77 @@
+import dataclasses as dc
+import functools
+
+import pytest
+import torch
+
+from cartpole.simulator.pytorch.cache import TransitionCache
+from cartpole.simulator.pytorch.discreditizer import Discreditizer
+from cartpole.simulator.pytorch.tests.test_system import get_config, get_context
+from cartpole.simulator.pytorch.value_iteration import TransitionTable, cost_fn_tag
+
+
+class TestTransitionCache:
+    def test_key_depends_on_config(self, tmp_path):
+        config = get_config()
+        other = dc.replace(config, dtype=torch.float32)
+
+        assert (
+            TransitionCache(config, tmp_path).key
+            == TransitionCache(config, tmp_path).key
+        )
+        assert (
+            TransitionCache(config, tmp_path).key
+            != TransitionCache(other, tmp_path).key
+        )
+
+    def test_states_are_loaded_from_cache(self, tmp_path):
+        config = get_config()
+        cache = TransitionCache(config, tmp_path)
+        expected = Discreditizer(config).all_states
+
+        assert not cache.contains("all_states")
+        Discreditizer(config, cache=cache)
+        assert cache.contains("all_states")
+
+        cached = Discreditizer(config, cache=TransitionCache(config, tmp_path))
+        assert torch.equal(cached.all_states, expected)
+
+    def test_transition_table_roundtrip(self, tmp_path):
+        context = get_context()
+        cache = TransitionCache(context.config, tmp_path)
+
+        built = TransitionTable.load_or_build(context, cache)
+        loaded = TransitionTable.load_or_build(context, cache)
+
+        assert torch.equal(built.next_indices, loaded.next_indices)
+        assert torch.equal(built.costs, loaded.costs)
+
+    def test_cost_tag_depends_on_code(self):
+        def cost(states):
+            return states.sum(dim=0)
+
+        def other_cost(states):
+            return states.abs().sum(dim=0)
+
+        def make_scaled(scale):
+            return lambda states: scale * states.sum(dim=0)
+
+        assert cost_fn_tag(cost) == cost_fn_tag(cost)
+        assert cost_fn_tag(cost) != cost_fn_tag(other_cost)
+        assert cost_fn_tag(lambda x: x + 1) != cost_fn_tag(lambda x: x + 2)
+        assert cost_fn_tag(make_scaled(1)) != cost_fn_tag(make_scaled(2))
+
+        with pytest.raises(ValueError):
+            cost_fn_tag(functools.partial(cost))
+
+    def test_changed_costs_are_rebuilt(self, tmp_path):
+        context = get_context()
+        cache = TransitionCache(context.config, tmp_path)
+        built = TransitionTable.load_or_build(context, cache)
+
+        cost = context.states_cost_fn
+        other = dc.replace(context, states_cost_fn=lambda states: 2 * cost(states))
+        rebuilt = TransitionTable.load_or_build(other, cache)
+
+        assert torch.equal(built.next_indices, rebuilt.next_indices)
+        assert not torch.equal(built.costs, rebuilt.costs)
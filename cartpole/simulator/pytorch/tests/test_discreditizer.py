@@ -0,0 +1,42 @@
+import torch
+
+from cartpole.simulator.pytorch.discreditizer import Discreditizer
+from cartpole.simulator.pytorch.tests.test_system import get_config
+
+
+class TestDiscreditizer:
+    def test_states_order_matches_meshgrid(self):
+        discreditizer = Discreditizer(get_config())
+        grids = torch.meshgrid(discreditizer.axes, indexing="ij")
+        expected = torch.vstack([grid.flatten() for grid in grids])
+
+        assert discreditizer.space_size == 5 * 7 * 5 * 9
+        assert torch.equal(discreditizer.all_states, expected)
+
+    def test_lazy_states_match_materialized(self):
+        discreditizer = Discreditizer(get_config())
+        lazy = Discreditizer(get_config(), lazy=True)
+        indices = torch.randint(0, lazy.space_size, (100,))
+
+        assert lazy.space_size == discreditizer.space_size
+        assert torch.equal(
+            lazy.get_states(indices), discreditizer.all_states[:, indices]
+        )
+        assert torch.equal(lazy.all_states, discreditizer.all_states)
+
+    def test_nearest_indices_of_grid_states(self):
+        discreditizer = Discreditizer(get_config(), lazy=True)
+        indices = torch.arange(discreditizer.space_size)
+
+        # The last pole angle (2*pi) is the same as the first one
+        angles_n = discreditizer.shape[1]
+        angle_indices = indices // (5 * 9) % angles_n
+        expected = torch.where(
+            angle_indices == angles_n - 1, indices - (angles_n - 1) * 5 * 9, indices
+        )
+
+        nearest, outside = discreditizer.nearest_indices(
+            discreditizer.get_states(indices)
+        )
+        assert torch.equal(nearest, expected)
+        assert not outside.any()
@@ -0,0 +1,29 @@
+import pytest
+import torch
+
+from cartpole.simulator.pytorch.parallel import ShardedExecutor
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem
+from cartpole.simulator.pytorch.tests.test_system import get_context
+
+
+class TestShardedExecutor:
+    def test_results_match_serial(self):
+        context = get_context(batch_size=101)
+        serial = get_context(batch_size=101)
+
+        with ShardedExecutor(context, workers_n=3) as executor:
+            inputs, costs = executor.eval_best_inputs(chunk_size=50)
+            expected_inputs, expected_costs = CartPoleMultiSystem.eval_best_inputs(
+                serial, chunk_size=50
+            )
+            assert torch.allclose(inputs, expected_inputs)
+            assert torch.allclose(costs, expected_costs)
+
+            executor.eval_transitions(inputs)
+            CartPoleMultiSystem.eval_transitions(serial, expected_inputs)
+            assert torch.allclose(context.batch_state.states, serial.batch_state.states)
+
+    @pytest.mark.parametrize("workers_n", [0, -1])
+    def test_invalid_workers_n(self, workers_n):
+        with pytest.raises(ValueError):
+            ShardedExecutor(get_context(), workers_n=workers_n)
@@ -0,0 +1,36 @@
+import numpy as np
+import torch
+
+from cartpole.actors.policy_table import PolicyTableActor
+from cartpole.common.interface import State
+from cartpole.simulator.pytorch.policy_table import tabulate_policy
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem
+from cartpole.simulator.pytorch.tests.test_system import get_context
+
+
+class TestPolicyTable:
+    def test_tabulated_actions_match_best_inputs(self, tmp_path):
+        context = get_context(16)
+        table = tabulate_policy(context, chunk_size=1000)
+        assert table.actions.dtype == np.uint8
+        assert context.batch_size == 16
+
+        table.save(tmp_path / "policy")
+        actor = PolicyTableActor(tmp_path / "policy")
+        interpolating = PolicyTableActor(tmp_path / "policy", interpolate=True)
+
+        expected = CartPoleMultiSystem.get_best_accelerations(context)
+        for i, q in enumerate(context.batch_state.states.T.tolist()):
+            state = State.from_array(q)
+            assert abs(actor(state) - expected[i].item()) < 1e-9
+            assert abs(interpolating(state) - expected[i].item()) < 1e-9
+
+    def test_interpolation_is_bounded(self):
+        context = get_context(1)
+        table = tabulate_policy(context)
+        max_acc = context.config.limits.max_abs_acceleration
+
+        torch.manual_seed(1)
+        for q in (torch.rand(4, 100, dtype=torch.float64) * 2 - 1).T.tolist():
+            value = table.interpolate(q)
+            assert -max_acc - 1e-9 <= value <= max_acc + 1e-9
@@ -0,0 +1,76 @@
+import dataclasses as dc
+
+import pytest
+import torch
+
+from cartpole.simulator.pytorch.rollout import (
+    optimize_inputs,
+    rollout,
+    rollout_gradients,
+)
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem
+from cartpole.simulator.pytorch.tests.test_system import get_config, get_context
+
+
+def trajectory_cost(trajectories, inputs):
+    upright = (trajectories[:, 1] - torch.pi) ** 2 + trajectories[:, 0] ** 2
+    return upright.sum(0) + 0.01 * (inputs**2).sum(0)
+
+
+class TestRollout:
+    @pytest.mark.parametrize("integrator", ["rk2", "rk4", "semi_implicit_euler"])
+    def test_matches_eval_transitions(self, integrator):
+        context = get_context(32)
+        context.config.discretization = dc.replace(
+            context.config.discretization, integrator=integrator
+        )
+        initial = context.batch_state.states.clone()
+        inputs = torch.randn(5, 32, dtype=torch.float64)
+
+        trajectories = rollout(context.config, initial, inputs)
+        assert trajectories.shape == (6, 4, 32)
+        assert torch.equal(trajectories[0], initial)
+
+        for step, step_inputs in enumerate(inputs):
+            CartPoleMultiSystem.eval_transitions(context, step_inputs)
+            expected = context.batch_state.states
+            assert torch.allclose(trajectories[step + 1], expected, atol=1e-12)
+
+    def test_gradients_match_finite_differences(self):
+        config = get_config()
+        initial = get_context(4).batch_state.states.clone()
+        inputs = torch.randn(3, 4, dtype=torch.float64)
+
+        gradients = rollout_gradients(config, initial, inputs, trajectory_cost)
+        assert gradients.inputs.shape == (3, 4)
+        assert gradients.gravity.shape == (4,)
+
+        eps = 1e-6
+        shifted = inputs.clone()
+        shifted[1, 2] += eps
+        costs = trajectory_cost(rollout(config, initial, shifted), shifted)
+        numeric = (costs[2] - gradients.costs[2]) / eps
+        assert abs(numeric - gradients.inputs[1, 2]) < 1e-3
+
+        longer = dc.replace(
+            config,
+            parameters=dc.replace(
+                config.parameters, pole_length=config.parameters.pole_length + eps
+            ),
+        )
+        costs = trajectory_cost(rollout(longer, initial, inputs), inputs)
+        numeric = (costs - gradients.costs) / eps
+        assert torch.allclose(numeric, gradients.pole_length, atol=1e-3)
+
+    def test_optimize_inputs_reduces_cost(self):
+        config = get_config()
+        initial = get_context(8).batch_state.states.clone()
+        zero = torch.zeros(10, 8, dtype=torch.float64)
+        initial_costs = trajectory_cost(rollout(config, initial, zero), zero)
+
+        inputs, trajectories, costs = optimize_inputs(
+            config, initial, 10, trajectory_cost, iterations=20
+        )
+        assert inputs.abs().max() <= config.limits.max_abs_acceleration
+        assert torch.equal(trajectories[0], initial)
+        assert (costs <= initial_costs).all()
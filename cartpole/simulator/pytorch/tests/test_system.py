@@ -0,0 +1,247 @@
+import threading
+
+import pytest
+import torch
+
+from cartpole.common import Error
+from cartpole.simulator.pytorch.config import (
+    DiscretizationParameters,
+    SystemConfiguration,
+)
+from cartpole.simulator.pytorch.discreditizer import Discreditizer
+from cartpole.simulator.pytorch.learning_context import MultiSystemLearningContext
+from cartpole.simulator.pytorch.state import MultiSystemState, State
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem, CartPoleSystem
+
+EPS = 1e-9
+
+
+def get_config():
+    return SystemConfiguration(
+        discretization=DiscretizationParameters(
+            cart_position=5,
+            pole_angle=7,
+            cart_velocity=5,
+            pole_angular_velocity=9,
+            cart_acceleration=11,
+        )
+    )
+
+
+def states_cost(states):
+    return (states[1] - torch.pi) ** 2 + states[0] ** 2 + 0.1 * states[3] ** 2
+
+
+def inputs_cost(inputs):
+    return 0.01 * inputs**2
+
+
+def get_context(batch_size=64):
+    config = get_config()
+    context = MultiSystemLearningContext(
+        states_cost_fn=states_cost,
+        inputs_cost_fn=inputs_cost,
+        config=config,
+        batch_state=MultiSystemState.home(1),
+        discreditizer=Discreditizer(config),
+    )
+    torch.manual_seed(0)
+    context.update_batch(batch_size)
+    return context
+
+
+def naive_best_inputs(context):
+    best_costs = torch.full((context.batch_size,), torch.inf, dtype=torch.float64)
+    best_inputs = torch.zeros(context.batch_size, dtype=torch.float64)
+
+    for acc in context.discreditizer.cart_accelerations:
+        inputs = torch.full((context.batch_size,), float(acc), dtype=torch.float64)
+        states = context.batch_state.states.clone()
+        CartPoleMultiSystem.integrate(context.config, states, inputs)
+        costs = states_cost(states) + inputs_cost(inputs)
+
+        better = costs < best_costs
+        best_costs[better] = costs[better]
+        best_inputs[better] = acc
+
+    return best_inputs, best_costs
+
+
+class TestCartPoleMultiSystem:
+    def test_best_inputs_match_naive_sweep(self):
+        context = get_context()
+        expected_inputs, expected_costs = naive_best_inputs(context)
+
+        for chunk_size in (1, 7, 64, 1 << 20):
+            inputs, costs = CartPoleMultiSystem.eval_best_inputs(context, chunk_size)
+            assert torch.allclose(inputs, expected_inputs, atol=EPS)
+            assert torch.allclose(costs, expected_costs, atol=EPS)
+
+    def test_best_inputs_keep_batch_state(self):
+        context = get_context()
+        before = context.batch_state.states.clone()
+
+        CartPoleMultiSystem.get_best_accelerations(context)
+
+        assert torch.equal(context.batch_state.states, before)
+
+    def test_eval_transitions_into_is_side_effect_free(self):
+        context = get_context()
+        before = context.batch_state.states.clone()
+        out = torch.empty_like(before)
+
+        for acc in context.discreditizer.cart_accelerations:
+            inputs = torch.full((context.batch_size,), float(acc), dtype=torch.float64)
+            CartPoleMultiSystem.eval_transitions_into(context, inputs, out)
+
+            expected = before.clone()
+            CartPoleMultiSystem.integrate(context.config, expected, inputs)
+            assert torch.allclose(out, expected, atol=EPS)
+            assert torch.equal(context.batch_state.states, before)
+
+        CartPoleMultiSystem.commit_transitions(context, out)
+        assert torch.equal(context.batch_state.states, out)
+
+    def test_integrators_converge_to_reference(self):
+        context = get_context()
+        inputs = torch.linspace(-5, 5, context.batch_size, dtype=torch.float64)
+
+        reference_config = get_config()
+        reference_config.discretization.integrator = "rk4"
+        reference_config.discretization.integration_step_n = 200
+        reference = context.batch_state.states.clone()
+        CartPoleMultiSystem.integrate(reference_config, reference, inputs)
+
+        for integrator, tolerance in [
+            ("rk2", 1e-5),
+            ("rk4", 1e-9),
+            ("semi_implicit_euler", 1e-2),
+            ("adaptive", 1e-4),
+        ]:
+            config = get_config()
+            config.discretization.integrator = integrator
+            states = context.batch_state.states.clone()
+            CartPoleMultiSystem.integrate(config, states, inputs)
+
+            assert torch.allclose(states, reference, atol=tolerance), integrator
+
+    def test_fused_integrators_match_in_place(self):
+        context = get_context()
+        inputs = torch.linspace(-5, 5, context.batch_size, dtype=torch.float64)
+
+        for integrator in ["rk2", "rk4", "semi_implicit_euler"]:
+            config = get_config()
+            config.discretization.integrator = integrator
+            expected = context.batch_state.states.clone()
+            CartPoleMultiSystem.integrate(config, expected, inputs)
+
+            config.discretization.fused_integrator = True
+            states = context.batch_state.states.clone()
+            try:
+                CartPoleMultiSystem.integrate(config, states, inputs)
+            except Exception as error:  # pylint: disable=broad-except
+                pytest.skip(f"Kernel compilation is unavailable: {error}")
+
+            assert torch.allclose(states, expected, atol=1e-12), integrator
+
+    def test_threads_have_own_buffers(self):
+        config = get_config()
+        config.discretization.integrator = "rk4"
+        sizes = [500, 1500]
+        starts = [get_context(size).batch_state.states for size in sizes]
+
+        def run(states):
+            inputs = torch.ones(len(states[0]), dtype=torch.float64)
+            for _ in range(20):
+                CartPoleMultiSystem.integrate(config, states, inputs)
+
+        expected = [start.clone() for start in starts]
+        for states in expected:
+            run(states)
+
+        results = [start.clone() for start in starts]
+        threads = [threading.Thread(target=run, args=(states,)) for states in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for states, reference in zip(results, expected):
+            assert torch.equal(states, reference)
+
+    def test_float32_matches_float64(self):
+        context = get_context()
+        config = get_config()
+        config.dtype = torch.float32
+        context32 = MultiSystemLearningContext(
+            states_cost_fn=states_cost,
+            inputs_cost_fn=inputs_cost,
+            config=config,
+            batch_state=MultiSystemState(context.batch_state.states.float()),
+            discreditizer=Discreditizer(config),
+        )
+
+        inputs, _ = CartPoleMultiSystem.eval_best_inputs(context)
+        inputs32, _ = CartPoleMultiSystem.eval_best_inputs(context32)
+        assert inputs32.dtype == torch.float32
+        assert torch.allclose(inputs32.double(), inputs, atol=1e-5)
+
+        CartPoleMultiSystem.eval_transitions(context, inputs)
+        CartPoleMultiSystem.eval_transitions(context32, inputs32)
+        states32 = context32.batch_state.states
+        assert states32.dtype == torch.float32
+        assert torch.allclose(states32.double(), context.batch_state.states, atol=1e-4)
+
+
+class TestCartPoleSystem:
+    def test_scalar_path_matches_batched(self):
+        initial = State(0.05, 3.0, 0.1, -0.5)
+
+        for integrator in ("rk2", "rk4", "semi_implicit_euler", "adaptive"):
+            config = get_config()
+            config.discretization.integrator = integrator
+
+            system = CartPoleSystem()
+            system.reset_to_state(config, initial)
+            states = initial.as_tensor().reshape(4, 1)
+
+            for target in (1.0, -2.0, 0.5, 3.0, -1.0):
+                system.set_target(target)
+                system.advance(0.1)
+
+                inputs = torch.full((1,), target, dtype=torch.float64)
+                for _ in range(10):
+                    CartPoleMultiSystem.integrate(config, states, inputs)
+
+            expected = State.from_collection(states.flatten().tolist())
+            state = system.get_state()
+            assert abs(state.cart_position - expected.cart_position) < EPS
+            assert abs(state.pole_angle - expected.pole_angle) < EPS
+            assert abs(state.cart_velocity - expected.cart_velocity) < EPS
+            assert abs(state.angular_velocity - expected.angular_velocity) < EPS
+            assert system.timestamp() == pytest.approx(0.5)
+
+    def test_velocity_limit(self):
+        config = get_config()
+        config.limits.max_abs_velocity = 0.5
+
+        system = CartPoleSystem()
+        system.reset(config)
+        system.set_target(config.limits.max_abs_acceleration)
+        system.advance(1.0)
+
+        assert system.get_state().cart_velocity <= 0.5 + 0.1
+        assert system.get_error() == Error.V_OVERFLOW
+
+    @pytest.mark.parametrize("delta", [0.005, 0.015, 0.01, 0.07])
+    def test_state_matches_timestamp(self, delta):
+        system = CartPoleSystem()
+        system.reset(get_config())
+        system.set_target(1.0)
+        for _ in range(10):
+            system.advance(delta)
+
+        time = system.timestamp()
+        assert time == pytest.approx(10 * delta)
+        assert system.get_state().cart_velocity == pytest.approx(time, abs=EPS)
+        assert system.get_state().cart_position == pytest.approx(time**2 / 2, abs=EPS)
@@ -0,0 +1,60 @@
+import math
+
+import torch
+
+from cartpole.simulator.pytorch.state import State
+from cartpole.simulator.pytorch.tests.test_system import get_context
+from cartpole.simulator.pytorch.value_iteration import TransitionTable, ValueIteration
+
+
+class TestValueIteration:
+    def test_home_state_is_fixed_point(self):
+        context = get_context()
+        discreditizer = context.discreditizer
+        table = TransitionTable.build(context, chunk_size=100)
+
+        home, _ = discreditizer.nearest_indices(State.home().as_tensor().reshape(4, 1))
+        zero_action = len(discreditizer.cart_accelerations) // 2
+        assert abs(discreditizer.cart_accelerations[zero_action]) < 1e-9
+        assert table.next_indices[home, zero_action] == home
+
+    def test_policy_is_greedy(self):
+        context = get_context()
+        table = TransitionTable.build(context, chunk_size=1000)
+        solver = ValueIteration(table, discount=0.9, chunk_size=333)
+
+        result = solver.solve(tolerance=1e-8, max_iterations=500)
+        assert result.converged
+
+        values = torch.cat([result.values, solver.values[-1:]])
+        discounts = 0.9 ** table.steps.double()
+        q_values = table.costs + discounts * values[table.next_indices.long()]
+        assert torch.allclose(q_values.min(1).values, result.values, atol=1e-6)
+        assert torch.equal(q_values.argmin(1), result.policy)
+
+    def test_transitions_leave_their_cell(self):
+        context = get_context()
+        table = TransitionTable.build(context, chunk_size=1000)
+
+        sources = torch.arange(table.space_size).unsqueeze(1)
+        self_loops = (table.next_indices == sources).double().mean()
+        assert self_loops < 0.01
+        assert table.steps.max() > 1
+
+    def test_values_decrease_towards_upright(self):
+        context = get_context()
+        discreditizer = context.discreditizer
+        table = TransitionTable.build(context, chunk_size=1000)
+        result = ValueIteration(table, discount=0.99).solve(tolerance=1e-8)
+        assert result.converged
+
+        def value(angle):
+            state = torch.tensor([[0.0], [angle], [0.0], [0.0]], dtype=torch.float64)
+            index, _ = discreditizer.nearest_indices(state)
+            return float(result.values[index])
+
+        # Resting pole, from hanging down to upright
+        angles = [0.0, math.pi / 3, 2 * math.pi / 3, math.pi]
+        values = [value(angle) for angle in angles]
+        assert values == sorted(values, reverse=True)
+        assert len(set(values)) == len(values)
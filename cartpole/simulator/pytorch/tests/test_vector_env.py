@@ -0,0 +1,77 @@
+import dataclasses as dc
+
+import numpy
+import torch
+
+from cartpole.common import Error
+from cartpole.simulator.pytorch.state import State
+from cartpole.simulator.pytorch.system import CartPoleSystem
+from cartpole.simulator.pytorch.tests.test_system import get_config
+from cartpole.simulator.pytorch.vector_env import CartPoleVectorEnv
+
+
+class TestCartPoleVectorEnv:
+    def test_step_matches_single_system(self):
+        config = get_config()
+        initial = [State(0.0, 3.0, 0.0, 0.0), State(0.1, 1.0, -0.2, 2.0)]
+        env = CartPoleVectorEnv(
+            config,
+            envs_n=2,
+            initial_states=torch.stack([state.as_tensor() for state in initial], 1),
+        )
+        observations = env.observations
+        targets = torch.tensor([1.0, -2.0], dtype=torch.float64)
+
+        for _ in range(10):
+            errors = env.step(targets)
+            assert not errors.any()
+
+        assert env.observations is observations
+        for i, state in enumerate(initial):
+            system = CartPoleSystem()
+            system.reset_to_state(config, state)
+            system.set_target(float(targets[i]))
+            system.advance(0.1)
+
+            expected = State.from_collection(observations[:, i].tolist())
+            assert abs(system.get_state().cart_position - expected.cart_position) < 1e-9
+            assert abs(system.get_state().pole_angle - expected.pole_angle) < 1e-9
+
+    def test_failed_envs_are_reset(self):
+        config = get_config()
+        env = CartPoleVectorEnv(config, envs_n=3)
+        max_acc = config.limits.max_abs_acceleration
+        targets = torch.tensor([0.0, max_acc, 2 * max_acc], dtype=torch.float64)
+
+        errors = env.step(targets)
+        assert errors.tolist() == [Error.NO_ERROR, Error.NO_ERROR, Error.A_OVERFLOW]
+        assert env.episode_steps.tolist() == [1, 1, 0]
+        assert torch.equal(env.observations[:, 2], env.initial_states[:, 2])
+
+        targets[2] = 0
+        while not errors[1]:
+            errors = env.step(targets)
+
+        assert errors[1] in (Error.X_OVERFLOW, Error.V_OVERFLOW)
+        assert torch.equal(env.observations[:, 1], env.initial_states[:, 1])
+
+    def test_targets_are_converted(self):
+        config = get_config()
+        max_acc = config.limits.max_abs_acceleration
+        targets = [1.0, 2 * max_acc]
+        expected = CartPoleVectorEnv(config, envs_n=2)
+        expected_errors = expected.step(
+            torch.tensor(targets, dtype=config.dtype)
+        ).clone()
+
+        float32_config = dc.replace(config, dtype=torch.float32)
+        cases = [
+            (config, numpy.array(targets, dtype=numpy.float64)),
+            (config, torch.tensor(targets, dtype=torch.float32)),
+            (float32_config, torch.tensor(targets, dtype=torch.float64)),
+        ]
+        for env_config, env_targets in cases:
+            env = CartPoleVectorEnv(env_config, envs_n=2, auto_reset=False)
+            errors = env.step(env_targets)
+            assert torch.equal(errors, expected_errors)
+            assert env.observations.dtype == env_config.dtype
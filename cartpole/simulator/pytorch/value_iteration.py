@@ -0,0 +1,421 @@
+"""
+This module solves the optimal control problem over the discretized
+state space with value iteration.
+
+Transitions of every (state, action) pair are integrated once and stored
+in a `TransitionTable` as indices of the nearest grid states, so the
+sweeps only gather values and never re-integrate the dynamics.
+
+A single simulation step rarely leaves a grid cell, so the action is
+applied until the nearest grid state changes. Otherwise most transitions
+would snap back to their own state and value iteration would only see
+self-loops.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import torch
+from torch import ByteTensor, DoubleTensor, IntTensor, LongTensor
+
+from cartpole.common.util import content_hash
+
+from .cache import TransitionCache
+from .learning_context import MultiSystemLearningContext
+from .system import DEFAULT_CHUNK_SIZE, CartPoleMultiSystem
+
+DEFAULT_MAX_STEPS = 255
+
+
+def _code_digest(code) -> list:
+    # Nested code objects (lambdas, comprehensions) are hashed by content,
+    # their default repr contains a memory address
+    consts = [
+        _code_digest(const) if hasattr(const, "co_code") else repr(const)
+        for const in code.co_consts
+    ]
+    return [code.co_code.hex(), consts, list(code.co_names)]
+
+
+def cost_fn_tag(fn) -> str:
+    """
+    Identifies a cost function by its code, defaults and closure values,
+    so lambdas and functions changed under the same name get different
+    tags.
+
+    Parameters
+    ----------
+    fn : callable
+        Python function.
+
+    Returns
+    -------
+    str
+    """
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        raise ValueError(f"Cost function without code needs a tag: {fn!r}")
+
+    closure = [
+        cost_fn_tag(value) if hasattr(value, "__code__") else repr(value)
+        for value in (cell.cell_contents for cell in fn.__closure__ or ())
+    ]
+    digest = content_hash(_code_digest(code), repr(fn.__defaults__), closure)
+    return f"{fn.__module__}.{fn.__qualname__}-{digest[:16]}"
+
+
+@dataclass
+class TransitionTable:
+    """
+    Precomputed transitions of all (state, action) pairs of a grid.
+
+    Fields
+    ------
+    `next_indices` : IntTensor
+        SxA tensor with the index of the nearest grid state reached by
+        applying j-th action to i-th state until the nearest grid state
+        changes. States outside of the limits are mapped to `S`, the
+        absorbing failure state.
+
+    `costs` : DoubleTensor
+        SxA tensor with the total cost of simulation steps of the transition.
+
+    `steps` : ByteTensor
+        SxA tensor with the number of simulation steps of the transition.
+
+    The table takes 5 bytes per pair plus the size of a cost, e.g. about
+    3 GB for the default grid (6.6M states, 35 actions) with float64.
+    """
+
+    next_indices: IntTensor
+    costs: DoubleTensor
+    steps: ByteTensor
+
+    @property
+    def space_size(self) -> int:
+        """
+        Returns the number of states.
+
+        Returns
+        -------
+        int
+        """
+        return self.next_indices.shape[0]
+
+    @property
+    def actions_n(self) -> int:
+        """
+        Returns the number of actions.
+
+        Returns
+        -------
+        int
+        """
+        return self.next_indices.shape[1]
+
+    @staticmethod
+    def build(
+        context: MultiSystemLearningContext,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_steps: int = DEFAULT_MAX_STEPS,
+    ) -> "TransitionTable":
+        """
+        Integrates all (state, action) pairs of the context grid.
+
+        Every pair is integrated step by step until its nearest grid state
+        differs from the initial one, it leaves the limits, or `max_steps`
+        steps are made (e.g. a resting system stays in its cell forever).
+
+        Parameters
+        ----------
+        context : MultiSystemLearningContext
+        chunk_size : int
+            Maximum number of (state, action) pairs integrated at once.
+        max_steps : int
+            Maximum number of simulation steps of a transition, up to 255.
+
+        Returns
+        -------
+        TransitionTable
+
+        Raises
+        ------
+        ValueError
+            If `chunk_size` or `max_steps` is invalid.
+        """
+        if chunk_size < 1:
+            raise ValueError("Invalid chunk size")
+        if not 1 <= max_steps <= 255:
+            raise ValueError("Invalid max steps")
+
+        discreditizer = context.discreditizer
+        accelerations = discreditizer.cart_accelerations
+        space_size = discreditizer.space_size
+        actions_n = accelerations.shape[0]
+
+        next_indices = torch.empty((space_size, actions_n), dtype=torch.int32)
+        costs = torch.empty((space_size, actions_n), dtype=context.config.dtype)
+        steps = torch.empty((space_size, actions_n), dtype=torch.uint8)
+
+        states_step = max(1, chunk_size // actions_n)
+        for begin in range(0, space_size, states_step):
+            end = min(begin + states_step, space_size)
+            sources = torch.arange(begin, end)
+            states = discreditizer.get_states(sources)
+
+            # Action-major layout: pair `i * n + j` is (action i, state j)
+            chunk_states = states.repeat(1, actions_n)
+            chunk_inputs = accelerations.repeat_interleave(end - begin)
+            chunk_sources = sources.repeat(actions_n)
+
+            chunk_indices = torch.full_like(chunk_sources, space_size)
+            chunk_costs = torch.zeros(len(chunk_sources), dtype=costs.dtype)
+            chunk_steps = torch.zeros(len(chunk_sources), dtype=torch.uint8)
+            active = torch.arange(len(chunk_sources))
+
+            for _ in range(max_steps):
+                active_states = chunk_states[:, active]
+                inputs = chunk_inputs[active]
+                CartPoleMultiSystem.integrate(context.config, active_states, inputs)
+                chunk_states[:, active] = active_states
+
+                chunk_costs[active] += CartPoleMultiSystem.eval_transition_costs(
+                    context, inputs, active_states  # type: ignore
+                )
+                chunk_steps[active] += 1
+
+                indices, outside = discreditizer.nearest_indices(active_states)
+                indices[outside] = space_size
+                chunk_indices[active] = indices
+
+                stay = (indices == chunk_sources[active]) & ~outside
+                active = active[stay]
+                if len(active) == 0:
+                    break
+
+            next_indices[begin:end] = chunk_indices.reshape(actions_n, -1).T
+            costs[begin:end] = chunk_costs.reshape(actions_n, -1).T
+            steps[begin:end] = chunk_steps.reshape(actions_n, -1).T
+
+        return TransitionTable(next_indices, costs, steps)  # type: ignore
+
+    @staticmethod
+    def load_or_build(
+        context: MultiSystemLearningContext,
+        cache: TransitionCache,
+        tag: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_steps: int = DEFAULT_MAX_STEPS,
+    ) -> "TransitionTable":
+        """
+        Loads the table from a cache, builds and stores it on a miss.
+
+        The cache key covers the configuration only, but costs also depend
+        on cost functions. They are identified by `tag`, which defaults
+        to a digest of the cost functions code (see `cost_fn_tag`). Pass
+        an explicit tag when the costs depend on more than that, e.g. on
+        globals the functions read.
+
+        Parameters
+        ----------
+        context : MultiSystemLearningContext
+        cache : TransitionCache
+            Cache created for the context configuration.
+        tag : str, optional
+            Identifier of the cost functions, required for callables
+            without code such as `functools.partial`.
+        chunk_size : int
+            Maximum number of (state, action) pairs integrated at once.
+        max_steps : int
+            Maximum number of simulation steps of a transition.
+
+        Returns
+        -------
+        TransitionTable
+        """
+        if tag is None:
+            tag = "-".join(
+                cost_fn_tag(fn)
+                for fn in (context.states_cost_fn, context.inputs_cost_fn)
+            )
+
+        indices_name = f"next_indices-{max_steps}"
+        steps_name = f"steps-{max_steps}"
+        costs_name = f"costs-{content_hash(tag, max_steps)[:16]}"
+        next_indices = cache.load(indices_name)
+        steps = cache.load(steps_name)
+        costs = cache.load(costs_name)
+
+        if next_indices is None or steps is None or costs is None:
+            table = TransitionTable.build(context, chunk_size, max_steps)
+            cache.store(indices_name, table.next_indices)
+            cache.store(steps_name, table.steps)
+            cache.store(costs_name, table.costs)
+            return table
+
+        return TransitionTable(next_indices, costs, steps)  # type: ignore
+
+
+@dataclass
+class ValueFunction:
+    """
+    Solution of the optimal control problem over a grid.
+
+    Fields
+    ------
+    `values` : DoubleTensor
+        1xS tensor with the optimal cost-to-go of every grid state.
+
+    `policy` : LongTensor
+        1xS tensor with the index of the best action for every grid state.
+
+    `iterations` : int
+        Number of sweeps made.
+
+    `residual` : float
+        Maximum change of values during the last sweep.
+
+    `converged` : bool
+        Whether the residual dropped below the tolerance.
+    """
+
+    values: DoubleTensor
+    policy: LongTensor
+    iterations: int
+    residual: float
+    converged: bool
+
+
+class ValueIteration:
+    """
+    Value iteration over a precomputed `TransitionTable`.
+
+    Values are updated in-place chunk by chunk (Gauss-Seidel order),
+    so every sweep uses the freshest values available. Values of next
+    states are discounted once per simulation step of the transition.
+    """
+
+    def __init__(
+        self,
+        table: TransitionTable,
+        discount: float = 0.99,
+        failure_cost: float = 1e3,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        table : TransitionTable
+        discount : float
+            Discount factor of future costs per simulation step,
+            belongs to `(0, 1]`.
+        failure_cost : float
+            Cost-to-go of leaving the limits.
+        chunk_size : int
+            Maximum number of (state, action) pairs processed at once.
+
+        Raises
+        ------
+        ValueError
+            If `discount` or `chunk_size` is invalid.
+        """
+        if not 0 < discount <= 1:
+            raise ValueError("Invalid discount")
+        if chunk_size < 1:
+            raise ValueError("Invalid chunk size")
+
+        self.table = table
+        self.discount = discount
+        self.chunk_size = chunk_size
+
+        # The last value belongs to the absorbing failure state
+        self.values: DoubleTensor = torch.zeros(
+            table.space_size + 1,
+            dtype=table.costs.dtype,
+        )  # type: ignore
+        self.values[-1] = failure_cost
+
+        # Discount of a transition by its number of steps
+        self.discounts: DoubleTensor = discount ** torch.arange(
+            256, dtype=table.costs.dtype
+        )  # type: ignore
+
+    def _q_values(self, begin: int, end: int) -> DoubleTensor:
+        next_indices = self.table.next_indices[begin:end].long()
+        next_values = self.values[next_indices]
+        discounts = self.discounts[self.table.steps[begin:end].long()]
+        return self.table.costs[begin:end] + discounts * next_values  # type: ignore
+
+    def sweep(self) -> float:
+        """
+        Makes one Bellman update of all the values.
+
+        Returns
+        -------
+        float
+            Maximum change of values.
+        """
+        residual = 0.0
+        states_step = max(1, self.chunk_size // self.table.actions_n)
+
+        for begin in range(0, self.table.space_size, states_step):
+            end = min(begin + states_step, self.table.space_size)
+            new_values = self._q_values(begin, end).min(1).values
+
+            change = (new_values - self.values[begin:end]).abs().max()
+            residual = max(residual, float(change))
+            self.values[begin:end] = new_values
+
+        return residual
+
+    def policy(self) -> LongTensor:
+        """
+        Returns the greedy policy for current values.
+
+        Returns
+        -------
+        LongTensor
+            1xS tensor with the index of the best action for every state.
+        """
+        policy = torch.empty(self.table.space_size, dtype=torch.long)
+        states_step = max(1, self.chunk_size // self.table.actions_n)
+
+        for begin in range(0, self.table.space_size, states_step):
+            end = min(begin + states_step, self.table.space_size)
+            policy[begin:end] = self._q_values(begin, end).argmin(1)
+
+        return policy  # type: ignore
+
+    def solve(
+        self,
+        tolerance: float = 1e-6,
+        max_iterations: int = 1000,
+    ) -> ValueFunction:
+        """
+        Sweeps until values converge.
+
+        Parameters
+        ----------
+        tolerance : float
+            Maximum change of values which is considered as convergence.
+        max_iterations : int
+            Maximum number of sweeps.
+
+        Returns
+        -------
+        ValueFunction
+        """
+        residual = torch.inf
+        iterations = 0
+
+        while iterations < max_iterations and residual > tolerance:
+            residual = self.sweep()
+            iterations += 1
+
+        return ValueFunction(
+            values=self.values[:-1].clone(),  # type: ignore
+            policy=self.policy(),
+            iterations=iterations,
+            residual=residual,
+            converged=residual <= tolerance,
+        )
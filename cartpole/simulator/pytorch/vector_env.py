@@ -0,0 +1,177 @@
+"""
+This module contains CartPoleVectorEnv which steps N independent CartPole
+systems at once. It is meant for generating rollouts at scale: all the
+buffers are preallocated, so a step does not allocate new tensors.
+"""
+
+from typing import Optional
+
+import torch
+from torch import BoolTensor, DoubleTensor, LongTensor
+
+from cartpole.common import Error
+
+from .config import SystemConfiguration
+from .integrator import make_integrator
+from .state import MultiSystemState
+from .system import CartPoleMultiSystem
+
+
+class CartPoleVectorEnv:
+    """
+    N CartPole systems stored in one `MultiSystemState`.
+
+    Every step takes a target acceleration per environment and returns
+    an error code per environment (see `Error`):
+    - `A_OVERFLOW` if the target exceeds the acceleration limit,
+      the target is clamped to the limit in this case;
+    - `X_OVERFLOW` if the cart position exceeds the limit;
+    - `V_OVERFLOW` if the cart velocity exceeds the limit.
+
+    Environments which failed are reset to their initial states
+    if `auto_reset` is set, so the batch always keeps running.
+    """
+
+    def __init__(
+        self,
+        config: SystemConfiguration,
+        envs_n: int,
+        initial_states: Optional[DoubleTensor] = None,
+        auto_reset: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        config : SystemConfiguration
+        envs_n : int
+            Number of environments.
+        initial_states : DoubleTensor, optional
+            4xN tensor with initial states, home states by default.
+        auto_reset : bool
+            Whether to reset environments which failed.
+
+        Raises
+        ------
+        ValueError
+            If `envs_n` is less than 1 or shape of `initial_states` is invalid.
+        """
+        if envs_n < 1:
+            raise ValueError("Invalid number of environments")
+
+        if initial_states is None:
+            initial_states = MultiSystemState.home(envs_n, config.dtype).states
+        if initial_states.shape != (4, envs_n):
+            raise ValueError("Invalid initial states shape")
+
+        self.config = config
+        self.auto_reset = auto_reset
+        self.initial_states = initial_states.to(config.dtype).clone()
+        self.state = MultiSystemState(self.initial_states.clone())  # type: ignore
+
+        self._errors = torch.zeros(envs_n, dtype=torch.long)
+        self._episode_steps = torch.zeros(envs_n, dtype=torch.long)
+        self._inputs = torch.zeros(envs_n, dtype=config.dtype)
+        self._abs = torch.empty(envs_n, dtype=config.dtype)
+        self._mask = torch.empty(envs_n, dtype=torch.bool)
+        self._integrator = make_integrator(config.discretization)
+
+    @property
+    def envs_n(self) -> int:
+        """
+        Returns the number of environments.
+
+        Returns
+        -------
+        int
+        """
+        return self.state.size
+
+    @property
+    def observations(self) -> DoubleTensor:
+        """
+        Returns current states without copying.
+
+        Returns
+        -------
+        DoubleTensor
+            4xN tensor, a view which is updated in-place by `step`.
+        """
+        return self.state.states
+
+    @property
+    def episode_steps(self) -> LongTensor:
+        """
+        Returns the number of steps since the last reset of each environment.
+
+        Returns
+        -------
+        LongTensor
+            1xN tensor, a view which is updated in-place by `step`.
+        """
+        return self._episode_steps  # type: ignore
+
+    def reset(self, mask: Optional[BoolTensor] = None) -> None:
+        """
+        Resets environments to their initial states.
+
+        Parameters
+        ----------
+        mask : BoolTensor, optional
+            1xN tensor which selects environments to reset, all by default.
+        """
+        states = self.state.states
+        if mask is None:
+            states.copy_(self.initial_states)
+            self._episode_steps.zero_()
+            return
+
+        torch.where(mask, self.initial_states, states, out=states)
+        self._episode_steps.masked_fill_(mask, 0)
+
+    def _check_limit(self, values: DoubleTensor, limit: float, error: Error) -> None:
+        torch.abs(values, out=self._abs)
+        torch.gt(self._abs, limit, out=self._mask)
+        self._errors.masked_fill_(self._mask, int(error))
+
+    def step(self, targets: DoubleTensor) -> LongTensor:
+        """
+        Advances all environments by one simulation step.
+
+        Parameters
+        ----------
+        targets : DoubleTensor
+            1xN tensor or array with target cart accelerations, converted
+            to the configuration dtype.
+
+        Returns
+        -------
+        LongTensor
+            1xN tensor with `Error` codes of this step, a view which is
+            overwritten by the next step. Environments with non-zero codes
+            are already reset if `auto_reset` is set.
+        """
+        limits = self.config.limits
+        states = self.state.states
+        targets = torch.as_tensor(
+            targets, dtype=self.config.dtype, device=states.device
+        )
+
+        self._errors.zero_()
+        max_acc = limits.max_abs_acceleration
+        torch.clamp(targets, -max_acc, max_acc, out=self._inputs)
+
+        CartPoleMultiSystem.integrate(
+            self.config, states, self._inputs, self._integrator
+        )
+        self._episode_steps += 1
+
+        # Checks go from the lowest priority to the highest one
+        self._check_limit(states[2], limits.max_abs_velocity, Error.V_OVERFLOW)
+        self._check_limit(states[0], limits.max_abs_position, Error.X_OVERFLOW)
+        self._check_limit(targets, max_acc, Error.A_OVERFLOW)  # type: ignore
+
+        if self.auto_reset:
+            torch.ne(self._errors, 0, out=self._mask)
+            self.reset(self._mask)  # type: ignore
+
+        return self._errors  # type: ignore
@@ -0,0 +1,239 @@
+"""
+Compares simulator backends (pydrake, pytorch, numpy) for physics parity
+and speed.
+
+Every backend is driven through the same random input sequences from the
+same initial states. The report contains trajectory divergence from the
+reference backend, simulated seconds per wall second and per-step latency
+percentiles. Results are appended to a JSON lines history file, and the
+previous entry is used to flag physics drift and performance regressions.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cartpole.common import Config, State
+from cartpole.sessions.evaluation import BACKENDS, check_step, make_device
+
+STATE_NAMES = ["cart_position", "pole_angle", "cart_velocity", "angular_velocity"]
+PERCENTILES = [50, 90, 99]
+
+
+def available_backends(names):
+    backends = {}
+    for name in names:
+        try:
+            backends[name] = make_device(name)
+        except ImportError as error:
+            print(f"Skipping {name}: {error}")
+    return backends
+
+
+def make_inputs(rng, episodes, steps, max_acceleration):
+    # Smooth random inputs: random walk of targets, clamped to the limit
+    walk = np.cumsum(rng.normal(scale=0.3, size=(episodes, steps)), axis=1)
+    return np.clip(walk, -max_acceleration, max_acceleration)
+
+
+def make_initial_states(rng, episodes):
+    return [
+        State(
+            cart_position=rng.uniform(-0.05, 0.05),
+            pole_angle=rng.uniform(0, 2 * math.pi),
+            cart_velocity=rng.uniform(-0.2, 0.2),
+            pole_angular_velocity=rng.uniform(-1, 1),
+        )
+        for _ in range(episodes)
+    ]
+
+
+def run_backend(device, config, initial_states, inputs, step):
+    trajectories, latencies = [], []
+    wall_time, simulated_time = 0.0, 0.0
+
+    for initial, episode_inputs in zip(initial_states, inputs):
+        device.reset_to(config, initial)
+        trajectory = [device.get_state().as_array()]
+
+        for target in episode_inputs:
+            start = time.perf_counter()
+            device.set_target(float(target))
+            device.advance(step)
+            latency = time.perf_counter() - start
+
+            state = device.get_state()
+            if state.error:
+                break
+
+            latencies.append(latency)
+            wall_time += latency
+            simulated_time += step
+            trajectory.append(state.as_array())
+
+        trajectories.append(np.array(trajectory))
+
+    latencies = np.array(latencies) * 1e6
+    return trajectories, {
+        "realtime_factor": simulated_time / wall_time if wall_time else math.nan,
+        "latency_us": {
+            f"p{p}": float(np.percentile(latencies, p)) if len(latencies) else math.nan
+            for p in PERCENTILES
+        },
+    }
+
+
+def divergence(trajectories, reference):
+    errors = []
+    for trajectory, expected in zip(trajectories, reference):
+        n = min(len(trajectory), len(expected))
+        error = trajectory[:n] - expected[:n]
+        # Backends may wrap angles differently
+        error[:, 1] = np.remainder(error[:, 1] + math.pi, 2 * math.pi) - math.pi
+        errors.append(np.abs(error))
+
+    errors = np.concatenate(errors)
+    return {
+        name: {"max": float(errors[:, i].max()), "mean": float(errors[:, i].mean())}
+        for i, name in enumerate(STATE_NAMES)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_last_entry(history, settings):
+    if not history.exists():
+        return None
+
+    last = None
+    for line in history.read_text().splitlines():
+        entry = json.loads(line)
+        if entry["settings"] == settings:
+            last = entry
+    return last
+
+
+def compare(entry, previous, drift_tolerance, slowdown_tolerance):
+    warnings = []
+    for name, result in entry["backends"].items():
+        before = previous["backends"].get(name)
+        if before is None:
+            continue
+
+        for state, error in result["divergence"].items():
+            delta = abs(error["max"] - before["divergence"][state]["max"])
+            if delta > drift_tolerance:
+                warnings.append(f"{name}: {state} divergence changed by {delta:.3e}")
+
+        ratio = before["realtime_factor"] / result["realtime_factor"]
+        if ratio > 1 + slowdown_tolerance:
+            warnings.append(f"{name}: {ratio:.2f}x slower than {previous['revision']}")
+
+    return warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--reference", default="numpy")
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=2.0)
+    parser.add_argument("--step", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--history",
+        type=Path,
+        default=Path("data/benchmarks/backends.jsonl"),
+    )
+    parser.add_argument("--drift-tolerance", type=float, default=1e-6)
+    parser.add_argument("--slowdown-tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Wide limits, so episodes are not cut short by overflows
+    config = Config(
+        hard_max_position=1e3,
+        hard_max_velocity=1e3,
+        hard_max_acceleration=10.0,
+    )
+    rng = np.random.default_rng(args.seed)
+    steps = int(round(args.duration / args.step))
+    initial_states = make_initial_states(rng, args.episodes)
+    inputs = make_inputs(rng, args.episodes, steps, 5.0)
+
+    backends = available_backends(args.backends)
+    if args.reference not in backends:
+        raise SystemExit(f"Reference backend {args.reference} is not available")
+    for name in backends:
+        try:
+            check_step(name, args.step)
+        except ValueError as error:
+            raise SystemExit(str(error))
+
+    runs = {
+        name: run_backend(device, config, initial_states, inputs, args.step)
+        for name, device in backends.items()
+    }
+    reference = runs[args.reference][0]
+
+    settings = {
+        "episodes": args.episodes,
+        "duration": args.duration,
+        "step": args.step,
+        "seed": args.seed,
+        "reference": args.reference,
+    }
+    entry = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "settings": settings,
+        "backends": {
+            name: dict(stats, divergence=divergence(trajectories, reference))
+            for name, (trajectories, stats) in runs.items()
+        },
+    }
+
+    print(f"Episodes: {args.episodes}, duration: {args.duration}s, step: {args.step}s")
+    header = " ".join(f"{'p' + str(p) + ', us':>10}" for p in PERCENTILES)
+    print(f"{'backend':>10} {'realtime':>10} {header}")
+    for name, result in entry["backends"].items():
+        latency = " ".join(f"{v:>10.1f}" for v in result["latency_us"].values())
+        print(f"{name:>10} {result['realtime_factor']:>9.1f}x {latency}")
+
+    print(f"\nMax divergence from {args.reference}:")
+    print(f"{'backend':>10} " + " ".join(f"{name:>18}" for name in STATE_NAMES))
+    for name, result in entry["backends"].items():
+        errors = " ".join(f"{e['max']:>18.3e}" for e in result["divergence"].values())
+        print(f"{name:>10} {errors}")
+
+    previous = load_last_entry(args.history, settings)
+    if previous is not None:
+        warnings = compare(
+            entry, previous, args.drift_tolerance, args.slowdown_tolerance
+        )
+        print(f"\nCompared with {previous['revision']} ({previous['timestamp']}):")
+        for warning in warnings or ["no regressions"]:
+            print(f"  {warning}")
+
+    args.history.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.history, "a") as file:
+        file.write(json.dumps(entry) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares accuracy and speed of torch simulator integrators.
+
+For each integrator and number of integration steps, a batch of random
+states is simulated for `SIMULATED_TIME` seconds with random inputs.
+The result is compared with an RK4 reference with a very small step.
+"""
+import argparse
+import dataclasses as dc
+import time
+
+import torch
+
+from cartpole.simulator.pytorch.config import SystemConfiguration
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem
+
+SIMULATED_TIME = 1.0  # Seconds
+REFERENCE_STEP_N = 500
+STEP_NS = [1, 2, 5, 10, 20]
+INTEGRATORS = ["rk2", "rk4", "semi_implicit_euler", "adaptive"]
+
+
+def random_states(config, batch_size):
+    limits = config.limits
+    scale = torch.tensor(
+        [
+            limits.max_abs_position,
+            torch.pi,
+            limits.max_abs_velocity / 10,
+            limits.max_abs_angular_velocity / 4,
+        ],
+        dtype=torch.float64,
+    ).reshape(4, 1)
+    states = (torch.rand(4, batch_size, dtype=torch.float64) * 2 - 1) * scale
+    states[1] += torch.pi
+    return states
+
+
+def simulate(config, states, inputs):
+    states = states.clone()
+    sim_steps = int(SIMULATED_TIME * config.discretization.simulation_step_n)
+
+    start = time.perf_counter()
+    for step in range(sim_steps):
+        CartPoleMultiSystem.integrate(config, states, inputs[step])
+    elapsed = time.perf_counter() - start
+
+    return states, elapsed
+
+
+def with_integrator(config, integrator, step_n, fused=False):
+    discretization = dc.replace(
+        config.discretization,
+        integrator=integrator,
+        integration_step_n=step_n,
+        fused_integrator=fused,
+    )
+    return dc.replace(config, discretization=discretization)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--fused", action="store_true", help="also run fused kernels")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    config = SystemConfiguration()
+    sim_steps = int(SIMULATED_TIME * config.discretization.simulation_step_n)
+    max_acc = config.limits.max_abs_acceleration
+
+    states = random_states(config, args.batch_size)
+    inputs = (torch.rand(sim_steps, args.batch_size, dtype=torch.float64) * 2 - 1) * max_acc
+
+    reference_config = with_integrator(config, "rk4", REFERENCE_STEP_N)
+    reference, _ = simulate(reference_config, states, inputs)
+
+    variants = [(name, False) for name in INTEGRATORS]
+    if args.fused:
+        variants += [(name, True) for name in INTEGRATORS if name != "adaptive"]
+
+    print(f"{'integrator':>24} {'steps':>6} {'max error':>12} {'steps/s':>12}")
+    for name, fused in variants:
+        for step_n in STEP_NS:
+            bench_config = with_integrator(config, name, step_n, fused)
+            if fused:
+                simulate(bench_config, states, inputs)  # Compile kernel
+
+            result, elapsed = simulate(bench_config, states, inputs)
+            error = (result - reference).abs().max().item()
+            steps_per_second = args.batch_size * sim_steps / elapsed
+
+            label = f"{name} (fused)" if fused else name
+            print(f"{label:>24} {step_n:>6} {error:>12.3e} {steps_per_second:>12.3e}")
+
+
+if __name__ == "__main__":
+    main()
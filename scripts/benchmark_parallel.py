@@ -0,0 +1,93 @@
+"""
+Measures scaling of ShardedExecutor from 1 to N worker processes
+on a fixed batch of grid states.
+"""
+
+import argparse
+import os
+import time
+
+import torch
+
+from cartpole.simulator.pytorch.config import SystemConfiguration
+from cartpole.simulator.pytorch.discreditizer import Discreditizer
+from cartpole.simulator.pytorch.learning_context import MultiSystemLearningContext
+from cartpole.simulator.pytorch.parallel import ShardedExecutor
+from cartpole.simulator.pytorch.state import MultiSystemState
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem
+
+TRANSITION_STEPS = 100
+
+
+def states_cost(states):
+    return (states[1] - torch.pi) ** 2 + states[0] ** 2 + 0.1 * states[3] ** 2
+
+
+def inputs_cost(inputs):
+    return 0.01 * inputs**2
+
+
+def make_context(batch_size):
+    config = SystemConfiguration()
+    discreditizer = Discreditizer(config, lazy=True)
+    indices = torch.randint(0, discreditizer.space_size, (batch_size,))
+    return MultiSystemLearningContext(
+        states_cost_fn=states_cost,
+        inputs_cost_fn=inputs_cost,
+        config=config,
+        batch_state=MultiSystemState(discreditizer.get_states(indices)),
+        discreditizer=discreditizer,
+    )
+
+
+def measure(eval_transitions, eval_best_inputs, inputs):
+    start = time.perf_counter()
+    for _ in range(TRANSITION_STEPS):
+        eval_transitions(inputs)
+    transitions_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    eval_best_inputs()
+    best_inputs_time = time.perf_counter() - start
+
+    return transitions_time, best_inputs_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=200000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    inputs = torch.zeros(args.batch_size, dtype=torch.float64)
+
+    context = make_context(args.batch_size)
+    baseline = measure(
+        lambda inputs: CartPoleMultiSystem.eval_transitions(context, inputs),
+        lambda: CartPoleMultiSystem.eval_best_inputs(context),
+        inputs,
+    )
+
+    print(f"Batch size: {args.batch_size}, intra-op threads: {torch.get_num_threads()}")
+    print(
+        f"{'workers':>8} {'transitions, s':>15} {'best inputs, s':>15} {'speedup':>8}"
+    )
+    print(f"{'serial':>8} {baseline[0]:>15.3f} {baseline[1]:>15.3f} {1:>8.2f}")
+
+    for workers_n in range(1, args.max_workers + 1):
+        context = make_context(args.batch_size)
+        with ShardedExecutor(context, workers_n) as executor:
+            executor.eval_transitions(inputs)  # Warm up workers
+            result = measure(
+                executor.eval_transitions,
+                executor.eval_best_inputs,
+                inputs,
+            )
+
+        speedup = sum(baseline) / sum(result)
+        print(f"{workers_n:>8} {result[0]:>15.3f} {result[1]:>15.3f} {speedup:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Compares float32 simulation with the float64 reference.
+
+A batch of grid states is simulated for `SIMULATED_TIME` seconds with
+random inputs in both precisions. The report contains state errors,
+agreement of best accelerations and timings.
+"""
+
+import argparse
+import dataclasses as dc
+import time
+
+import torch
+
+from cartpole.simulator.pytorch.config import SystemConfiguration
+from cartpole.simulator.pytorch.discreditizer import Discreditizer
+from cartpole.simulator.pytorch.learning_context import MultiSystemLearningContext
+from cartpole.simulator.pytorch.state import MultiSystemState
+from cartpole.simulator.pytorch.system import CartPoleMultiSystem
+
+SIMULATED_TIME = 1.0  # Seconds
+STATE_NAMES = ["cart_position", "pole_angle", "cart_velocity", "angular_velocity"]
+
+
+def states_cost(states):
+    return (states[1] - torch.pi) ** 2 + states[0] ** 2 + 0.1 * states[3] ** 2
+
+
+def inputs_cost(inputs):
+    return 0.01 * inputs**2
+
+
+def make_context(config, indices):
+    discreditizer = Discreditizer(config, lazy=True)
+    return MultiSystemLearningContext(
+        states_cost_fn=states_cost,
+        inputs_cost_fn=inputs_cost,
+        config=config,
+        batch_state=MultiSystemState(discreditizer.get_states(indices)),
+        discreditizer=discreditizer,
+    )
+
+
+def simulate(context, inputs):
+    start = time.perf_counter()
+    for step_inputs in inputs:
+        CartPoleMultiSystem.eval_transitions(context, step_inputs)
+    return time.perf_counter() - start
+
+
+def best_accelerations(context):
+    start = time.perf_counter()
+    best = CartPoleMultiSystem.get_best_accelerations(context)
+    return best, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    config64 = SystemConfiguration()
+    config32 = dc.replace(config64, dtype=torch.float32)
+
+    space_size = Discreditizer(config64, lazy=True).space_size
+    indices = torch.randint(0, space_size, (args.batch_size,))
+    context64 = make_context(config64, indices)
+    context32 = make_context(config32, indices)
+
+    best64, best_time64 = best_accelerations(context64)
+    best32, best_time32 = best_accelerations(context32)
+    agreement = torch.isclose(best64, best32.double(), atol=1e-5).double().mean().item()
+
+    sim_steps = int(SIMULATED_TIME * config64.discretization.simulation_step_n)
+    max_acc = config64.limits.max_abs_acceleration
+    inputs = (
+        torch.rand(sim_steps, args.batch_size, dtype=torch.float64) * 2 - 1
+    ) * max_acc
+
+    sim_time64 = simulate(context64, inputs)
+    sim_time32 = simulate(context32, inputs.float())
+
+    states64 = context64.batch_state.states
+    states32 = context32.batch_state.states.double()
+    finite = states64.isfinite().all(0) & states32.isfinite().all(0)
+    errors = (states64 - states32)[:, finite].abs()
+
+    print(f"Batch size: {args.batch_size}, simulated time: {SIMULATED_TIME}s")
+    print(f"{'state':>18} {'max error':>12} {'mean error':>12}")
+    for name, error in zip(STATE_NAMES, errors):
+        print(f"{name:>18} {error.max().item():>12.3e} {error.mean().item():>12.3e}")
+
+    print(f"Best acceleration agreement: {agreement:.2%}")
+    print(f"{'':>18} {'float64':>12} {'float32':>12}")
+    print(f"{'best actions, s':>18} {best_time64:>12.3f} {best_time32:>12.3f}")
+    print(f"{'simulation, s':>18} {sim_time64:>12.3f} {sim_time32:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
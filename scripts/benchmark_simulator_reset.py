@@ -0,0 +1,59 @@
+"""
+Measures episodes per second of the pydrake CartPoleSimulator.
+
+Many short episodes are run with the current simulator, which resets its
+context and simulator in place, and with a baseline which rebuilds them
+on every reset (the previous behaviour).
+"""
+
+import argparse
+import time
+
+import numpy
+from pydrake.systems.analysis import Simulator
+
+from cartpole.common import Config, Error, State
+from cartpole.simulator.pydrake import CartPoleSimulator
+
+
+class RebuildingSimulator(CartPoleSimulator):
+    def reset_to(self, config, state):
+        self.config = config
+        self.context = self.system.CreateContext(config, state.as_array())
+        self.simulator = Simulator(self.system, self.context)
+
+        self.error = Error.NO_ERROR
+        self.target_acceleration = 0
+        self.system.get_input_port().FixValue(self.context, numpy.array([0]))
+
+
+def run(simulator, episodes, steps, step_time):
+    config = Config()
+    start = time.perf_counter()
+    for episode in range(episodes):
+        initial = State(cart_position=0.0, pole_angle=0.1 * (episode % 10))
+        simulator.reset_to(config, initial)
+        for _ in range(steps):
+            simulator.set_target(0.5)
+            simulator.advance(step_time)
+    return episodes / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--step-time", type=float, default=0.01)
+    args = parser.parse_args()
+
+    baseline = run(RebuildingSimulator(), args.episodes, args.steps, args.step_time)
+    current = run(CartPoleSimulator(), args.episodes, args.steps, args.step_time)
+
+    print(f"Episodes: {args.episodes}, steps per episode: {args.steps}")
+    print(f"{'rebuild on reset':>18} {baseline:>10.1f} episodes/s")
+    print(f"{'reset in place':>18} {current:>10.1f} episodes/s")
+    print(f"{'speedup':>18} {current / baseline:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
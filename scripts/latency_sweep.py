@@ -0,0 +1,90 @@
+"""
+Finds how much I/O latency an actor tolerates before it loses balance.
+
+The actor is evaluated on a simulator wrapped in LatencyProxy for a range
+of round-trip delays. If a recorded session is given, the mean durations
+of its get_state and set_target calls set the split of the delay between
+sensing and actuation.
+
+Example:
+    python scripts/latency_sweep.py \\
+        --actor cartpole.actors.policy_table:PolicyTableActor \\
+        --actor-config '{"path": "data/policy"}' --angle 3.0
+"""
+
+import argparse
+import importlib
+import json
+import math
+
+import numpy as np
+
+from cartpole.common import Config, State
+from cartpole.sessions.collector import SessionData
+from cartpole.sessions.evaluation import EvaluationSettings
+from cartpole.sessions.latency import Delay, latency_sweep, tolerated_delay
+
+
+def load_class(path):
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--actor", required=True, help="module:Class")
+    parser.add_argument("--actor-config", default="{}", help="JSON kwargs")
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--max-delay", type=float, default=0.1)
+    parser.add_argument("--delays-n", type=int, default=11)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--sensing-ratio", type=float, default=0.5)
+    parser.add_argument("--session", help="session.json with recorded delays")
+    parser.add_argument("--angle", type=float, default=math.pi - 0.1)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--min-success-rate", type=float, default=1.0)
+    args = parser.parse_args()
+
+    delays = np.linspace(0, args.max_delay, args.delays_n).tolist()
+    sensing_ratio = args.sensing_ratio
+    if args.session:
+        # Recorded round trip splits the delay between sensing and actuation
+        session = SessionData.load(args.session)
+        sensing = Delay.from_session(session, "get_state").samples.mean()
+        actuation = Delay.from_session(session, "set_target").samples.mean()
+        if sensing + actuation > 0:
+            sensing_ratio = sensing / (sensing + actuation)
+        print(f"Recorded delays: sensing {sensing:.6f}s, actuation {actuation:.6f}s")
+
+    rows = latency_sweep(
+        load_class(args.actor),
+        json.loads(args.actor_config),
+        delays=delays,
+        initial_states=[State(pole_angle=args.angle)],
+        config=Config(),
+        seeds=range(args.seeds),
+        jitter=args.jitter,
+        sensing_ratio=sensing_ratio,
+        backend=args.backend,
+        settings=EvaluationSettings(duration=args.duration),
+    )
+
+    print(f"{'delay, s':>10} {'success':>10} {'balance, s':>12} {'max |x|':>10}")
+    for row in rows:
+        print(
+            f"{row['delay']:>10.4f} {row['success_rate']:>10.0%} "
+            f"{row['time_to_balance']:>12.3f} {row['max_abs_position']:>10.3f}"
+        )
+
+    tolerated = tolerated_delay(rows, args.min_success_rate)
+    if tolerated is None:
+        print("Actor fails even without delay")
+    else:
+        print(f"Tolerated round-trip delay: {tolerated:.4f}s")
+
+
+if __name__ == "__main__":
+    main()